@@ -4,18 +4,46 @@ Book Store Project Simulation using LangChain
 Required packages:
 pip install langchain langchain_openai
 
+Usage:
+    python LangChain.py
+    python LangChain.py --backend fake --fake-latency 0.5
+    python LangChain.py --workflow workflows/my_pipeline.yaml
+    python LangChain.py --memory-turns 20 --memory-spill
+    python LangChain.py --transcript runs/transcripts.jsonl
+    python LangChain.py --record runs/baseline.jsonl
+    python LangChain.py --replay runs/baseline.jsonl --replay-latency zero
+
 Note: 
 1. Set your OpenAI API key before running:
    export OPENAI_API_KEY='your-key'
    
    Or update the api_key variable in this file.
+2. --backend fake runs offline against a deterministic stub model.
 """
 
-from langchain_openai import ChatOpenAI
 from langchain_core.messages import SystemMessage, HumanMessage, AIMessage
-from typing import List, Dict, Tuple, Any
+from typing import List, Dict, Tuple, Any, Optional
+import argparse
+import asyncio
 import os
-import time
+import uuid
+
+from cli_options import (add_backend_arguments, add_context_arguments, add_cache_arguments,
+                         add_retry_arguments, add_metrics_arguments, add_memory_arguments,
+                         add_transcript_arguments, add_replay_arguments)
+from rate_limiter import TokenBucketRateLimiter, CHARS_PER_TOKEN
+from context_window import context_manager_from_args, count_tokens
+from llm_cache import cache_from_args
+from fake_llm import FakeChatModel, fake_llm_from_args
+from replay_llm import ReplayMismatchError, recording_llm_from_args, replay_llm_from_args
+from streaming import LatencyTracker, stream_llm, print_token
+from resilient_llm import ResilientCaller, caller_from_args, endpoint_of
+from llm_metrics import MetricsCollector
+from agent_memory import AgentMemory
+from group_transcript import GroupTranscript, TranscriptEntry
+from transcript_log import TranscriptLog
+from workflow_config import WORKFLOWS_DIR, WorkflowDefinition, add_workflow_arguments, load_workflow
+from langchain_core.globals import set_llm_cache
 
 # ANSI escape code for formatting
 GREEN = "\033[92;1m"
@@ -24,271 +52,245 @@ RESET = "\033[0m"
 
 # Initialize the LLM
 model_name = "gpt-4o-mini"
-api_key = ""  # Your API key
+api_key = os.environ.get("OPENAI_API_KEY", "")  # Your API key
+
+
+def create_llm(backend: str = "openai", base_url: Optional[str] = None, timeout: Optional[float] = None,
+               **fake_options):
+    """Create the chat model for the chosen backend"""
+    if backend == "fake":
+        return FakeChatModel(**fake_options)
+    # Imported here so runs on the fake backend never load the OpenAI client
+    from langchain_openai import ChatOpenAI
+    return ChatOpenAI(
+        model=model_name,
+        temperature=0,
+        api_key=api_key,
+        base_url=base_url,
+        timeout=timeout,
+        max_retries=0  # llm_caller owns retries
+    )
 
-# Set environment variable
-os.environ["OPENAI_API_KEY"] = api_key
 
+# Initialize the LLM; without an API key it is left for --backend fake to set
+llm = create_llm() if api_key else None
 
-# Initialize the LLM
-llm = ChatOpenAI(
-    model=model_name,
-    temperature=0,
-    api_key=api_key
-)
+# Retries transient provider failures with backoff behind a per-endpoint circuit breaker
+llm_caller = ResilientCaller()
+
+# Tokens, latency and cost of every LLM call by role; exported under metrics_prefix at exit
+llm_metrics = MetricsCollector()
+metrics_prefix = None  # set by --metrics
+
+# Optional ContextWindowManager that trims each agent's prompt to a token budget
+context_window = None
+
+# Append-only JSONL log of every message, indexed by run and role; None without --transcript
+transcript_log = None  # TranscriptLog, set by --transcript
+
+def log_message(sender, content: str, recipient: str, **fields):
+    """Write one message by sender (an Agent) to the transcript log, if the log is enabled"""
+    if transcript_log is not None:
+        transcript_log.write(sender.role, content, sender=sender.name, recipient=recipient, **fields)
+
+# Cap on the turns each agent keeps (None for no cap) and where evicted turns are spilled - set by use_memory()
+memory_max_turns = None
+memory_spill_dir = None
+
+# Print direct-chat responses token by token, with time-to-first-token per role
+stream_output = False
+latency_tracker = LatencyTracker()
 
 class Agent:
-    def __init__(self, name: str, system_message: str):
+    def __init__(self, name: str, system_message: str, role: Optional[str] = None):
         self.name = name
+        self.role = role or name  # Workflow role the transcript log is indexed by
         self.system_message = system_message
-        self.memory = []  # Store conversation history
+        self.memory = AgentMemory(name, memory_max_turns, memory_spill_dir)  # One compact record per turn
+        self.reset()
+    
+    def reset(self):
+        """Forget the conversation so far, ready for a new run"""
+        self.memory.reset()
+        # Live prompt that grows by appending, so a call never rebuilds earlier turns
+        self.messages = [SystemMessage(content=self.system_message)]
+        self.prompt_chars = len(self.system_message)
+        self.last_latency = None  # Latency of the last streamed response
     
-    def send_message(self, message: str, sender_name: str = "Human"):
-        """Add a message to this agent's memory and get a response"""
-        # Create conversation history
-        messages = [SystemMessage(content=self.system_message)]
+    def open_turn(self, message: str, sender_name: str = "Human", prompt_message: Optional[HumanMessage] = None):
+        """
+        Append a new incoming message to the live prompt and return the prompt.
+        A group broadcast passes its shared prompt_message, which is appended as is instead of a copy.
+        """
+        if prompt_message is None:
+            prompt_message = HumanMessage(content=f"{sender_name}: {message}")
+        self.messages.append(prompt_message)
+        self.prompt_chars += len(prompt_message.content)
+        return self.messages
+    
+    def close_turn(self, message: str, sender_name: str, response: str):
+        """Append the response to the live prompt and store the exchange in memory"""
+        self.messages.append(AIMessage(content=response))
+        self.prompt_chars += len(response)
+        evicted = self.memory.add(sender_name, message, response)
+        if evicted is not None:
+            # The oldest turn left memory, so it leaves the prompt too: the two messages after the system message
+            removed = self.messages[1:3]
+            del self.messages[1:3]
+            self.prompt_chars -= sum(len(m.content) for m in removed)
+    
+    def abort_turn(self):
+        """Drop the incoming message of a turn whose LLM call failed"""
+        self.prompt_chars -= len(self.messages.pop().content)
+    
+    def fit_context(self, messages):
+        """Trim the prompt to the token budget of this agent's workflow role, if one is configured"""
+        if context_window is None:
+            return messages
+        prompt, report = context_window.trim(self.role, messages)
+        print(f"{GREEN}{report.format()}{RESET}")
+        return prompt
+    
+    def send_message(self, message: str, sender_name: str = "Human", on_token=None):
+        """
+        Add a message to this agent's memory and get a response.
+        With on_token, the response is streamed and each token is passed to it as it arrives.
+        """
+        messages = self.open_turn(message, sender_name)
         
-        # Add conversation history
-        for msg in self.memory:
-            if msg["role"] == "human":
-                messages.append(HumanMessage(content=f"{msg['sender']}: {msg['content']}"))
-            else:  # AI message
-                messages.append(AIMessage(content=msg["content"]))
+        # Get response from LLM, retrying transient provider failures
+        try:
+            prompt = self.fit_context(messages)
+            with llm_metrics.track(self.name, prompt) as call:
+                if on_token is not None:
+                    call.response, self.last_latency = llm_caller.call(
+                        lambda: stream_llm(llm, prompt, on_token, self.name, latency_tracker), endpoint_of(llm))
+                else:
+                    call.response = llm_caller.call(lambda: llm.invoke(prompt), endpoint_of(llm))
+            response = call.response
+        except BaseException:
+            self.abort_turn()
+            raise
         
-        # Add the new message
-        messages.append(HumanMessage(content=f"{sender_name}: {message}"))
+        # Store the exchange in memory
+        self.close_turn(message, sender_name, response.content)
         
-        # Get response from LLM
-        response = llm(messages)
+        return response.content
+    
+    async def asend_message(self, message: str, sender_name: str = "Human",
+                            rate_limiter: Optional[TokenBucketRateLimiter] = None,
+                            prompt_message: Optional[HumanMessage] = None):
+        """
+        Async version of send_message that waits for rate-limit capacity before calling the LLM.
+        An agent handles one turn at a time; concurrency comes from messaging several agents at once.
+        """
+        messages = self.open_turn(message, sender_name, prompt_message)
         
-        # Store the exchange in memory
-        self.memory.append({"role": "human", "sender": sender_name, "content": message})
-        self.memory.append({"role": "ai", "content": response.content})
+        try:
+            prompt = self.fit_context(messages)
+            if prompt is messages:
+                tokens = max(1, self.prompt_chars // CHARS_PER_TOKEN)
+            else:
+                tokens = count_tokens(prompt)
+            
+            # Each retry is a new request, so it waits for rate-limit capacity again
+            async def attempt():
+                if rate_limiter is not None:
+                    await rate_limiter.acquire(tokens)
+                return await llm.ainvoke(prompt)
+            
+            with llm_metrics.track(self.name, prompt) as call:
+                call.response = await llm_caller.acall(attempt, endpoint_of(llm))
+            response = call.response
+        except BaseException:
+            self.abort_turn()
+            raise
+        
+        self.close_turn(message, sender_name, response.content)
         
         return response.content
     
     def initiate_chat(self, recipient, message: str):
         """Start a conversation with another agent"""
         print(f"\n{BLUE_BOLD}[{self.name}]{RESET} to {BLUE_BOLD}[{recipient.name}]{RESET}: {message}")
-        recipient_response = recipient.send_message(message, self.name)
-        print(f"\n{BLUE_BOLD}[{recipient.name}]{RESET}: {recipient_response}")
+        log_message(self, message, recipient.name)
+        if stream_output:
+            print(f"\n{BLUE_BOLD}[{recipient.name}]{RESET}: ", end="", flush=True)
+            recipient_response = recipient.send_message(message, self.name, on_token=print_token)
+            print(f"\n{GREEN}({recipient.last_latency.format()}){RESET}")
+        else:
+            recipient_response = recipient.send_message(message, self.name)
+            print(f"\n{BLUE_BOLD}[{recipient.name}]{RESET}: {recipient_response}")
+        log_message(recipient, recipient_response, self.name)
         return recipient_response
 
-# Create all agents with the same system messages 
-product_owner_agent = Agent(
-    name="Product_Owner",
-    system_message="""Represents the customer's needs, manages the product backlog, and prioritizes features for the book store platform.
-                      Example tasks include defining shopping cart features, payment integrations, and user profile enhancements.
-                      IMPORTANT: When responding, always show your work in this format:
-                      Estimated Weeks Required:
-                      - Total Features / Productivity = Total Duration
-                      - e.g., 6 features / 3 features per week = 2 weeks
-                    """
-)
-
-scrum_master_agent = Agent(
-    name="Scrum_Master",
-    system_message="""Facilitates Scrum ceremonies, removes obstacles, and ensures team adherence to Agile principles for the book store platform.
-                      Supports daily stand-ups, sprint planning, and retrospectives.
-                      IMPORTANT: When responding, always show your work in this format:
-                      Estimated Days Required**:
-                      - Total Ceremonies / Productivity = Total Duration
-                      - e.g., 4 ceremonies / 1 ceremony per day = 4 days
-                    """
-)
-
-ui_ux_designer_agent = Agent(
-    name="UI_UX_Designer",
-    system_message="""Designs user interfaces and experiences for the book store platform.
-                      Tasks include wireframes, prototypes, and mobile interfaces.
-                      IMPORTANT: When responding, always show your work in this format:
-                      Estimated Weeks Required**:
-                      - Total Screens / Productivity = Total Duration
-                      - e.g., 9 screens / 3 screens per week = 3 weeks
-                    """
-)
-
-solution_architect_agent = Agent(
-    name="Solution_Architect",
-    system_message="""Designs the system architecture for the book store platform including microservices and integrations.
-                      IMPORTANT: When responding, always show your work in this format:
-                      Estimated Weeks Required**:
-                      - Total Components / Productivity = Total Duration
-                      - e.g., 4 components / 1 per week = 4 weeks
-                    """
-)
-
-developer_agent = Agent(
-    name="Developer",
-    system_message="""Develops features, integrates APIs, and manages frontend/backend logic for the book store platform.
-                      IMPORTANT: When responding, always show your work in this format:
-                      Estimated Weeks Required**:
-                      - Total SLOC / Productivity = Total Duration
-                      - e.g., 1000 SLOC / 500 SLOC per week = 2 weeks
-                    """
-)
-
-qa_engineer_agent = Agent(
-    name="QA_Engineer",
-    system_message="""Tests features and validates functionalities for the book store platform.
-                      IMPORTANT: When responding, always show your work in this format:
-                      Estimated Days Required**:
-                      - Total Test Cases / Productivity = Total Duration
-                      - e.g., 25 test cases / 5 per day = 5 days
-                    """
-)
-
-technical_writer_agent = Agent(
-    name="Technical_Writer",
-    system_message="""Writes user guides, API docs, and release notes for the book store platform.
-                      IMPORTANT: When responding, always show your work in this format:
-                      Estimated Weeks Required**:
-                      - Total Pages / Productivity = Total Duration
-                      - e.g., 8 pages / 4 pages per week = 2 weeks
-                    """
-)
-
-devops_engineer_agent = Agent(
-    name="DevOps_Engineer",
-    system_message="""Handles CI/CD, infrastructure, and deployment automation for the book store platform.
-                      IMPORTANT: When responding, always show your work in this format:
-                      Estimated Weeks Required**:
-                      - Total Tasks / Productivity = Total Duration
-                      - e.g., 6 tasks / 2 tasks per week = 3 weeks
-                    """
-)
-
-security_engineer_agent = Agent(
-    name="Security_Engineer",
-    system_message="""Conducts code reviews, penetration testing, and secures sensitive data for the book store platform.
-                      IMPORTANT: When responding, always show your work in this format:
-                      Estimated Weeks Required**:
-                      - Total Security Tasks / Productivity = Total Duration
-                      - e.g., 3 tasks / 1 task per week = 3 weeks
-                    """
-)
-
-bookstore_specialist_agent = Agent(
-    name="E_commerce_Specialist",
-    system_message="""Provides best practices in book cataloging, checkout UX, and promotions for the book store platform.
-                      IMPORTANT: When responding, always show your work in this format:
-                      Estimated Weeks Required**:
-                      - Total Areas / Productivity = Total Duration
-                      - e.g., 6 areas / 2 per week = 3 weeks
-                    """
-)
-
-# List of agents for easy reference
-bookstore_agents = [
-    product_owner_agent, scrum_master_agent, ui_ux_designer_agent,
-    solution_architect_agent, developer_agent, qa_engineer_agent,
-    technical_writer_agent, devops_engineer_agent, security_engineer_agent,
-    bookstore_specialist_agent
-]
-
-# Define the same message templates 
-product_owner_message = (
-    "I want to build a web-based mobile app for our bookstore where customers can browse books by genre, read previews, "
-    "purchase books online, track their shipments, review books, and get personalized reading recommendations. "
-    "Please provide your estimate including the detailed calculation steps for the refinement effort."
-)
-
-scrum_master_to_ui_ux_designer_prompt = (
-    "I have received the customer's requirements from the Product Owner. Define user stories and acceptance criteria for the project. "
-    "Organize at least 10 user stories, each with a unique ID (e.g., US-01, US-02). "
-    "Provide work and effort estimates based on the number of stories documented for this sprint. "
-    "Please show your detailed calculation steps for the estimate."
-)
-
-ui_ux_designer_to_scrum_master_response = (
-    "I have documented the user stories with acceptance criteria, as requested. "
-    "Here are my detailed calculation steps for the effort estimates based on the number of stories documented for this sprint:"
-)
-
-scrum_master_to_architect_prompt = (
-    "The Business Analyst has completed the user stories. Design the technical architecture to support these requirements, prioritizing security, scalability, and compliance. "
-    "Include work and effort estimates based on the number of architectural components designed for this sprint. "
-    "Please show your detailed calculation steps for the estimate."
-)
-
-architect_to_scrum_master_response = (
-    "I have completed the architectural design. Here are my detailed calculation steps for the effort estimates for the design phase:"
-)
-
-scrum_master_to_developer_prompt = (
-    "The Architect has completed the design. Begin implementing the features based on the user stories and architectural components. "
-    "Estimate the number of source lines of code (SLOC) and effort required for this sprint's development. "
-    "Please show your detailed calculation steps for the estimate."
-)
-
-developer_to_scrum_master_response = (
-    "I have developed the features based on the architecture and user stories. "
-    "Here are my detailed calculation steps for the development phase effort estimates:"
-)
-
-scrum_master_to_qa_engineer_prompt = (
-    "The development phase is complete. Create and execute test cases based on user stories. "
-    "Provide work and effort estimates based on the number of test cases created and executed in this sprint. "
-    "Please show your detailed calculation steps for the estimate."
-)
-
-qa_engineer_to_scrum_master_response = (
-    "Testing is complete, and I have verified that the functionality meets the requirements. "
-    "Here are my detailed calculation steps for the testing effort estimates:"
-)
-
-scrum_master_to_technical_writer_prompt = (
-    "Testing is complete. Prepare the user documentation and training materials based on the deliverables of this sprint. "
-    "Provide work and effort estimates for documentation creation. "
-    "Please show your detailed calculation steps for the estimate."
-)
-
-technical_writer_to_scrum_master_response = (
-    "Documentation and training materials are complete. Here are my detailed calculation steps for the documentation effort estimates:"
-)
-
-# Create a list of agent pairs to define the conversation flow in Scrum
-conversation_flow_scrum = [
-    (product_owner_agent, scrum_master_agent, product_owner_message),
-    (scrum_master_agent, ui_ux_designer_agent, scrum_master_to_ui_ux_designer_prompt),
-    (ui_ux_designer_agent, scrum_master_agent, ui_ux_designer_to_scrum_master_response),
-    (scrum_master_agent, solution_architect_agent, scrum_master_to_architect_prompt),
-    (solution_architect_agent, scrum_master_agent, architect_to_scrum_master_response),
-    (scrum_master_agent, developer_agent, scrum_master_to_developer_prompt),
-    (developer_agent, scrum_master_agent, developer_to_scrum_master_response),
-    (scrum_master_agent, qa_engineer_agent, scrum_master_to_qa_engineer_prompt),
-    (qa_engineer_agent, scrum_master_agent, qa_engineer_to_scrum_master_response),
-    (scrum_master_agent, technical_writer_agent, scrum_master_to_technical_writer_prompt),
-    (technical_writer_agent, scrum_master_agent, technical_writer_to_scrum_master_response)
-]
+# Default provider budget shared by every broadcast in a group chat
+DEFAULT_REQUESTS_PER_MINUTE = 60
+DEFAULT_TOKENS_PER_MINUTE = 200000
 
 class GroupChat:
-    def __init__(self, agents: List[Agent]):
+    def __init__(self, agents: List[Agent],
+                 requests_per_minute: Optional[float] = DEFAULT_REQUESTS_PER_MINUTE,
+                 tokens_per_minute: Optional[float] = DEFAULT_TOKENS_PER_MINUTE):
         self.agents = agents
-        self.messages = []
+        # Every broadcast is stored once; each agent reads it through its own cursor
+        self.transcript = GroupTranscript()
+        for agent in agents:
+            self.transcript.cursor(agent.name)
+        # Replaces a fixed sleep before every call; None disables a limit
+        self.rate_limiter = TokenBucketRateLimiter(requests_per_minute, tokens_per_minute)
+    
+    @property
+    def messages(self) -> List[Dict[str, str]]:
+        """The group chat history as sender/content dicts"""
+        return self.transcript.to_dicts()
     
-    def add_message(self, sender_agent: Agent, message: str):
+    def reset(self):
+        """Clear the group chat history, ready for a new run"""
+        self.transcript.clear()
+    
+    def add_message(self, sender_agent: Agent, message: str) -> TranscriptEntry:
         """Add a message to the group chat history"""
-        self.messages.append({
-            "sender": sender_agent.name,
-            "content": message
-        })
+        entry = self.transcript.append(sender_agent.name, message,
+                                       HumanMessage(content=f"{sender_agent.name}: {message}"))
         print(f"\n{BLUE_BOLD}[{sender_agent.name}]{RESET} to Group: {message}")
+        log_message(sender_agent, message, "group")
+        return entry
     
-    def broadcast_message(self, sender_agent: Agent, message: str):
-        """Send a message to all agents except the sender"""
+    async def _deliver(self, agent: Agent) -> Optional[str]:
+        """Have agent answer the broadcasts it has not read yet, in order, and return its last reply"""
+        response = None
+        for entry in self.transcript.cursor(agent.name).read():
+            response = await agent.asend_message(entry.content, entry.sender, self.rate_limiter,
+                                                 entry.prompt_message)
+            log_message(agent, response, entry.sender)
+        return response
+    
+    async def abroadcast_message(self, sender_agent: Agent, message: str):
+        """Send a message to all agents except the sender concurrently"""
         self.add_message(sender_agent, message)
-        responses = {}
+        recipients = [agent for agent in self.agents if agent != sender_agent]
         
-        for agent in self.agents:
-            if agent != sender_agent:
-                # Wait briefly to avoid rate limits
-                time.sleep(1)
-                response = agent.send_message(message, sender_agent.name)
-                responses[agent.name] = response
-                print(f"\n{BLUE_BOLD}[{agent.name}]{RESET}: {response}")
+        # All recipients are called at once; the rate limiter spaces them out only when needed
+        replies = await asyncio.gather(*(self._deliver(agent) for agent in recipients))
+        
+        # Keep the responses in agent order regardless of which call finished first
+        responses = {}
+        for agent, response in zip(recipients, replies):
+            responses[agent.name] = response
+            print(f"\n{BLUE_BOLD}[{agent.name}]{RESET}: {response}")
         
         return responses
+    
+    def broadcast_message(self, sender_agent: Agent, message: str):
+        """Send a message to all agents except the sender; async callers await abroadcast_message instead"""
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            return asyncio.run(self.abroadcast_message(sender_agent, message))
+        # asyncio.run cannot start a second loop in this thread
+        raise RuntimeError("broadcast_message was called from a running event loop; "
+                           "await GroupChat.abroadcast_message instead")
 
 class GroupChatManager:
     def __init__(self, groupchat: GroupChat):
@@ -303,99 +305,168 @@ class GroupChatManager:
             # Group conversation
             return self.groupchat.broadcast_message(agent, message)
 
-# Initialize GroupChat for Scrum simulation
-groupchat_scrum = GroupChat(
-    agents=[
-        product_owner_agent,
-        scrum_master_agent,
-        ui_ux_designer_agent,
-        solution_architect_agent,
-        developer_agent,
-        qa_engineer_agent,
-        technical_writer_agent
-    ]
-)
-
-manager_scrum = GroupChatManager(groupchat=groupchat_scrum)
-
-# Define the initial customer message
-customer_message = """I want to build a web-based mobile app for our bookstore where customers can browse books by genre, read previews, purchase books online, track their shipments, review books, and get personalized reading recommendations."""
+# Workflow definition the agents and conversation are built from - replaced by --workflow
+DEFAULT_WORKFLOW = os.path.join(WORKFLOWS_DIR, "bookstore_langchain.json")
+
+# Set by use_workflow()
+workflow = None
+agents: Dict[str, Agent] = {}
+bookstore_agents: List[Agent] = []
+groupchat_scrum = None
+manager_scrum = None
+conversation_flow_scrum: List[Tuple[Agent, Agent, str]] = []
+customer_message = ""
+
+def use_workflow(definition: WorkflowDefinition):
+    """Create the agents, group chat and conversation flow for a workflow definition."""
+    global workflow, agents, bookstore_agents, groupchat_scrum, manager_scrum, conversation_flow_scrum, customer_message
+    workflow = definition
+    agents = {role: Agent(spec.name, spec.system_message, role) for role, spec in definition.agents.items()}
+    bookstore_agents = list(agents.values())
+    
+    # The group chat holds everyone who takes part in the relay
+    members = [definition.intake, definition.coordinator] + list(definition.experts)
+    groupchat_scrum = GroupChat(agents=[agents[role] for role in members])
+    manager_scrum = GroupChatManager(groupchat=groupchat_scrum)
+    
+    # The Product Owner hands the brief to the Scrum Master, who then relays to each expert in turn
+    conversation_flow_scrum = [(agents[sender], agents[recipient], message)
+                               for sender, recipient, message in definition.conversation]
+    customer_message = definition.brief
+
+use_workflow(load_workflow(DEFAULT_WORKFLOW))
+
+def use_memory(max_turns: Optional[int] = None, spill_dir: Optional[str] = None):
+    """Cap every agent's memory at max_turns turns, spilling evicted turns under spill_dir."""
+    global memory_max_turns, memory_spill_dir
+    memory_max_turns, memory_spill_dir = max_turns, spill_dir
+    for agent in bookstore_agents:
+        agent.memory.close()
+        agent.memory = AgentMemory(agent.name, max_turns, spill_dir)
+        agent.reset()
+
+def reset_agents():
+    """Clear every agent's memory and the group chat history, so each run starts fresh"""
+    for agent in bookstore_agents:
+        agent.reset()
+    groupchat_scrum.reset()
 
 # Run the simulation 
 def run_simulation():
     print(f"\n{GREEN}Running Book Store Project Simulation with LangChain{RESET}")
+    # The agents are module-level singletons; without this a long-lived process accumulates every run
+    reset_agents()
+    run_id = uuid.uuid4().hex[:12]
+    llm_metrics.start_run(run_id)
+    if transcript_log is not None:
+        transcript_log.start_run(run_id)
     
-    # First, the product owner initiates a chat with the scrum master
-    print(f"\n{GREEN}Step 1: Product Owner initiates chat with Scrum Master{RESET}")
-    product_owner_agent.initiate_chat(
-        scrum_master_agent,
-        customer_message
-    )
+    titles = {agents[role].name: spec.title for role, spec in workflow.agents.items()}
+    coordinator = agents[workflow.coordinator]
+    for step, (sender, recipient, message) in enumerate(conversation_flow_scrum, 1):
+        if step == 1:
+            action = "initiates chat with"
+        elif sender is coordinator:
+            action = "discusses with"
+        else:
+            action = "responds to"
+        print(f"\n{GREEN}Step {step}: {titles[sender.name]} {action} {titles[recipient.name]}{RESET}")
+        sender.initiate_chat(recipient, message)
     
-    # The scrum master initiates a chat with the UI/UX designer (playing BA role)
-    print(f"\n{GREEN}Step 2: Scrum Master initiates chat with UI/UX Designer{RESET}")
-    scrum_master_agent.initiate_chat(
-        ui_ux_designer_agent,
-        scrum_master_to_ui_ux_designer_prompt
-    )
+    if stream_output:
+        print(f"\n{GREEN}Response latency by role:{RESET}")
+        print(latency_tracker.format_table())
     
-    # Continue with the rest of the conversation flow
-    print(f"\n{GREEN}Step 3: UI/UX Designer responds to Scrum Master{RESET}")
-    ui_ux_designer_agent.initiate_chat(
-        scrum_master_agent,
-        ui_ux_designer_to_scrum_master_response
-    )
+    # Show which agents dominate latency and spend
+    if llm_metrics.series():
+        print(f"\n{GREEN}LLM usage by agent:{RESET}")
+        print(llm_metrics.format_table())
     
-    print(f"\n{GREEN}Step 4: Scrum Master discusses with Solution Architect{RESET}")
-    scrum_master_agent.initiate_chat(
-        solution_architect_agent,
-        scrum_master_to_architect_prompt
-    )
+    if transcript_log is not None:
+        transcript_log.flush()
+        print(f"\n{GREEN}Transcript of run {run_id} appended to '{transcript_log.path}'{RESET}")
     
-    print(f"\n{GREEN}Step 5: Solution Architect responds to Scrum Master{RESET}")
-    solution_architect_agent.initiate_chat(
-        scrum_master_agent,
-        architect_to_scrum_master_response
-    )
+    print(f"\n{GREEN}Book Store Project Simulation Complete!{RESET}")
+
+# Run the simulation
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Book Store Project Simulation using LangChain')
+    parser.add_argument('--stream', action='store_true', help='Print responses token by token as they arrive')
+    add_backend_arguments(parser)
+    add_context_arguments(parser)
+    add_cache_arguments(parser)
+    add_retry_arguments(parser)
+    add_metrics_arguments(parser)
+    add_memory_arguments(parser)
+    add_transcript_arguments(parser)
+    add_replay_arguments(parser)
+    add_workflow_arguments(parser, DEFAULT_WORKFLOW)
+    args = parser.parse_args()
     
-    print(f"\n{GREEN}Step 6: Scrum Master discusses with Developer{RESET}")
-    scrum_master_agent.initiate_chat(
-        developer_agent,
-        scrum_master_to_developer_prompt
-    )
+    if args.workflow != DEFAULT_WORKFLOW:
+        try:
+            use_workflow(load_workflow(args.workflow))
+        except (OSError, ValueError) as e:
+            print(f"\033[91mCould not load workflow: {e}\033[0m")
+            exit(1)
     
-    print(f"\n{GREEN}Step 7: Developer responds to Scrum Master{RESET}")
-    developer_agent.initiate_chat(
-        scrum_master_agent,
-        developer_to_scrum_master_response
-    )
+    stream_output = args.stream
     
-    print(f"\n{GREEN}Step 8: Scrum Master discusses with QA Engineer{RESET}")
-    scrum_master_agent.initiate_chat(
-        qa_engineer_agent,
-        scrum_master_to_qa_engineer_prompt
-    )
+    # A replay answers from its recording and needs no backend
+    if args.replay:
+        try:
+            llm = replay_llm_from_args(args)
+        except (OSError, ValueError, KeyError) as e:
+            print(f"\033[91mCould not load recording '{args.replay}': {e}\033[0m")
+            exit(1)
+    elif args.backend == "fake":
+        llm = fake_llm_from_args(args)
+    elif llm is None:
+        print("\033[91mNo OpenAI API key found. Set OPENAI_API_KEY, update api_key in this file, or use --backend fake.\033[0m")
+        exit(1)
+    else:
+        llm = create_llm(base_url=args.base_url, timeout=args.call_deadline or None)
+    llm = recording_llm_from_args(args, llm)
     
-    print(f"\n{GREEN}Step 9: QA Engineer responds to Scrum Master{RESET}")
-    qa_engineer_agent.initiate_chat(
-        scrum_master_agent,
-        qa_engineer_to_scrum_master_response
-    )
+    llm_caller = caller_from_args(args)
+    if args.replay:
+        llm_metrics.model = llm.model_name or model_name
+    else:
+        llm_metrics.model = "fake" if args.backend == "fake" else model_name
+    metrics_prefix = None if args.no_metrics else args.metrics
+    if args.transcript:
+        transcript_log = TranscriptLog(args.transcript)
     
-    print(f"\n{GREEN}Step 10: Scrum Master discusses with Technical Writer{RESET}")
-    scrum_master_agent.initiate_chat(
-        technical_writer_agent,
-        scrum_master_to_technical_writer_prompt
-    )
+    context_window = context_manager_from_args(args)
+    if args.memory_turns is not None or args.memory_spill:
+        try:
+            use_memory(args.memory_turns, args.memory_spill)
+        except ValueError as e:
+            print(f"\033[91m{e}\033[0m")
+            exit(1)
     
-    print(f"\n{GREEN}Step 11: Technical Writer responds to Scrum Master{RESET}")
-    technical_writer_agent.initiate_chat(
-        scrum_master_agent,
-        technical_writer_to_scrum_master_response
-    )
+    # Every llm call, from send_message and the group broadcast alike, goes through the cache
+    response_cache = cache_from_args(args)
+    if response_cache is not None:
+        set_llm_cache(response_cache)
     
-    print(f"\n{GREEN}Book Store Project Simulation Complete!{RESET}")
-
-# Run the simulation
-if __name__ == "__main__":
-    run_simulation() 
+    try:
+        run_simulation()
+    except ReplayMismatchError as e:
+        # A replay that went off script must fail the run, not just report it
+        print(f"\n\033[91m{e}\033[0m")
+        exit(1)
+    finally:
+        if response_cache is not None:
+            print(f"\n{GREEN}{response_cache.format_stats()}{RESET}")
+        if llm_caller.retries or llm_caller.failures:
+            print(f"\n{GREEN}{llm_caller.format_stats()}{RESET}")
+        # Exported here so a failed or interrupted run keeps the counters of the calls it made
+        if metrics_prefix and llm_metrics.series():
+            json_path, prom_path = llm_metrics.export(metrics_prefix)
+            print(f"\n{GREEN}Metrics written to '{json_path}' and '{prom_path}'{RESET}")
+        if transcript_log is not None:
+            transcript_log.close()
+        if args.record or args.replay:
+            print(f"\n{GREEN}{llm.format_stats()}{RESET}")
+            llm.close()
@@ -3,11 +3,27 @@
 Book Store Project Simulation using LangGraph
 
 Required packages:
-pip install langchain langchain_openai langgraph graphviz matplotlib networkx
+pip install langchain langchain_openai langgraph
+pip install langgraph-checkpoint-sqlite  # optional, for --resume
+Graphviz (the dot binary) is optional; it renders the workflow diagram to PNG
 
 Usage:
     python Experiment_4_proper_langgraph.py 
     python Experiment_4_proper_langgraph.py --api-key YOUR_API_KEY
+    python Experiment_4_proper_langgraph.py --parallel
+    python Experiment_4_proper_langgraph.py --dag
+    python Experiment_4_proper_langgraph.py --parallel --local-summary
+    python Experiment_4_proper_langgraph.py --routing templated --local-summary
+    python Experiment_4_proper_langgraph.py --workflow workflows/my_pipeline.yaml --parallel
+    python Experiment_4_proper_langgraph.py --backend fake --fake-latency 0.5
+    python Experiment_4_proper_langgraph.py --checkpoint --run-id bookstore-1
+    python Experiment_4_proper_langgraph.py --resume bookstore-1
+    python Experiment_4_proper_langgraph.py --parallel --trace trace.json
+    python Experiment_4_proper_langgraph.py --transcript runs/transcripts.jsonl
+    python Experiment_4_proper_langgraph.py --record runs/baseline.jsonl
+    python Experiment_4_proper_langgraph.py --replay runs/baseline.jsonl --replay-latency zero
+    python Experiment_4_proper_langgraph.py --base-url http://127.0.0.1:8765/v1 --api-key stub --max-retries 6
+    python Experiment_4_proper_langgraph.py --backend fake --no-visualize --startup-profile
     python Experiment_4_proper_langgraph.py --help
 
 Note: 
@@ -18,35 +34,91 @@ Note:
 """
 
 import os
+import sys
 import time
+import uuid
+import functools
+import threading
 import argparse
-from typing import List, Dict, Any, TypedDict, Annotated, Sequence, Optional, Literal
+from typing import List, Dict, Any, TypedDict, Annotated, Sequence, Optional, Literal, Tuple, Union
 from enum import Enum
 
-from langchain_openai import ChatOpenAI
-from langchain_core.messages import SystemMessage, HumanMessage, AIMessage
+from cli_options import (add_backend_arguments, add_context_arguments, add_cache_arguments,
+                         add_retry_arguments, add_metrics_arguments, add_transcript_arguments,
+                         add_replay_arguments, role_budget)
+from startup_profile import ImportProfiler
+from workflow_config import WORKFLOWS_DIR, WorkflowDefinition, add_workflow_arguments, load_workflow
+
+# Defaults the command line needs before the heavy imports below
+# Workflow definition the graph is built from - replaced by --workflow
+DEFAULT_WORKFLOW = os.path.join(WORKFLOWS_DIR, "bookstore_langgraph.json")
+DEFAULT_CHECKPOINT_DB = "langgraph_checkpoints.sqlite"
+
+# Function to build the command line parser; it only needs the standard library
+def build_arg_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description='Book Store Project Simulation using LangGraph')
+    parser.add_argument('--api-key', type=str, help='OpenAI API key to use')
+    parser.add_argument('--model', type=str, default='gpt-4o-mini', help='OpenAI model to use (default: gpt-4o-mini)')
+    parser.add_argument('--debug', action='store_true', help='Show debug information')
+    mode_group = parser.add_mutually_exclusive_group()
+    mode_group.add_argument('--parallel', dest='mode', action='store_const', const='parallel',
+                            help='Dispatch the expert estimates concurrently instead of one at a time')
+    mode_group.add_argument('--dag', dest='mode', action='store_const', const='dag',
+                            help='Start each expert as soon as the experts it depends on have answered')
+    parser.set_defaults(mode='serial')
+    parser.add_argument('--stream', action='store_true', help='Print responses token by token as they arrive')
+    parser.add_argument('--routing', choices=['llm', 'deterministic', 'templated'], default='llm',
+                        help='Serial relay turns: LLM calls (default), pure routing, or routing with a templated handoff')
+    parser.add_argument('--local-summary', action='store_true',
+                        help='Compute the final timeline from the parsed estimates instead of asking the Scrum Master')
+    parser.add_argument('--no-visualize', action='store_true', help='Skip the workflow diagrams')
+    parser.add_argument('--startup-profile', action='store_true', help='Report how long each startup import takes')
+    parser.add_argument('--trace', type=str, default=None, metavar='PATH',
+                        help='Write a Chrome Trace / Perfetto timeline of every node, LLM call and routing step to PATH')
+    parser.add_argument('--checkpoint-db', type=str, default=DEFAULT_CHECKPOINT_DB,
+                        help=f'SQLite file for run checkpoints (default: {DEFAULT_CHECKPOINT_DB})')
+    parser.add_argument('--checkpoint', action='store_true',
+                        help='Save every completed node to --checkpoint-db so a failed run can be continued with '
+                             '--resume; the file grows with every checkpointed run and is never pruned')
+    parser.add_argument('--run-id', type=str, default=None, help='ID to save this run under (default: random)')
+    parser.add_argument('--resume', type=str, default=None, metavar='RUN_ID',
+                        help='Continue a checkpointed run from its last completed node '
+                             '(--dag reruns every expert, which it checkpoints as one node)')
+    add_backend_arguments(parser)
+    add_context_arguments(parser)
+    add_cache_arguments(parser)
+    add_retry_arguments(parser)
+    add_metrics_arguments(parser)
+    add_transcript_arguments(parser)
+    add_replay_arguments(parser)
+    add_workflow_arguments(parser, DEFAULT_WORKFLOW)
+    return parser
+
+# Parse the command line before loading LangChain, so --help and usage errors return at once
+if __name__ == "__main__":
+    args = build_arg_parser().parse_args()
+    import_profile = ImportProfiler().start() if args.startup_profile else None
+
+from langchain_core.messages import SystemMessage, HumanMessage, AIMessage, get_buffer_string
 from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
 
 from langgraph.graph import StateGraph, END, START
-from langgraph.graph.message import add_messages
-
-# Try to import graphviz but don't fail if not available
-try:
-    from graphviz import Digraph
-    HAS_GRAPHVIZ = True
-except ImportError:
-    HAS_GRAPHVIZ = False
-    print("Note: Graphviz module not found. Will try matplotlib or fallback to ASCII chart.")
-
-# Try to import matplotlib and networkx as alternative
-try:
-    import matplotlib.pyplot as plt
-    import networkx as nx
-    HAS_MATPLOTLIB = True
-except ImportError:
-    HAS_MATPLOTLIB = False
-    if not HAS_GRAPHVIZ:
-        print("Note: Neither Graphviz nor Matplotlib/NetworkX available. Will use ASCII chart.")
+
+from dag_scheduler import run_dag
+from estimates import parse_estimates, format_estimates, project_timeline
+from context_window import context_manager_from_args
+from llm_cache import cache_from_args
+from fake_llm import fake_llm_from_args
+from replay_llm import ReplayMismatchError, recording_llm_from_args, replay_llm_from_args
+from streaming import LatencyTracker, print_token
+from rate_limiter import estimate_tokens
+from resilient_llm import ResilientCaller, caller_from_args, endpoint_of
+from llm_metrics import MetricsCollector
+from tracing import Tracer
+from transcript_log import TranscriptLog
+from message_history import MessageHistory, append_history, as_history
+from workflow_diagram import graph_topology, render_async
+from langchain_core.globals import set_llm_cache
 
 # ANSI escape code for formatting
 GREEN = "\033[92;1m"
@@ -62,10 +134,82 @@ model_name = "gpt-4o-mini"
 # Define llm as None initially, will be initialized after argument parsing
 llm = None
 
-def initialize_llm(api_key, model_name):
-    """Initialize the LLM with the given API key and model name"""
+# Optional ContextWindowManager that trims each role's history to a token budget
+context_window = None
+
+# When set, responses are printed token by token from app.stream instead of by each node
+stream_output = False
+
+# Compute the final timeline in code instead of asking the Scrum Master - set by --local-summary
+local_summary = False
+
+# How the Scrum Master relays between experts in the serial workflow - set by --routing
+#   "llm":           every relay turn is an LLM call (the original behaviour)
+#   "deterministic": relay turns only route to the next expert, with no LLM call
+#   "templated":     like deterministic, plus a short templated handoff message
+routing = "llm"
+HANDOFF_TEMPLATE = "Thanks, {sender}. Handing over to the {receiver} for the next estimate."
+
+class RoutingSavings:
+    """Counts relay turns answered without the LLM and the prompt tokens they would have sent."""
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.tokens = 0
+    
+    def add(self, tokens: int) -> None:
+        with self._lock:
+            self.calls += 1
+            self.tokens += tokens
+    
+    def reset(self) -> None:
+        with self._lock:
+            self.calls = 0
+            self.tokens = 0
+    
+    def format(self) -> str:
+        return (f"Routing saved {self.calls} Scrum Master relay calls "
+                f"(~{self.tokens} prompt tokens not sent)")
+
+routing_savings = RoutingSavings()
+
+# Optional limits shared by every LLM call in the process, used when many runs share one provider quota
+rate_limiter = None  # TokenBucketRateLimiter
+llm_call_slots = None  # threading.BoundedSemaphore capping calls in flight
+
+# Retries transient provider failures with backoff behind a per-endpoint circuit breaker
+llm_caller = ResilientCaller()
+
+# Tokens, latency and cost of every LLM call by run and role; exported under metrics_prefix at exit
+llm_metrics = MetricsCollector()
+metrics_prefix = None  # set by --metrics
+
+# Spans for every node, LLM call, routing decision and visualization step; written to trace_path at exit
+tracer = Tracer()
+trace_path = None  # set by --trace
+
+# Append-only JSONL log of every message, indexed by run and role; None without --transcript
+transcript_log = None  # TranscriptLog, set by --transcript
+
+# Optional checkpointer, set by --checkpoint, that saves every completed node so a failed run can be resumed
+checkpointer = None
+
+# Command line options stored with a run's checkpoints; --resume restores them so it rebuilds the same run
+RESUMED_OPTIONS = ("mode", "workflow", "routing", "local_summary", "context_budget", "context_strategy", "role_budget")
+run_options = {}  # set from the command line
+
+def initialize_llm(api_key, model_name, base_url=None, timeout=None):
+    """
+    Initialize the LLM with the given API key and model name.
+    base_url points it at another OpenAI-compatible server; timeout bounds each request.
+    """
     if not api_key:
         print("\033[93mNo OpenAI API key found in environment variables.\033[0m")
+        if not sys.stdin.isatty():
+            # Never block on a prompt in CI or other non-interactive runs
+            print("\033[91mNo API key and no terminal to ask for one. Use --api-key or --backend fake.\033[0m")
+            return None
         user_input = input("Would you like to enter an OpenAI API key now? (yes/no): ")
         if user_input.lower() in ['yes', 'y']:
             api_key = input("Enter your OpenAI API key: ").strip()
@@ -75,19 +219,23 @@ def initialize_llm(api_key, model_name):
             print("You can set it permanently using: export OPENAI_API_KEY='your-key'")
             return None
 
-    # Initialize the LLM - using the API key
+    # Initialize the LLM - using the API key; langchain_openai is the slowest import, so load it only here
     try:
+        from langchain_openai import ChatOpenAI
         return ChatOpenAI(
             model=model_name,
             temperature=0,
-            api_key=api_key
+            api_key=api_key,
+            base_url=base_url,
+            timeout=timeout,
+            max_retries=0  # llm_caller owns retries, so a storm is not retried twice over
         )
     except Exception as e:
         print(f"\033[91mError initializing OpenAI client: {e}\033[0m")
         print("Please check your API key and try again.")
         return None
 
-# Define the roles that will be used in our workflow
+# Built-in roles; workflow files can declare further roles of their own
 class Role(str, Enum):
     PRODUCT_OWNER = "product_owner"
     SCRUM_MASTER = "scrum_master"
@@ -104,130 +252,162 @@ class Role(str, Enum):
     ECOMMERCE_SPECIALIST = "ecommerce_specialist"
     CUSTOMER = "customer"
 
-# System messages for each role
-SYSTEM_MESSAGES = {
-    Role.PRODUCT_OWNER: """Represents the customer's needs, manages the product backlog, and prioritizes features for the book store platform.
-                    Example tasks include defining shopping cart features, payment integrations, and user profile enhancements.
-                    IMPORTANT: When responding, always show your work in this format:
-                    Estimated Weeks Required:
-                    - Total Features / Productivity = Total Duration
-                    - e.g., 6 features / 3 features per week = 2 weeks
-                    """,
-    
-    Role.SCRUM_MASTER: """Facilitates Scrum ceremonies, removes obstacles, and ensures team adherence to Agile principles for the book store platform.
-                    Supports daily stand-ups, sprint planning, and retrospectives.
-                    IMPORTANT: When responding, always show your work in this format:
-                    Estimated Days Required**:
-                    - Total Ceremonies / Productivity = Total Duration
-                    - e.g., 4 ceremonies / 1 ceremony per day = 4 days
-                    """,
-    
-    Role.UI_UX_DESIGNER: """Designs user interfaces and experiences for the book store platform.
-                    Tasks include wireframes, prototypes, and mobile interfaces.
-                    IMPORTANT: When responding, always show your work in this format:
-                    Estimated Weeks Required**:
-                    - Total Screens / Productivity = Total Duration
-                    - e.g., 9 screens / 3 screens per week = 3 weeks
-                    """,
-    
-    Role.SOLUTION_ARCHITECT: """Designs the system architecture for the book store platform including microservices and integrations.
-                    IMPORTANT: When responding, always show your work in this format:
-                    Estimated Weeks Required**:
-                    - Total Components / Productivity = Total Duration
-                    - e.g., 4 components / 1 per week = 4 weeks
-                    """,
-    
-    Role.DEVELOPER: """Develops features, integrates APIs, and manages frontend/backend logic for the book store platform.
-                    IMPORTANT: When responding, always show your work in this format:
-                    Estimated Weeks Required**:
-                    - Total SLOC / Productivity = Total Duration
-                    - e.g., 1000 SLOC / 500 SLOC per week = 2 weeks
-                    """,
-    
-    Role.FRONTEND_DEVELOPER: """Implements responsive mobile web interfaces and develops interactive features like book previews and shopping cart for the book store platform.
-                    IMPORTANT: When responding, always show your work in this format:
-                    Estimated Weeks Required**:
-                    - Total SLOC / Productivity = Total Duration
-                    - e.g., 500 SLOC / 250 SLOC per week = 2 weeks
-                    """,
-    
-    Role.BACKEND_DEVELOPER: """Creates APIs for book catalog, user management, and order processing, and implements business logic for the retail bookstore operations.
-                    IMPORTANT: When responding, always show your work in this format:
-                    Estimated Weeks Required**:
-                    - Total SLOC / Productivity = Total Duration
-                    - e.g., 500 SLOC / 250 SLOC per week = 2 weeks
-                    """,
-    
-    Role.RECOMMENDATION_DEVELOPER: """Creates personalized book recommendation algorithms and implements user behavior tracking for relevant suggestions.
-                    IMPORTANT: When responding, always show your work in this format:
-                    Estimated Weeks Required**:
-                    - Total SLOC / Productivity = Total Duration
-                    - e.g., 400 SLOC / 200 SLOC per week = 2 weeks
-                    """,
-    
-    Role.QA_ENGINEER: """Tests features and validates functionalities for the book store platform.
-                    IMPORTANT: When responding, always show your work in this format:
-                    Estimated Days Required**:
-                    - Total Test Cases / Productivity = Total Duration
-                    - e.g., 25 test cases / 5 per day = 5 days
-                    """,
-    
-    Role.TECHNICAL_WRITER: """Writes user guides, API docs, and release notes for the book store platform.
-                    IMPORTANT: When responding, always show your work in this format:
-                    Estimated Weeks Required**:
-                    - Total Pages / Productivity = Total Duration
-                    - e.g., 8 pages / 4 pages per week = 2 weeks
-                    """,
-    
-    Role.DEVOPS_ENGINEER: """Handles CI/CD, infrastructure, and deployment automation for the book store platform.
-                    IMPORTANT: When responding, always show your work in this format:
-                    Estimated Weeks Required**:
-                    - Total Tasks / Productivity = Total Duration
-                    - e.g., 6 tasks / 2 tasks per week = 3 weeks
-                    """,
-    
-    Role.SECURITY_ENGINEER: """Conducts code reviews, penetration testing, and secures sensitive data for the book store platform.
-                    IMPORTANT: When responding, always show your work in this format:
-                    Estimated Weeks Required**:
-                    - Total Security Tasks / Productivity = Total Duration
-                    - e.g., 3 tasks / 1 task per week = 3 weeks
-                    """,
-    
-    Role.ECOMMERCE_SPECIALIST: """Provides best practices in book cataloging, checkout UX, and promotions for the book store platform.
-                    IMPORTANT: When responding, always show your work in this format:
-                    Estimated Weeks Required**:
-                    - Total Areas / Productivity = Total Duration
-                    - e.g., 6 areas / 2 per week = 3 weeks
-                    """,
-    
-    Role.CUSTOMER: """You are a customer who wants a new book store app. You will describe your requirements for the application.
-                    """
-}
+# Role declared only in a workflow file; behaves like a Role member
+class AgentRole(str):
+    @property
+    def value(self) -> str:
+        return str(self)
+
+def as_role(name: str):
+    """Return the Role member for name, or an AgentRole for roles only a workflow file knows."""
+    try:
+        return Role(name)
+    except ValueError:
+        return AgentRole(name)
+
+# Tables derived from the workflow definition; use_workflow() sets them all
+WORKFLOW = None
+SYSTEM_MESSAGES = {}       # role -> system message
+EXPERT_PROMPTS = {}        # expert -> Scrum Master prompt that hands them their piece of the project
+EXPERT_ROLES = []          # experts in the order the Scrum Master consults them in the serial workflow
+EXPERT_DEPENDENCIES = {}   # expert -> experts whose answers they need, used by the dag mode
+CUSTOMER = INTAKE = COORDINATOR = None
+CUSTOMER_MESSAGE = ""      # the default brief the customer opens the simulation with
+FINAL_SUMMARY_PROMPT = ""  # prompt the Scrum Master receives once every expert has reported
+
+def use_workflow(definition: WorkflowDefinition) -> None:
+    """Make definition the workflow every graph is built from."""
+    global WORKFLOW, SYSTEM_MESSAGES, EXPERT_PROMPTS, EXPERT_ROLES, EXPERT_DEPENDENCIES
+    global CUSTOMER, INTAKE, COORDINATOR, CUSTOMER_MESSAGE, FINAL_SUMMARY_PROMPT
+    WORKFLOW = definition
+    # Role members hash and compare like their values, so the str-keyed tables serve both
+    SYSTEM_MESSAGES = definition.system_messages
+    EXPERT_PROMPTS = definition.prompts
+    EXPERT_ROLES = [as_role(role) for role in definition.experts]
+    EXPERT_DEPENDENCIES = {as_role(role): [as_role(dep) for dep in deps]
+                           for role, deps in definition.dependencies.items()}
+    CUSTOMER = as_role(definition.customer) if definition.customer else None
+    INTAKE = as_role(definition.intake)
+    COORDINATOR = as_role(definition.coordinator)
+    CUSTOMER_MESSAGE = definition.brief
+    FINAL_SUMMARY_PROMPT = definition.final_prompt
+
+use_workflow(load_workflow(DEFAULT_WORKFLOW))
+
+# Reducer used to merge estimates written by parallel expert branches
+def merge_estimates(left: Dict[str, str], right: Dict[str, str]) -> Dict[str, str]:
+    """Merge two estimate dicts, with entries from the right-hand update winning."""
+    merged = dict(left or {})
+    merged.update(right or {})
+    return merged
 
 # Define the state of our workflow
 class AgentState(TypedDict):
-    """Represents the state of the workflow."""
-    messages: Annotated[Sequence[Any], add_messages]
+    """
+    Represents the state of the workflow.
+    
+    messages is a structure-sharing MessageHistory: nodes append to the one
+    they were given instead of copying it, and append_history takes the
+    result without another copy, so each step costs O(1) however long the
+    run. estimates is replaced rather than mutated, so snapshots stay isolated.
+    """
+    messages: Annotated[MessageHistory, append_history]
     sender: str
     receiver: str
     next_agent: Optional[str]
     done: bool
     summary: Optional[str]
-    estimates: Dict[str, str]
+    estimates: Annotated[Dict[str, str], merge_estimates]
 
 # Define the function to initialize the agent state
-def get_initial_state() -> AgentState:
-    """Initialize the agent state."""
+def get_initial_state(brief: Optional[str] = None) -> AgentState:
+    """Initialize the agent state, optionally opening with the customer's project brief."""
     return {
-        "messages": [],
-        "sender": Role.CUSTOMER,
-        "receiver": Role.PRODUCT_OWNER,
-        "next_agent": Role.PRODUCT_OWNER,
+        "messages": MessageHistory([HumanMessage(content=brief)] if brief else []),
+        "sender": CUSTOMER or INTAKE,
+        "receiver": INTAKE,
+        "next_agent": INTAKE,
         "done": False,
         "summary": None,
         "estimates": {}
     }
 
+# Function to format a role's prompt within its token budget
+def fit_context(role: Role, prompt: ChatPromptTemplate, messages: List[Any]) -> str:
+    """
+    Format prompt with messages as the role's prompt text.
+    With a context budget configured, the formatted messages, system message
+    included, are trimmed to the role's budget first.
+    """
+    formatted = prompt.format_messages(messages=messages)
+    if context_window is not None:
+        formatted, report = context_window.trim(role, formatted)
+        print(f"{GREEN}{report.format()}{RESET}")
+    return get_buffer_string(formatted)
+
+# Function to call the LLM on behalf of a role
+def invoke_llm(role: Role, prompt_text: str):
+    """
+    Call the LLM, tagging the call with its role so streams and callbacks can attribute it.
+    Every attempt waits for the shared rate limiter and in-flight cap when those are
+    configured, and llm_caller retries attempts that fail transiently.
+    """
+    def attempt():
+        if rate_limiter is not None:
+            with tracer.span("rate limit wait", "wait"):
+                rate_limiter.acquire_sync(estimate_tokens(prompt_text))
+        with tracer.span("attempt", "llm"):
+            if llm_call_slots is None:
+                return llm.invoke(prompt_text, config={"metadata": {"agent_role": role.value}})
+            with llm_call_slots:
+                return llm.invoke(prompt_text, config={"metadata": {"agent_role": role.value}})
+    
+    with tracer.span(f"llm {role.value}", "llm", role=role.value) as span, \
+            llm_metrics.track(role, prompt_text) as call:
+        call.response = llm_caller.call(attempt, endpoint_of(llm))
+        span["output_chars"] = len(call.response.content)
+    return call.response
+
+# Function to print a complete response unless it was already streamed
+def print_response(role: Role, content: str, from_llm: bool = True) -> None:
+    """
+    Print a role's response. With streaming on, LLM responses were already
+    printed token by token, so only text built without the LLM is printed.
+    """
+    if not stream_output or not from_llm:
+        print(f"\n{BLUE_BOLD}[{role}]{RESET}: {content}")
+
+# Function to check whether the serial relay has collected enough estimates to finish
+def estimates_collected(state: AgentState) -> bool:
+    """True once the Scrum Master's next turn ends the serial workflow."""
+    return len(state["estimates"]) >= WORKFLOW.max_estimates
+
+# Function to build the final summary without an LLM call
+def summarize_locally(estimates: Dict[str, str]) -> AIMessage:
+    """Compute the project timeline from the parsed estimates and EXPERT_DEPENDENCIES."""
+    print(f"\n{GREEN}Agent {COORDINATOR} is computing the timeline locally (no LLM call)...{RESET}")
+    with tracer.span("local summary", "routing"):
+        # Parallel branches merge in completion order; report the experts in their usual order
+        ordered = {role: estimates[role] for role in EXPERT_ROLES if role in estimates}
+        timeline = project_timeline(parse_estimates(ordered), EXPERT_DEPENDENCIES)
+    return AIMessage(content=timeline.format())
+
+# Function to relay to the next expert without an LLM call
+def route_without_llm(state: AgentState, prompt_text: str) -> Optional[AIMessage]:
+    """
+    Record the relay turn the LLM would have answered and return the handoff
+    message for templated routing, or None when the turn adds no message.
+    """
+    routing_savings.add(estimate_tokens(prompt_text))
+    tracer.instant("route without llm", "routing", sender=str(state["sender"]))
+    if routing != "templated":
+        return None
+    receiver = next_expert(state, state["sender"])
+    if receiver is None:
+        return None
+    return AIMessage(content=HANDOFF_TEMPLATE.format(sender=WORKFLOW.agents[state["sender"]].title,
+                                                     receiver=WORKFLOW.agents[receiver].title))
+
 # Function to create an agent that can process and respond to messages
 def create_agent_node(role: Role):
     """Create an agent node for the workflow graph."""
@@ -238,31 +418,51 @@ def create_agent_node(role: Role):
         if role != state["receiver"]:
             return state
         
-        print(f"\n{GREEN}Agent {role} is processing...{RESET}")
+        history = as_history(state["messages"])
         
-        # Create the prompt with system message and history
-        prompt = ChatPromptTemplate.from_messages([
-            ("system", SYSTEM_MESSAGES[role]),
-            MessagesPlaceholder(variable_name="messages"),
-        ])
-        
-        # Run the LLM
-        messages = list(state["messages"])
-        response = llm.invoke(prompt.format(messages=messages))
+        # The Scrum Master's last turn becomes the summary; it can be computed without the LLM
+        if role == COORDINATOR and local_summary and estimates_collected(state):
+            response = summarize_locally(state["estimates"])
+        elif role == COORDINATOR and routing != "llm" and not estimates_collected(state):
+            # The relay's text never affects routing; determine_next_step picks the next expert
+            prompt = ChatPromptTemplate.from_messages([
+                ("system", SYSTEM_MESSAGES[role]),
+                MessagesPlaceholder(variable_name="messages"),
+            ])
+            response = route_without_llm(state, prompt.format(messages=list(history)))
+            if response is not None:
+                print_response(role, response.content, from_llm=False)
+        else:
+            print(f"\n{GREEN}Agent {role} is processing...{RESET}")
+            
+            # Create the prompt with system message and history
+            prompt = ChatPromptTemplate.from_messages([
+                ("system", SYSTEM_MESSAGES[role]),
+                MessagesPlaceholder(variable_name="messages"),
+            ])
+            
+            # Run the LLM
+            response = invoke_llm(role, fit_context(role, prompt, list(history)))
+            
+            # Print the response
+            print_response(role, response.content)
         
-        # Print the response
-        print(f"\n{BLUE_BOLD}[{role}]{RESET}: {response.content}")
+        if response is not None:
+            log_message(role, response)
         
         # Update the state with the response
         new_state = state.copy()
-        new_state["messages"] = messages + [response]
+        new_state["messages"] = history.append(response) if response is not None else history
         
-        # Store the estimate if this is an expert providing an estimate
-        if role != Role.CUSTOMER and role != Role.SCRUM_MASTER and role != Role.PRODUCT_OWNER:
-            new_state["estimates"][role] = response.content
+        # Store the estimate if this is an expert providing an estimate; a new dict keeps
+        # the previous snapshot's estimates untouched
+        if role != CUSTOMER and role != COORDINATOR and role != INTAKE:
+            new_state["estimates"] = {**state["estimates"], role: response.content}
         
         # Determine the next step in the workflow
-        determine_next_step(new_state, role)
+        with tracer.span("determine_next_step", "routing", role=role.value) as span:
+            determine_next_step(new_state, role)
+            span["next_agent"] = new_state["next_agent"]
         
         return new_state
     
@@ -270,89 +470,66 @@ def create_agent_node(role: Role):
 
 # Function to determine the next step in the workflow
 def determine_next_step(state: AgentState, current_role: Role) -> None:
-    """Determine the next agent and receiver based on the current role."""
-    
-    # Define the workflow transitions
-    workflow = {
-        Role.CUSTOMER: (Role.PRODUCT_OWNER, Role.SCRUM_MASTER),
-        Role.PRODUCT_OWNER: (Role.SCRUM_MASTER, Role.UI_UX_DESIGNER),
-        Role.UI_UX_DESIGNER: (Role.SCRUM_MASTER, Role.SOLUTION_ARCHITECT),
-        Role.SOLUTION_ARCHITECT: (Role.SCRUM_MASTER, Role.FRONTEND_DEVELOPER),
-        Role.FRONTEND_DEVELOPER: (Role.SCRUM_MASTER, Role.BACKEND_DEVELOPER),
-        Role.BACKEND_DEVELOPER: (Role.SCRUM_MASTER, Role.RECOMMENDATION_DEVELOPER),
-        Role.RECOMMENDATION_DEVELOPER: (Role.SCRUM_MASTER, Role.QA_ENGINEER),
-        Role.QA_ENGINEER: (Role.SCRUM_MASTER, Role.TECHNICAL_WRITER),
-        Role.TECHNICAL_WRITER: (Role.SCRUM_MASTER, Role.DEVOPS_ENGINEER),
-        Role.DEVOPS_ENGINEER: (Role.SCRUM_MASTER, Role.SECURITY_ENGINEER),
-        Role.SECURITY_ENGINEER: (Role.SCRUM_MASTER, Role.ECOMMERCE_SPECIALIST),
-        Role.ECOMMERCE_SPECIALIST: (Role.SCRUM_MASTER, None),
-        # Keep the original Developer role in the workflow for backward compatibility
-        Role.DEVELOPER: (Role.SCRUM_MASTER, Role.QA_ENGINEER),
-    }
+    """Determine the next agent and receiver from the workflow's routing tables."""
+    previous_sender = state["sender"]
     
     # Update the sender to the current role
     state["sender"] = current_role
     
     # If current role is in our workflow, set the next transitions
-    if current_role in workflow:
-        next_sender, next_receiver = workflow[current_role]
-        state["receiver"] = next_sender
+    if current_role in WORKFLOW.routes:
+        next_sender, next_receiver = WORKFLOW.routes[current_role]
+        state["receiver"] = as_role(next_sender)
         
         # If we've reached the end of our workflow
         if next_receiver is None:
             # Time for the Scrum Master to provide a final summary
-            if current_role == Role.ECOMMERCE_SPECIALIST:
-                customer_message = "Please provide a final summary of the project timeline based on all the estimates collected."
-                state["messages"] = state["messages"] + [HumanMessage(content=customer_message)]
-                state["next_agent"] = "scrum_master"
-                state["receiver"] = Role.SCRUM_MASTER
-            else:
-                state["done"] = True
-                state["next_agent"] = "end"
+            request = HumanMessage(content=FINAL_SUMMARY_PROMPT)
+            log_message(COORDINATOR, request, recipient=COORDINATOR.value)
+            state["messages"] = as_history(state["messages"]).append(request)
+            state["next_agent"] = COORDINATOR.value
+            state["receiver"] = COORDINATOR
         else:
-            state["next_agent"] = next_sender.value
-    elif current_role == Role.SCRUM_MASTER:
+            state["next_agent"] = next_sender
+    elif current_role == COORDINATOR:
         # Handle Scrum Master's special role in coordinating
-        if len(state["estimates"]) >= 7:  # All experts have provided estimates
+        if estimates_collected(state):  # All experts have provided estimates
             state["done"] = True
             state["next_agent"] = "end"
             state["summary"] = state["messages"][-1].content
         else:
-            # Determine who the Scrum Master should talk to next based on collected estimates
-            experts = [Role.UI_UX_DESIGNER, Role.SOLUTION_ARCHITECT, 
-                      Role.FRONTEND_DEVELOPER, Role.BACKEND_DEVELOPER, Role.RECOMMENDATION_DEVELOPER,
-                      Role.QA_ENGINEER, Role.TECHNICAL_WRITER, Role.DEVOPS_ENGINEER, 
-                      Role.SECURITY_ENGINEER, Role.ECOMMERCE_SPECIALIST]
-            
-            for expert in experts:
-                if expert.value not in state["estimates"]:
-                    state["receiver"] = expert
-                    state["next_agent"] = expert.value
-                    
-                    # Prepare a specific message for each role
-                    messages = {
-                        Role.UI_UX_DESIGNER: "I have received the customer's requirements from the Product Owner for the book store project. Define user stories and acceptance criteria for the project. Organize at least 10 user stories, each with a unique ID. Provide work and effort estimates based on the number of stories documented for this sprint. Please show your detailed calculation steps for the estimate.",
-                        Role.SOLUTION_ARCHITECT: "The UI/UX Designer has completed the user stories for our book store application. Design the technical architecture to support these requirements, prioritizing security, scalability, and compliance. Include work and effort estimates based on the number of architectural components designed for this sprint. Please show your detailed calculation steps for the estimate.",
-                        Role.FRONTEND_DEVELOPER: "The Architect has completed the design for our book store platform. Begin implementing the responsive mobile web interfaces and interactive features like book previews and shopping cart. Estimate the number of source lines of code (SLOC) and effort required for the frontend development. Please show your detailed calculation steps for the estimate.",
-                        Role.BACKEND_DEVELOPER: "The Frontend Developer has started their work. Now we need APIs for book catalog, user management, and order processing. Implement the business logic for retail bookstore operations. Estimate the number of source lines of code (SLOC) and effort required for the backend development. Please show your detailed calculation steps for the estimate.",
-                        Role.RECOMMENDATION_DEVELOPER: "With the frontend and backend underway, we now need to implement personalized book recommendation algorithms and user behavior tracking for relevant suggestions. Estimate the number of source lines of code (SLOC) and effort required for the recommendation system. Please show your detailed calculation steps for the estimate.",
-                        Role.DEVELOPER: "The Architect has completed the design for our book store platform. Begin implementing the features based on the user stories and architectural components. Estimate the number of source lines of code (SLOC) and effort required for this sprint's development. Please show your detailed calculation steps for the estimate.",
-                        Role.QA_ENGINEER: "The development phase is complete for our book store application. Create and execute test cases based on user stories. Provide work and effort estimates based on the number of test cases created and executed in this sprint. Please show your detailed calculation steps for the estimate.",
-                        Role.TECHNICAL_WRITER: "Testing is complete for the book store platform. Prepare the user documentation and training materials based on the deliverables of this sprint. Provide work and effort estimates for documentation creation. Please show your detailed calculation steps for the estimate.",
-                        Role.DEVOPS_ENGINEER: "Documentation is complete for the book store platform. Set up the CI/CD pipeline, infrastructure, and deployment automation. Provide work and effort estimates for DevOps setup and automation. Please show your detailed calculation steps for the estimate.",
-                        Role.SECURITY_ENGINEER: "The CI/CD pipeline is set up for the book store platform. Conduct security reviews, implement security measures, and secure sensitive data. Provide work and effort estimates for security implementation. Please show your detailed calculation steps for the estimate.",
-                        Role.ECOMMERCE_SPECIALIST: "The book store platform development is near completion. Provide best practices for book cataloging, checkout UX, and promotions. Provide work and effort estimates for implementing these best practices. Please show your detailed calculation steps for the estimate."
-                    }
-                    
-                    if expert in messages:
-                        state["messages"] = state["messages"] + [HumanMessage(content=messages[expert])]
-                    
-                    break
+            # Hand over to the expert after the one who just reported
+            expert = next_expert(state, previous_sender)
+            if expert is not None:
+                state["receiver"] = expert
+                state["next_agent"] = expert.value
+                request = HumanMessage(content=EXPERT_PROMPTS[expert])
+                log_message(COORDINATOR, request, recipient=expert.value)
+                state["messages"] = as_history(state["messages"]).append(request)
     else:
         # Default to ending the workflow if we don't know what's next
         state["done"] = True
         state["next_agent"] = "end"
 
+# Function to pick the expert the Scrum Master consults next
+def next_expert(state: AgentState, previous_sender) -> Optional[Role]:
+    """Look up the expert after previous_sender, falling back to the first without an estimate."""
+    expert = WORKFLOW.next_expert.get(previous_sender)
+    if expert is not None and expert not in state["estimates"]:
+        return as_role(expert)
+    return next((expert for expert in EXPERT_ROLES if expert not in state["estimates"]), None)
+
+# Function to list the nodes an agent can hand over to in the serial workflow
+def serial_destinations(role: Role) -> List[str]:
+    """Node names determine_next_step can route role to, with "end" for the end of the run."""
+    if role in WORKFLOW.routes:
+        next_sender, next_receiver = WORKFLOW.routes[role]
+        # The last expert hands back to the coordinator for the final summary
+        return [next_sender if next_receiver is not None else COORDINATOR.value]
+    if role == COORDINATOR:
+        return list(WORKFLOW.experts) + ["end"]
+    return ["end"]
+
 # Function to check if the workflow is complete
 def should_end(state: AgentState) -> str:
     """Determine if the workflow should continue or end."""
@@ -360,461 +537,547 @@ def should_end(state: AgentState) -> str:
         return "end"
     return state["next_agent"]
 
-# Function to run the workflow simulation
-def run_simulation():
-    """Run the book store project simulation using LangGraph."""
-    global llm  # Use the global llm variable
-    print(f"\n{GREEN}Running Book Store Project Simulation with LangGraph{RESET}")
+# Function to ask one expert for their estimate outside the serial relay
+def ask_expert(role: Role, history: List[Any]):
+    """Send the Scrum Master's request to an expert and return the request and the response."""
+    print(f"\n{GREEN}Agent {role} is processing...{RESET}")
     
-    # Create nodes for each agent
-    nodes = {}
-    for role in Role:
-        nodes[role.value] = create_agent_node(role)
+    prompt = ChatPromptTemplate.from_messages([
+        ("system", SYSTEM_MESSAGES[role]),
+        MessagesPlaceholder(variable_name="messages"),
+    ])
     
-    # Create the workflow graph
-    workflow = StateGraph(AgentState)
+    # The expert sees the given history plus its own request from the Scrum Master
+    request = HumanMessage(content=EXPERT_PROMPTS[role])
+    log_message(COORDINATOR, request, recipient=role.value)
+    response = invoke_llm(role, fit_context(role, prompt, list(history) + [request]))
+    log_message(role, response)
+    
+    print_response(role, response.content)
+    return request, response
+
+# Function to create an expert node for the parallel estimation mode
+def create_parallel_expert_node(role: Role):
+    """Create an expert node that runs as one branch of the parallel fan-out."""
     
-    # Add nodes to the graph
-    for role in Role:
-        workflow.add_node(role.value, nodes[role.value])
-    
-    # Add START node connected to customer
-    workflow.add_edge(START, "customer")
-    
-    # Add conditional edge for routing from customer
-    workflow.add_conditional_edges(
-        "customer",
-        should_end,
-        {
-            "product_owner": "product_owner",
-            "scrum_master": "scrum_master",
-            "ui_ux_designer": "ui_ux_designer",
-            "solution_architect": "solution_architect",
-            "developer": "developer",
-            "qa_engineer": "qa_engineer",
-            "technical_writer": "technical_writer",
-            "devops_engineer": "devops_engineer",
-            "security_engineer": "security_engineer",
-            "ecommerce_specialist": "ecommerce_specialist",
-            "end": END
+    def expert_node(state: AgentState) -> Dict[str, Any]:
+        """Answer the Scrum Master's prompt for this expert and return only this branch's updates."""
+        request, response = ask_expert(role, state["messages"])
+        
+        # Parallel branches must not write the single-value routing keys;
+        # messages and estimates are merged by their reducers
+        return {
+            "messages": [request, response],
+            "estimates": {role: response.content},
         }
-    )
     
-    # Set up the conditional edges for the rest of the roles
-    for role in Role:
-        if role != Role.CUSTOMER:
-            workflow.add_conditional_edges(
-                role.value,
-                should_end,
-                {
-                    "product_owner": "product_owner",
-                    "scrum_master": "scrum_master",
-                    "ui_ux_designer": "ui_ux_designer",
-                    "solution_architect": "solution_architect",
-                    "developer": "developer",
-                    "frontend_developer": "frontend_developer",
-                    "backend_developer": "backend_developer",
-                    "recommendation_developer": "recommendation_developer",
-                    "qa_engineer": "qa_engineer",
-                    "technical_writer": "technical_writer",
-                    "devops_engineer": "devops_engineer",
-                    "security_engineer": "security_engineer",
-                    "ecommerce_specialist": "ecommerce_specialist",
-                    "end": END
-                }
-            )
-    
-    # Visualize the LangGraph workflow
+    return expert_node
+
+# Function to create the node that schedules experts by their dependencies
+def create_dag_experts_node(dependencies: Optional[Dict[Role, List[Role]]] = None,
+                            experts: Optional[Sequence[Role]] = None):
+    """Create a node that runs every expert as soon as the experts it depends on have answered."""
+    dependencies = dependencies or EXPERT_DEPENDENCIES
+    experts = experts or EXPERT_ROLES
+    # Dependencies on experts left out of this workflow are dropped
+    dependencies = {role: [dep for dep in dependencies.get(role, []) if dep in experts] for role in experts}
+    
+    def experts_node(state: AgentState) -> Dict[str, Any]:
+        """Run the expert DAG and report its critical path and speedup."""
+        history = list(state["messages"])
+        
+        def make_task(role):
+            def task(inputs):
+                # Upstream experts' exchanges are added in dependency order
+                context = list(history)
+                for request, response in inputs.values():
+                    context.extend([request, response])
+                return ask_expert(role, context)
+            return task
+        
+        report = run_dag({role: make_task(role) for role in experts}, dependencies)
+        
+        print(f"\n{GREEN}Expert schedule:{RESET}")
+        print(report.format())
+        
+        messages = []
+        estimates = {}
+        for role in experts:
+            request, response = report.results[role]
+            messages.extend([request, response])
+            estimates[role] = response.content
+        
+        return {"messages": messages, "estimates": estimates}
+    
+    return experts_node
+
+# Function to add a node whose every execution is recorded as a trace span
+def add_traced_node(workflow: StateGraph, name: str, node) -> None:
+    """Add node to workflow under name, wrapped in a tracer span."""
+    @functools.wraps(node)
+    def traced(state):
+        with tracer.span(name, "node"):
+            return node(state)
+    workflow.add_node(name, traced)
+
+# Function to append one message to the transcript log
+def log_message(role, message, **fields) -> None:
+    """Write message to the transcript log under the current run, if the log is enabled."""
+    if transcript_log is not None:
+        transcript_log.write(role, message.content, type=message.type, **fields)
+
+# Function to create the Scrum Master node that joins the parallel branches
+def create_summary_node():
+    """Create the Scrum Master node that summarizes once every expert branch has finished."""
+    
+    def summary_node(state: AgentState) -> Dict[str, Any]:
+        """Produce the final project summary from the merged estimates."""
+        if local_summary:
+            response = summarize_locally(state["estimates"])
+            log_message(COORDINATOR, response)
+            return {
+                "messages": [response],
+                "sender": COORDINATOR,
+                "next_agent": "end",
+                "done": True,
+                "summary": response.content,
+            }
+        
+        print(f"\n{GREEN}Agent {COORDINATOR} is processing...{RESET}")
+        
+        prompt = ChatPromptTemplate.from_messages([
+            ("system", SYSTEM_MESSAGES[COORDINATOR]),
+            MessagesPlaceholder(variable_name="messages"),
+        ])
+        
+        request = HumanMessage(content=FINAL_SUMMARY_PROMPT)
+        messages = list(state["messages"]) + [request]
+        log_message(COORDINATOR, request, recipient=COORDINATOR.value)
+        response = invoke_llm(COORDINATOR, fit_context(COORDINATOR, prompt, messages))
+        log_message(COORDINATOR, response)
+        
+        print_response(COORDINATOR, response.content)
+        
+        return {
+            "messages": [request, response],
+            "sender": COORDINATOR,
+            "next_agent": "end",
+            "done": True,
+            "summary": response.content,
+        }
+    
+    return summary_node
+
+# Function to build the serial workflow graph
+def build_serial_workflow() -> StateGraph:
+    """Build the workflow where the Scrum Master consults each expert in turn."""
+    roles = [as_role(role) for role in WORKFLOW.agents]
+    
+    # Create the workflow graph with a node for each agent
+    workflow = StateGraph(AgentState)
+    for role in roles:
+        add_traced_node(workflow, role.value, create_agent_node(role))
+    
+    # The run starts with the customer, or straight at the intake without one
+    workflow.add_edge(START, (CUSTOMER or INTAKE).value)
+    
+    # Each agent's routing map lists only where determine_next_step can send it,
+    # so the compiled graph (and its diagram) shows the real relay
+    for role in roles:
+        destinations = {name: END if name == "end" else name for name in serial_destinations(role)}
+        workflow.add_conditional_edges(role.value, should_end, destinations)
+    
+    return workflow
+
+# Function to build the parallel workflow graph
+def build_parallel_workflow(experts: Optional[Sequence[Role]] = None) -> StateGraph:
+    """
+    Build the workflow where every expert is dispatched at once.
+    
+    The Product Owner fans out to all experts as parallel branches; the
+    Scrum Master node waits for every branch and writes the final summary,
+    so a run takes as long as the slowest expert rather than the sum of all.
+    """
+    experts = experts or EXPERT_ROLES
+    workflow = StateGraph(AgentState)
+    
+    add_traced_node(workflow, INTAKE.value, create_agent_node(INTAKE))
+    for expert in experts:
+        add_traced_node(workflow, expert.value, create_parallel_expert_node(expert))
+    add_traced_node(workflow, COORDINATOR.value, create_summary_node())
+    
+    workflow.add_edge(START, INTAKE.value)
+    for expert in experts:
+        workflow.add_edge(INTAKE.value, expert.value)
+    
+    # A multi-source edge makes the Scrum Master wait for all branches
+    workflow.add_edge([expert.value for expert in experts], COORDINATOR.value)
+    workflow.add_edge(COORDINATOR.value, END)
+    
+    return workflow
+
+# Function to build the dependency-scheduled workflow graph
+def build_dag_workflow(experts: Optional[Sequence[Role]] = None) -> StateGraph:
+    """
+    Build the workflow where experts are scheduled by EXPERT_DEPENDENCIES.
+    
+    Each expert starts as soon as the experts it depends on have answered and
+    sees their exchanges in its context; experts without dependencies start
+    straight after the Product Owner. The experts share one "experts" node so
+    no expert waits on a LangGraph superstep; it is also checkpointed as one,
+    so a resumed run asks every expert again.
+    """
+    workflow = StateGraph(AgentState)
+    
+    add_traced_node(workflow, INTAKE.value, create_agent_node(INTAKE))
+    add_traced_node(workflow, "experts", create_dag_experts_node(experts=experts))
+    add_traced_node(workflow, COORDINATOR.value, create_summary_node())
+    
+    workflow.add_edge(START, INTAKE.value)
+    workflow.add_edge(INTAKE.value, "experts")
+    workflow.add_edge("experts", COORDINATOR.value)
+    workflow.add_edge(COORDINATOR.value, END)
+    
+    return workflow
+
+# Function to build the workflow graph for an estimation mode
+def build_workflow(mode: str = "serial", experts: Optional[Sequence[Role]] = None) -> StateGraph:
+    """
+    Build the serial, parallel or dag workflow graph.
+    
+    experts selects which experts the parallel and dag graphs consult; the
+    serial relay always follows determine_next_step's fixed order.
+    """
+    if mode == "parallel":
+        return build_parallel_workflow(experts)
+    if mode == "dag":
+        return build_dag_workflow(experts)
+    if experts is not None and list(experts) != EXPERT_ROLES:
+        raise ValueError("The serial workflow consults every expert in a fixed order; "
+                         "use --parallel or --dag for a custom set of experts")
+    return build_serial_workflow()
+
+# A workflow graph compiled once and reused for every brief
+class WorkflowApp:
+    """
+    Compiled workflow returned by workflow_app().
+    
+    invoke, ainvoke and batch take project briefs (or ready-made states) so
+    a long-running process pays for graph construction and compilation once
+    per configuration rather than once per brief.
+    """
+    
+    def __init__(self, mode: str, experts: Optional[Sequence[Role]], model: str, graph: StateGraph, compiled):
+        self.mode = mode
+        self.experts = tuple(experts or EXPERT_ROLES)
+        self.model = model
+        self.graph = graph
+        self.compiled = compiled
+    
+    @staticmethod
+    def _input(brief: Union[str, AgentState, None]) -> Optional[AgentState]:
+        # A string is a brief; a state dict, or None to resume from a checkpoint, is passed through
+        if isinstance(brief, str):
+            return get_initial_state(brief)
+        return brief
+    
+    def invoke(self, brief: Union[str, AgentState, None],
+               config: Optional[Dict[str, Any]] = None) -> AgentState:
+        """Run one brief to completion and return the final state."""
+        return self.compiled.invoke(self._input(brief), config)
+    
+    async def ainvoke(self, brief: Union[str, AgentState, None],
+                      config: Optional[Dict[str, Any]] = None) -> AgentState:
+        """Async version of invoke."""
+        return await self.compiled.ainvoke(self._input(brief), config)
+    
+    def batch(self, briefs: Sequence[Union[str, AgentState]], max_concurrency: Optional[int] = None,
+              return_exceptions: bool = False) -> List[Any]:
+        """Run many briefs with at most max_concurrency in flight; results are in input order."""
+        config = {"max_concurrency": max_concurrency} if max_concurrency else None
+        return self.compiled.batch([self._input(brief) for brief in briefs], config,
+                                   return_exceptions=return_exceptions)
+
+# Function to get the compiled workflow for a configuration, building it on first use
+@functools.lru_cache(maxsize=None)
+def _compiled_workflow(mode: str, experts: Optional[Tuple[Role, ...]], model: str, checkpointer,
+                       definition: WorkflowDefinition) -> WorkflowApp:
+    graph = build_workflow(mode, experts)
+    return WorkflowApp(mode, experts, model, graph, graph.compile(checkpointer=checkpointer))
+
+def workflow_app(mode: str = "serial", experts: Optional[Sequence[Role]] = None,
+                 model: Optional[str] = None, checkpointer=None) -> WorkflowApp:
+    """
+    Return the compiled workflow for this configuration, compiling it only on first use.
+    
+    Apps are cached by mode, experts, model name, checkpointer and the
+    workflow definition in use. Nodes call
+    the module-level llm, so model keeps apps built for different models apart
+    when a process switches between them.
+    """
+    experts = tuple(experts) if experts is not None else None
+    return _compiled_workflow(mode, experts, model or model_name, checkpointer, WORKFLOW)
+
+# Function to run a compiled workflow while printing tokens as they arrive
+def stream_workflow(app, state: Optional[AgentState], config: Optional[Dict[str, Any]] = None) -> AgentState:
+    """
+    Run the workflow with app.stream, printing every LLM token as it arrives.
+    Only chunks from invoke_llm calls (tagged with agent_role) are printed.
+    
+    A role header is printed whenever the stream switches to another role,
+    so concurrent experts in the parallel modes stay attributable. Returns
+    the final state and prints time-to-first-token per role at the end.
+    """
+    tracker = LatencyTracker()
+    final_state = state
+    current_role = None
+    
+    for mode, payload in app.stream(state, stream_mode=["messages", "values"],
+                                    config={**(config or {}), "callbacks": [tracker]}):
+        if mode == "values":
+            final_state = payload
+            continue
+        chunk, metadata = payload
+        role = metadata.get("agent_role")
+        # Messages a node writes without the LLM (e.g. templated handoffs) are printed by print_response
+        if not chunk.content or role is None:
+            continue
+        if role != current_role:
+            print(f"\n\n{BLUE_BOLD}[{role}]{RESET}: ", end="", flush=True)
+            current_role = role
+        print_token(chunk.content)
+    
+    print(f"\n\n{GREEN}Response latency by role:{RESET}")
+    print(tracker.format_table())
+    return final_state
+
+# Function to open the durable checkpointer used for resumable runs
+def open_checkpointer(path: str):
+    """Open a SQLite checkpointer at path, or return None if langgraph-checkpoint-sqlite is missing."""
     try:
-        visualize_langgraph_workflow(workflow)
-    except Exception as e:
-        print(f"\n{GREEN}Could not visualize LangGraph workflow: {e}{RESET}")
+        import sqlite3
+        from langgraph.checkpoint.sqlite import SqliteSaver
+    except ImportError:
+        print(f"{GREEN}Note: langgraph-checkpoint-sqlite not installed; runs will not be resumable.{RESET}")
+        print(f"{GREEN}Install it with: pip install langgraph-checkpoint-sqlite{RESET}")
+        return None
+    return SqliteSaver(sqlite3.connect(path, check_same_thread=False))
+
+# Function to look up the options a checkpointed run was started with
+def checkpointed_options(run_id: str) -> Optional[Dict[str, Any]]:
+    """Return the RESUMED_OPTIONS recorded for run_id, or None if the run has no checkpoint."""
+    if checkpointer is None:
+        return None
+    saved = checkpointer.get_tuple({"configurable": {"thread_id": run_id}})
+    if saved is None:
+        return None
+    return {name: saved.metadata[name] for name in RESUMED_OPTIONS if name in saved.metadata}
+
+# Function to run the workflow simulation
+def run_simulation(mode: str = "serial", visualize: bool = True,
+                   run_id: Optional[str] = None, resume: bool = False, brief: Optional[str] = None):
+    """
+    Run the book store project simulation using LangGraph.
+    
+    mode is "serial" (the Scrum Master relays to each expert in turn),
+    "parallel" (all experts at once) or "dag" (experts scheduled by
+    EXPERT_DEPENDENCIES). visualize=False skips the workflow diagrams.
+    
+    With a checkpointer configured, every completed node is saved under
+    run_id; resume=True continues that run from its last completed node
+    instead of starting again. Parallel branches that finished are kept, but
+    the dag experts are one node and all rerun. brief replaces the default
+    bookstore brief.
+    """
+    global llm  # Use the global llm variable
+    print(f"\n{GREEN}Running Book Store Project Simulation with LangGraph{RESET}")
     
-    # Compile the graph
-    app = workflow.compile()
+    # Create the workflow graph
+    if mode == "parallel":
+        print(f"{GREEN}Parallel estimation mode: dispatching {len(EXPERT_ROLES)} experts concurrently{RESET}")
+    elif mode == "dag":
+        print(f"{GREEN}Dependency-scheduled estimation mode{RESET}")
+    elif routing != "llm":
+        print(f"{GREEN}{routing.capitalize()} routing: Scrum Master relay turns make no LLM call{RESET}")
+    # Built and compiled on the first run with this configuration, reused afterwards
+    with tracer.span("compile workflow", "setup", mode=mode):
+        compiled_workflow = workflow_app(mode, checkpointer=checkpointer)
+    routing_savings.reset()
     
-    # Initialize the state
-    state = get_initial_state()
+    # Draw the compiled graph in the background while the simulation runs
+    diagram = None
+    if visualize:
+        try:
+            with tracer.span("graph topology", "visualization"):
+                diagram = visualize_langgraph_workflow(compiled_workflow)
+            queued = time.perf_counter()
+            diagram.add_done_callback(lambda _: tracer.add("render diagram", "visualization", queued,
+                                                           time.perf_counter(), thread_name="diagram"))
+        except Exception as e:
+            print(f"\n{GREEN}Could not visualize LangGraph workflow: {e}{RESET}")
     
-    # Add the initial customer message
-    customer_message = """I want to build a web-based mobile app for our bookstore where customers can browse books by genre, read previews, purchase books online, track their shipments, review books, and get personalized reading recommendations."""
+    app = compiled_workflow.compiled
     
-    state["messages"] = [HumanMessage(content=customer_message)]
+    # Checkpoints are keyed by run ID; the mode and run options are stored so a resume rebuilds the same run
+    run_id = run_id or uuid.uuid4().hex[:12]
+    llm_metrics.start_run(run_id)
+    if transcript_log is not None:
+        transcript_log.start_run(run_id)
+    config = None
+    if checkpointer is not None:
+        config = {"configurable": {"thread_id": run_id}, "metadata": {**run_options, "mode": mode}}
+        print(f"{GREEN}Run ID: {run_id} (continue after a failure with --resume {run_id}){RESET}")
+    
+    if resume:
+        if config is None:
+            print(f"{GREEN}Cannot resume without a checkpointer.{RESET}")
+            return None
+        snapshot = app.get_state(config)
+        if not snapshot.values:
+            print(f"{GREEN}No checkpoint found for run {run_id}.{RESET}")
+            return None
+        if not snapshot.next:
+            print(f"{GREEN}Run {run_id} already finished; showing its saved result.{RESET}")
+        else:
+            print(f"{GREEN}Resuming run {run_id} at: {', '.join(snapshot.next)}{RESET}")
+            if mode == "dag" and "experts" in snapshot.next:
+                print(f"{GREEN}The dag experts are checkpointed as one node; every expert runs again.{RESET}")
+        # A None input tells LangGraph to continue from the saved checkpoint
+        state = None
+    else:
+        # Initialize the state with the customer's brief
+        state = get_initial_state(brief or CUSTOMER_MESSAGE)
+        if state["messages"]:
+            log_message("brief", state["messages"][0])
     
     # Run the workflow
-    final_state = app.invoke(state)
+    start_time = time.perf_counter()
+    with tracer.span("workflow", "run", mode=mode, run_id=run_id):
+        if stream_output:
+            final_state = stream_workflow(app, state, config)
+        else:
+            final_state = app.invoke(state, config)
+    elapsed = time.perf_counter() - start_time
     
     # Print the final summary
     if "summary" in final_state and final_state["summary"]:
         print(f"\n{GREEN}Final Project Summary:{RESET}")
         print(f"\n{BLUE_BOLD}[Scrum Master - Final Project Summary]{RESET}: {final_state['summary']}")
     
-    # Generate workflow flowchart
-    generate_workflow_flowchart()
+    print(f"\n{GREEN}Workflow finished in {elapsed:.2f}s with {len(final_state['estimates'])} expert estimates{RESET}")
+    
+    if routing_savings.calls:
+        print(f"{GREEN}{routing_savings.format()}{RESET}")
+    
+    # Parse each expert's calculation into a typed estimate and check the arithmetic
+    if final_state["estimates"]:
+        print(f"\n{GREEN}Parsed estimates:{RESET}")
+        print(format_estimates(parse_estimates(final_state["estimates"])))
+    
+    # Show which roles dominate latency and spend
+    if llm_metrics.series():
+        print(f"\n{GREEN}LLM usage by role:{RESET}")
+        print(llm_metrics.format_table())
+    
+    if diagram is not None:
+        report_workflow_diagram(diagram)
+    
+    if transcript_log is not None:
+        transcript_log.flush()
+        print(f"\n{GREEN}Transcript of run {run_id} appended to '{transcript_log.path}'{RESET}")
     
     print(f"\n{GREEN}Book Store Project Simulation Complete!{RESET}")
     return final_state
 
-def generate_workflow_flowchart():
-    """
-    Generate a flowchart visualization of the agent workflow 
+# Function to label the diagram's relay edges from the workflow definition
+def flowchart_edges():
+    """Yield (sender, receiver, label) for every hand-off in the serial relay."""
+    if WORKFLOW.customer:
+        yield WORKFLOW.customer, WORKFLOW.intake, 'Requirements'
+    yield WORKFLOW.intake, WORKFLOW.coordinator, 'Project Requirements'
+    for role in WORKFLOW.experts:
+        request, response = WORKFLOW.labels[role]
+        yield WORKFLOW.coordinator, role, request or 'Request Estimate'
+        yield role, WORKFLOW.coordinator, response or 'Estimates'
+
+# Function to draw the compiled workflow graph
+def visualize_langgraph_workflow(compiled_workflow: "WorkflowApp"):
     """
-    print(f"\n{GREEN}Generating Agent Workflow Flowchart...{RESET}")
-    
-    # Try graphviz first if available
-    if HAS_GRAPHVIZ:
-        try:
-            # Create a new directed graph
-            dot = Digraph(comment='Book Store Project Agent Workflow')
-            
-            # Customize the graph appearance
-            dot.attr('graph', rankdir='TB', size='8,5', ratio='fill', fontsize='16')
-            dot.attr('node', shape='box', style='filled', fillcolor='lightblue', fontname='Arial', fontsize='12')
-            dot.attr('edge', fontname='Arial', fontsize='10', fontcolor='#333333')
-            
-            # Add nodes (agents)
-            dot.node('Customer', 'Customer', fillcolor='#FFCCCB')
-            dot.node('Product_Owner', 'Product Owner', fillcolor='#ADD8E6')
-            dot.node('Scrum_Master', 'Scrum Master', fillcolor='#90EE90')
-            dot.node('UI_UX_Designer', 'UI/UX Designer', fillcolor='#FFFACD')
-            dot.node('Solution_Architect', 'Solution Architect', fillcolor='#D8BFD8')
-            dot.node('Frontend_Developer', 'Frontend Developer', fillcolor='#FFA07A')
-            dot.node('Backend_Developer', 'Backend Developer', fillcolor='#87CEFA')
-            dot.node('Recommendation_Developer', 'Recommendation Developer', fillcolor='#98FB98')
-            dot.node('QA_Engineer', 'QA Engineer', fillcolor='#E6E6FA')
-            dot.node('Technical_Writer', 'Technical Writer', fillcolor='#F0FFF0')
-            
-            # Add new specialized roles
-            dot.node('DevOps_Engineer', 'DevOps Engineer', fillcolor='#FFD700')
-            dot.node('Security_Engineer', 'Security Engineer', fillcolor='#FF6347')
-            dot.node('E_commerce_Specialist', 'E-commerce Specialist', fillcolor='#9370DB')
-            
-            # Add edges (interaction flow)
-            dot.edge('Customer', 'Product_Owner', label='Requirements')
-            dot.edge('Product_Owner', 'Scrum_Master', label='Project\nRequirements')
-            dot.edge('Scrum_Master', 'UI_UX_Designer', label='Define User\nStories')
-            dot.edge('UI_UX_Designer', 'Scrum_Master', label='User Stories\n& Estimates')
-            dot.edge('Scrum_Master', 'Solution_Architect', label='Design\nArchitecture')
-            dot.edge('Solution_Architect', 'Scrum_Master', label='Architecture\n& Estimates')
-            dot.edge('Scrum_Master', 'Frontend_Developer', label='Implement\nFrontend')
-            dot.edge('Frontend_Developer', 'Scrum_Master', label='Frontend\n& Estimates')
-            dot.edge('Scrum_Master', 'Backend_Developer', label='Implement\nBackend')
-            dot.edge('Backend_Developer', 'Scrum_Master', label='Backend\n& Estimates')
-            dot.edge('Scrum_Master', 'Recommendation_Developer', label='Implement\nRecommendations')
-            dot.edge('Recommendation_Developer', 'Scrum_Master', label='Recommendation\n& Estimates')
-            dot.edge('Scrum_Master', 'QA_Engineer', label='Test\nImplementation')
-            dot.edge('QA_Engineer', 'Scrum_Master', label='Testing\n& Estimates')
-            dot.edge('Scrum_Master', 'Technical_Writer', label='Create\nDocumentation')
-            dot.edge('Technical_Writer', 'Scrum_Master', label='Documentation\n& Estimates')
-            
-            # Add edges for new specialized roles
-            dot.edge('Scrum_Master', 'DevOps_Engineer', label='Setup\nCI/CD')
-            dot.edge('DevOps_Engineer', 'Scrum_Master', label='DevOps\n& Estimates')
-            dot.edge('Scrum_Master', 'Security_Engineer', label='Implement\nSecurity')
-            dot.edge('Security_Engineer', 'Scrum_Master', label='Security\n& Estimates')
-            dot.edge('Scrum_Master', 'E_commerce_Specialist', label='Provide\nBest Practices')
-            dot.edge('E_commerce_Specialist', 'Scrum_Master', label='Domain Expertise\n& Estimates')
-            
-            # Save flowchart to a file
-            flowchart_filename = 'book_store_workflow_langgraph'
-            try:
-                dot.render(flowchart_filename, format='png', view=False)
-                print(f"\n{GREEN}Flowchart generated as '{flowchart_filename}.png'{RESET}")
-                print(f"{GREEN}You can view it in the same directory as this script.{RESET}")
-                return True
-            except Exception as render_error:
-                print(f"\n{GREEN}Could not render Graphviz flowchart: {render_error}{RESET}")
-                print(f"\n{GREEN}Trying to save just the DOT file...{RESET}")
-                try:
-                    with open(f"{flowchart_filename}.dot", "w") as f:
-                        f.write(dot.source)
-                    print(f"{GREEN}DOT file saved to '{flowchart_filename}.dot'{RESET}")
-                    print(f"{GREEN}You can render it using: dot -Tpng {flowchart_filename}.dot -o {flowchart_filename}.png{RESET}")
-                    return True
-                except Exception as write_error:
-                    print(f"{GREEN}Could not save DOT file: {write_error}{RESET}")
-        except Exception as e:
-            print(f"\n{GREEN}Error with Graphviz: {e}{RESET}")
-            print(f"\n{GREEN}Trying alternative flowchart method...{RESET}")
+    Start drawing the compiled graph on a background thread and return its Future.
     
-    # Try matplotlib/networkx as an alternative
-    if HAS_MATPLOTLIB:
-        try:
-            # Create a directed graph
-            G = nx.DiGraph()
-            
-            # Add nodes (agents)
-            roles = {
-                'Customer': {'color': '#FFCCCB', 'pos': (0, 8)},
-                'Product Owner': {'color': '#ADD8E6', 'pos': (0, 7)},
-                'Scrum Master': {'color': '#90EE90', 'pos': (0, 6)},
-                'UI/UX Designer': {'color': '#FFFACD', 'pos': (2, 5)},
-                'Solution Architect': {'color': '#D8BFD8', 'pos': (2, 4)},
-                'Frontend Developer': {'color': '#FFA07A', 'pos': (2, 3)},
-                'Backend Developer': {'color': '#87CEFA', 'pos': (2, 2)},
-                'Recommendation Developer': {'color': '#98FB98', 'pos': (2, 1)},
-                'QA Engineer': {'color': '#E6E6FA', 'pos': (2, 0)},
-                'Technical Writer': {'color': '#F0FFF0', 'pos': (2, -1)},
-                'DevOps Engineer': {'color': '#FFD700', 'pos': (2, -2)},
-                'Security Engineer': {'color': '#FF6347', 'pos': (2, -3)},
-                'E-commerce Specialist': {'color': '#9370DB', 'pos': (2, -4)}
-            }
-            
-            # Add nodes
-            for role, attrs in roles.items():
-                G.add_node(role, color=attrs['color'], pos=attrs['pos'])
-            
-            # Add edges with labels
-            edges = [
-                ('Customer', 'Product Owner', {'label': 'Requirements'}),
-                ('Product Owner', 'Scrum Master', {'label': 'Project Requirements'}),
-                ('Scrum Master', 'UI/UX Designer', {'label': 'Define User Stories'}),
-                ('UI/UX Designer', 'Scrum Master', {'label': 'User Stories & Estimates'}),
-                ('Scrum Master', 'Solution Architect', {'label': 'Design Architecture'}),
-                ('Solution Architect', 'Scrum Master', {'label': 'Architecture & Estimates'}),
-                ('Scrum Master', 'Frontend Developer', {'label': 'Implement Frontend'}),
-                ('Frontend Developer', 'Scrum Master', {'label': 'Frontend & Estimates'}),
-                ('Scrum Master', 'Backend Developer', {'label': 'Implement Backend'}),
-                ('Backend Developer', 'Scrum Master', {'label': 'Backend & Estimates'}),
-                ('Scrum Master', 'Recommendation Developer', {'label': 'Implement Recommendations'}),
-                ('Recommendation Developer', 'Scrum Master', {'label': 'Recommendation & Estimates'}),
-                ('Scrum Master', 'QA Engineer', {'label': 'Test Implementation'}),
-                ('QA Engineer', 'Scrum Master', {'label': 'Testing & Estimates'}),
-                ('Scrum Master', 'Technical Writer', {'label': 'Create Documentation'}),
-                ('Technical Writer', 'Scrum Master', {'label': 'Documentation & Estimates'}),
-                ('Scrum Master', 'DevOps Engineer', {'label': 'Setup CI/CD'}),
-                ('DevOps Engineer', 'Scrum Master', {'label': 'DevOps & Estimates'}),
-                ('Scrum Master', 'Security Engineer', {'label': 'Implement Security'}),
-                ('Security Engineer', 'Scrum Master', {'label': 'Security & Estimates'}),
-                ('Scrum Master', 'E-commerce Specialist', {'label': 'Provide Best Practices'}),
-                ('E-commerce Specialist', 'Scrum Master', {'label': 'Domain Expertise & Estimates'})
-            ]
-            
-            G.add_edges_from((u, v, d) for u, v, d in edges)
-            
-            # Set up the plot
-            plt.figure(figsize=(12, 10))
-            pos = nx.get_node_attributes(G, 'pos')
-            
-            # Draw nodes
-            node_colors = [data['color'] for node, data in G.nodes(data=True)]
-            nx.draw_networkx_nodes(G, pos, node_color=node_colors, node_size=3000, alpha=0.8)
-            
-            # Draw edges
-            nx.draw_networkx_edges(G, pos, width=2, alpha=0.7, edge_color='gray', 
-                                  connectionstyle='arc3,rad=0.1', arrowsize=20)
-            
-            # Draw node labels
-            nx.draw_networkx_labels(G, pos, font_size=10, font_family='sans-serif')
-            
-            # Draw edge labels
-            edge_labels = {(u, v): d['label'] for u, v, d in G.edges(data=True)}
-            nx.draw_networkx_edge_labels(G, pos, edge_labels=edge_labels, font_size=8)
-            
-            # Set title
-            plt.title('Book Store Project Workflow', size=15)
-            plt.axis('off')
-            
-            # Save the figure
-            flowchart_filename = 'book_store_workflow_matplotlib_langgraph.png'
-            plt.savefig(flowchart_filename, format='png', dpi=300, bbox_inches='tight')
-            plt.close()
-            
-            print(f"\n{GREEN}Matplotlib flowchart generated as '{flowchart_filename}'{RESET}")
-            print(f"{GREEN}You can view it in the same directory as this script.{RESET}")
-            return True
-            
-        except Exception as e:
-            print(f"\n{GREEN}Error with Matplotlib/NetworkX: {e}{RESET}")
-    
-    # If we reached here, neither method worked
-    print_ascii_workflow()
-    return False
-
-def print_ascii_workflow():
-    """Print a text-based ASCII workflow diagram"""
-    print(f"\n{GREEN}Book Store Project Workflow (ASCII Diagram):{RESET}")
-    print("""
-            +------------+                              
-            |  Customer  |                              
-            +------------+                              
-                  |  Requirements                       
-                  v                                     
-            +------------+                              
-            |  Product   |                              
-            |   Owner    |                              
-            +------------+                              
-                  |  Project Requirements               
-                  v                                     
-            +------------+                              
-            |   Scrum    | ───────────────┐             
-            |   Master   | <──────────────┤             
-            +------------+                |             
-             | ^   | ^   | ^   | ^   | ^   |             
-             | |   | |   | |   | |   | |   |             
-             v |   v |   v |   v |   v |   |             
-    +-------+ | +-+ | +-+ | +-+ | +-+ | +-+             
-    |UI/UX  | | |S| | |D| | |Q| | |T| | |              
-    |Design | | |l| | |v| | | | | |c| | |              
-    |Stories| | |o| | | | | | | | | |              
-    |      |───|u|───|e|───|E|───|h| |              
-    |      | | |t| | |l| | |n| | | | | |              
-    |      | | |i| | |o| | |g| | |W| | |              
-    |      | | |o| | |p| | |i| | |r| | |              
-    |      | | |n| | |e| | |n| | |i| | |              
-    |      | | | | | |r| | |e| | |t| | |              
-    |      | | |A| | | | | |e| | |e| | |              
-    |      | | |r| | | | | |r| | |r| | |              
-    |      | | |c| | | | | | | | | | | |              
-    |      | | |h| | | | | | | | | | | |              
-    +-------+ | +-+ | +-+ | +-+ | +-+ | Final          
-              |     |     |     |     | Summary         
-              |     |     |     |     v                 
-              |     |     |     |    +-----------+      
-              |     |     |     |    | Project   |      
-              |     |     |     |    | Timeline  |      
-              |     |     |     |    +-----------+      
-              |     |     |     |                       
-              |     |     |     |  Test Results         
-              |     |     |     |  & Estimates          
-              |     |     |     v                       
-              |     |     |    +---------+              
-              |     |     |    |   QA    |              
-              |     |     |    | Engineer|              
-              |     |     |    +---------+              
-              |     |     |                             
-              |     |     |  Implementation             
-              |     |     |  & Estimates                
-              |     |     v                             
-              |     |    +---------+                    
-              |     |    |Developer|                    
-              |     |    +---------+                    
-              |     |                                   
-              |     |  Architecture                     
-              |     |  & Estimates                      
-              |     v                                   
-              |    +----------+                         
-              |    |  Solution |                        
-              |    | Architect |                        
-              |    +----------+                         
-              |                                         
-              |  User Stories                           
-              |  & Estimates                            
-              v                                         
-         +----------+                                   
-         |  UI/UX   |                                   
-         | Designer |                                   
-         +----------+                                   
-    """)
-    
-    print(f"\n{GREEN}Workflow Description:{RESET}")
-    print("""
-    ► Customer → Product Owner: Provides requirements
-    ► Product Owner → Scrum Master: Shares project requirements
-    ► Scrum Master → UI/UX Designer: Requests user stories
-    ► UI/UX Designer → Scrum Master: Delivers user stories & estimates
-    ► Scrum Master → Solution Architect: Requests architecture design
-    ► Solution Architect → Scrum Master: Delivers architecture & estimates
-    ► Scrum Master → Frontend Developer: Requests frontend implementation
-    ► Frontend Developer → Scrum Master: Delivers frontend implementation & estimates
-    ► Scrum Master → Backend Developer: Requests backend implementation
-    ► Backend Developer → Scrum Master: Delivers backend implementation & estimates
-    ► Scrum Master → Recommendation Developer: Requests recommendation system
-    ► Recommendation Developer → Scrum Master: Delivers recommendation system & estimates
-    ► Scrum Master → QA Engineer: Requests testing
-    ► QA Engineer → Scrum Master: Delivers testing results & estimates
-    ► Scrum Master → Technical Writer: Requests documentation
-    ► Technical Writer → Scrum Master: Delivers documentation & estimates
-    ► Scrum Master → DevOps Engineer: Requests CI/CD setup
-    ► DevOps Engineer → Scrum Master: Delivers DevOps setup & estimates
-    ► Scrum Master → Security Engineer: Requests security implementation
-    ► Security Engineer → Scrum Master: Delivers security measures & estimates
-    ► Scrum Master → E-commerce Specialist: Requests domain expertise
-    ► E-commerce Specialist → Scrum Master: Delivers best practices & estimates
-    ► Scrum Master: Provides final project summary
-    """)
-
-def visualize_langgraph_workflow(workflow):
-    """Visualize the LangGraph workflow using LangGraph's built-in visualization."""
+    The diagram is cached on disk under a hash of the graph's topology, so an
+    unchanged workflow is never drawn twice.
+    """
+    topology = graph_topology(
+        compiled_workflow.compiled,
+        f"{WORKFLOW.name} ({compiled_workflow.mode})",
+        node_labels={role: spec.title for role, spec in WORKFLOW.agents.items()},
+        node_colors={role: spec.color for role, spec in WORKFLOW.agents.items() if spec.color},
+        edge_labels={(sender, receiver): label for sender, receiver, label in flowchart_edges()},
+    )
+    return render_async(topology)
+
+# Function to report where the workflow diagram was saved
+def report_workflow_diagram(diagram) -> None:
+    """Print the diagram's path without waiting for a render that is still running."""
+    if not diagram.done():
+        print(f"\n{GREEN}Workflow diagram is still rendering in the background.{RESET}")
+        return
     try:
-        from IPython.display import display
-        print(f"\n{GREEN}Generating LangGraph Workflow Visualization...{RESET}")
-        
-        # Try to create and save the graph visualization directly as PNG
-        try:
-            graph_visualization_file = "langgraph_workflow.png"
-            # Check which method is available for saving the graph
-            if hasattr(workflow, "save_graph"):
-                workflow.save_graph(graph_visualization_file, format="png")
-                print(f"\n{GREEN}LangGraph workflow visualization saved to '{graph_visualization_file}'{RESET}")
-                return
-            
-            # If save_graph doesn't work, try other methods
-            if hasattr(workflow, "to_graph") or hasattr(workflow, "get_graph"):
-                # Create a temporary DOT file
-                import tempfile
-                import subprocess
-                
-                with tempfile.NamedTemporaryFile(suffix='.dot', delete=False) as tmp:
-                    tmp_filename = tmp.name
-                    # Use the appropriate method to get the DOT content
-                    if hasattr(workflow, "to_graph"):
-                        tmp.write(workflow.to_graph().encode('utf-8'))
-                    else:  # has get_graph
-                        tmp.write(workflow.get_graph().encode('utf-8'))
-                
-                # Convert DOT to PNG using graphviz if available
-                if HAS_GRAPHVIZ:
-                    from graphviz import Source
-                    graph = Source(open(tmp_filename).read())
-                    graph.format = 'png'
-                    graph.render(filename='langgraph_workflow', cleanup=True)
-                    print(f"\n{GREEN}LangGraph workflow visualization saved to '{graph_visualization_file}'{RESET}")
-                else:
-                    # Try to use command-line graphviz if available
-                    try:
-                        subprocess.run(['dot', '-Tpng', tmp_filename, '-o', graph_visualization_file], 
-                                      check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-                        print(f"\n{GREEN}LangGraph workflow visualization saved to '{graph_visualization_file}'{RESET}")
-                    except (subprocess.SubprocessError, FileNotFoundError):
-                        print(f"\n{GREEN}Could not convert DOT to PNG. Please install Graphviz.{RESET}")
-                        print(f"{GREEN}DOT file saved to '{tmp_filename}'{RESET}")
-                        # Use our alternative visualization
-                        generate_workflow_flowchart()
-                
-                # Try to clean up the temp file
-                try:
-                    import os
-                    os.unlink(tmp_filename)
-                except:
-                    pass
-            else:
-                print(f"\n{GREEN}This version of LangGraph doesn't support graph visualization export{RESET}")
-                # Fall back to our custom visualization
-                generate_workflow_flowchart()
-                
-        except Exception as e:
-            print(f"\n{GREEN}Could not save LangGraph visualization: {str(e)}{RESET}")
-            # Fall back to our custom visualization
-            generate_workflow_flowchart()
-                
-    except ImportError:
-        print(f"\n{GREEN}IPython not available, skipping LangGraph visualization{RESET}")
-        # Fall back to our custom visualization
-        generate_workflow_flowchart()
+        path, cached = diagram.result()
     except Exception as e:
-        print(f"\n{GREEN}Error in LangGraph visualization: {e}{RESET}")
-        # Fall back to our custom visualization
-        generate_workflow_flowchart()
+        print(f"\n{GREEN}Could not draw the workflow diagram: {e}{RESET}")
+        return
+    print(f"\n{GREEN}Workflow diagram {'reused from' if cached else 'saved as'} '{path}'{RESET}")
+    if path.endswith(".dot"):
+        png_path = path[:-len(".dot")] + ".png"
+        print(f"{GREEN}Install Graphviz to render it: dot -Tpng {path} -o {png_path}{RESET}")
 
 # Make sure the file is executable
 if __name__ == "__main__":
-    # Parse command line arguments
-    parser = argparse.ArgumentParser(description='Book Store Project Simulation using LangGraph')
-    parser.add_argument('--api-key', type=str, help='OpenAI API key to use')
-    parser.add_argument('--model', type=str, default='gpt-4o-mini', help='OpenAI model to use (default: gpt-4o-mini)')
-    parser.add_argument('--debug', action='store_true', help='Show debug information')
-    args = parser.parse_args()
+    # args was parsed at the top of the file, before the heavy imports
+    if args.checkpoint or args.resume:
+        checkpointer = open_checkpointer(args.checkpoint_db)
+    
+    # A resumed run must rebuild the graph, routing and context budget it was started with
+    if args.resume:
+        saved_options = checkpointed_options(args.resume)
+        if saved_options is None:
+            print(f"\n{GREEN}No checkpoint found for run {args.resume} in '{args.checkpoint_db}'.{RESET}")
+            exit(1)
+        for name, value in saved_options.items():
+            if name == "role_budget":
+                value = [role_budget(item) for item in value.split(",")] if value else []
+            if value != getattr(args, name):
+                print(f"{GREEN}Resuming with {name} = {value!r}, as run {args.resume} was started{RESET}")
+                setattr(args, name, value)
+    run_options = {name: getattr(args, name) for name in RESUMED_OPTIONS if name != "mode"}
+    # Checkpoint metadata keeps only plain values, so the role budgets are stored as one string
+    run_options["role_budget"] = ",".join(f"{role}={tokens}" for role, tokens in args.role_budget)
+    
+    if args.workflow != DEFAULT_WORKFLOW:
+        try:
+            use_workflow(load_workflow(args.workflow))
+        except (OSError, ValueError) as e:
+            print(f"\n{GREEN}Could not load workflow: {e}{RESET}")
+            exit(1)
+    
+    context_window = context_manager_from_args(args)
+    llm_caller = caller_from_args(args)
+    metrics_prefix = None if args.no_metrics else args.metrics
+    trace_path = args.trace
+    if trace_path:
+        tracer.enable()
+    if args.transcript:
+        transcript_log = TranscriptLog(args.transcript)
+    stream_output = args.stream
+    local_summary = args.local_summary
+    routing = args.routing
+    
+    # Every node's llm call goes through the cache once it is installed globally
+    response_cache = cache_from_args(args)
+    if response_cache is not None:
+        set_llm_cache(response_cache)
 
     # Use command line API key if provided
     if args.api_key:
@@ -825,20 +1088,60 @@ if __name__ == "__main__":
     if args.model:
         model_name = args.model
         
-    # Initialize the LLM
-    llm = initialize_llm(api_key, model_name)
+    # Initialize the LLM; a replay answers from its recording and needs no backend
+    if args.replay:
+        try:
+            llm = replay_llm_from_args(args)
+        except (OSError, ValueError, KeyError) as e:
+            print(f"\n{GREEN}Could not load recording '{args.replay}': {e}{RESET}")
+            exit(1)
+        model_name = llm.model_name or model_name
+    elif args.backend == "fake":
+        llm = fake_llm_from_args(args)
+        model_name = "fake"
+    else:
+        llm = initialize_llm(api_key, model_name, args.base_url, args.call_deadline or None)
     if llm is None:
         print(f"\n{GREEN}Exiting due to LLM initialization failure.{RESET}")
         exit(1)
+    llm = recording_llm_from_args(args, llm)
+    
+    llm_metrics.model = model_name
+    
+    if import_profile is not None:
+        print(f"\n{GREEN}{import_profile.stop().format()}{RESET}")
         
     try:
         print(f"\n{GREEN}Starting Book Store Project Simulation with LangGraph{RESET}")
         print(f"{GREEN}Using model: {model_name}{RESET}")
-        run_simulation()
+        run_simulation(mode=args.mode, visualize=not args.no_visualize,
+                       run_id=args.resume or args.run_id, resume=bool(args.resume))
     except KeyboardInterrupt:
         print(f"\n{GREEN}Simulation interrupted by user.{RESET}")
+    except ReplayMismatchError as e:
+        # A replay that went off script must fail the run, not just report it
+        print(f"\n\033[91m{e}\033[0m")
+        exit(1)
     except Exception as e:
         print(f"\n{GREEN}An error occurred: {e}{RESET}")
         if args.debug:
             import traceback
             traceback.print_exc() 
+    finally:
+        if response_cache is not None:
+            print(f"\n{GREEN}{response_cache.format_stats()}{RESET}")
+        if llm_caller.retries or llm_caller.failures:
+            print(f"\n{GREEN}{llm_caller.format_stats()}{RESET}")
+        # Exported here so a failed or interrupted run keeps the counters of the calls it made
+        if metrics_prefix and llm_metrics.series():
+            json_path, prom_path = llm_metrics.export(metrics_prefix)
+            print(f"\n{GREEN}Metrics written to '{json_path}' and '{prom_path}'{RESET}")
+        if transcript_log is not None:
+            transcript_log.close()
+        if args.record or args.replay:
+            print(f"\n{GREEN}{llm.format_stats()}{RESET}")
+            llm.close()
+        # Written here so a failed or interrupted run, the one most worth tracing, still gets its trace
+        if trace_path:
+            events = tracer.write(trace_path)
+            print(f"\n{GREEN}Trace with {events} events written to '{trace_path}' (open it in https://ui.perfetto.dev){RESET}")
@@ -0,0 +1,122 @@
+"""
+Compact, bounded conversation memory for the LangChain agents
+
+An Agent used to keep its history as two dicts per exchange, each repeating
+its "role" and "sender" keys, and because the agents are module-level
+singletons that history grew across every run in the process. AgentMemory
+keeps one slotted Turn per exchange instead, with sender names interned so
+every turn from the same agent shares one string.
+
+max_turns turns it into a ring buffer: once full, the oldest turn is evicted
+for every new one, and with a spill directory the evicted turns are appended
+to <spill_dir>/<agent name>.jsonl rather than lost. reset() empties the
+memory between runs, so a long-lived worker stays at a flat size.
+
+    memory = AgentMemory("Scrum_Master", max_turns=50, spill_dir="agent_memory")
+    evicted = memory.add("Product_Owner", "Estimate the book store", "About 14 weeks")
+"""
+
+import json
+import os
+import sys
+from collections import deque
+from typing import Any, Dict, Iterator, List, Optional
+
+
+
+class Turn:
+    """One exchange: the incoming message, who sent it, and the agent's response."""
+    __slots__ = ("sender", "message", "response")
+
+    def __init__(self, sender: str, message: str, response: str):
+        self.sender = sys.intern(sender)
+        self.message = message
+        self.response = response
+
+    def __getstate__(self):
+        return (self.sender, self.message, self.response)
+
+    def __setstate__(self, state):
+        sender, self.message, self.response = state
+        self.sender = sys.intern(sender)
+
+    def __repr__(self) -> str:
+        return f"Turn(sender={self.sender!r}, message={self.message!r}, response={self.response!r})"
+
+    def to_dicts(self) -> List[Dict[str, str]]:
+        """The turn as the human and ai message dicts agents used to store."""
+        return [{"role": "human", "sender": self.sender, "content": self.message},
+                {"role": "ai", "content": self.response}]
+
+
+class AgentMemory:
+    """An agent's turns, oldest first, optionally capped at max_turns with evicted turns spilled to disk."""
+
+    def __init__(self, name: str, max_turns: Optional[int] = None, spill_dir: Optional[str] = None):
+        if max_turns is not None and max_turns < 1:
+            raise ValueError("max_turns must be at least 1")
+        self.name = name
+        self.max_turns = max_turns
+        self.spill_path = os.path.join(spill_dir, f"{name}.jsonl") if spill_dir else None
+        self.evicted = 0
+        self._turns: deque = deque()
+        self._spill_file = None
+
+    def add(self, sender: str, message: str, response: str) -> Optional[Turn]:
+        """Store one exchange and return the turn evicted to make room for it, if any."""
+        self._turns.append(Turn(sender, message, response))
+        if self.max_turns is None or len(self._turns) <= self.max_turns:
+            return None
+        evicted = self._turns.popleft()
+        self.evicted += 1
+        if self.spill_path is not None:
+            self._spill(evicted)
+        return evicted
+
+    def _spill(self, turn: Turn) -> None:
+        if self._spill_file is None:
+            os.makedirs(os.path.dirname(self.spill_path) or ".", exist_ok=True)
+            self._spill_file = open(self.spill_path, "a", encoding="utf-8")
+        self._spill_file.write(json.dumps(
+            {"sender": turn.sender, "message": turn.message, "response": turn.response}) + "\n")
+
+    def spilled(self) -> Iterator[Turn]:
+        """Turns evicted to the spill file, oldest first, including those from earlier runs."""
+        if self.spill_path is None or not os.path.exists(self.spill_path):
+            return
+        if self._spill_file is not None:
+            self._spill_file.flush()
+        with open(self.spill_path, encoding="utf-8") as f:
+            for line in f:
+                record = json.loads(line)
+                yield Turn(record["sender"], record["message"], record["response"])
+
+    def reset(self) -> None:
+        """Forget every turn held in memory; the spill file is kept."""
+        self._turns.clear()
+        self.evicted = 0
+        self.close()
+
+    def close(self) -> None:
+        if self._spill_file is not None:
+            self._spill_file.close()
+            self._spill_file = None
+
+    def to_dicts(self) -> List[Dict[str, str]]:
+        """The turns held in memory as role/sender/content dicts, for export."""
+        return [message for turn in self._turns for message in turn.to_dicts()]
+
+    def __len__(self) -> int:
+        return len(self._turns)
+
+    def __iter__(self) -> Iterator[Turn]:
+        return iter(self._turns)
+
+    def __getitem__(self, index: int) -> Turn:
+        return self._turns[index]
+
+    def __getstate__(self) -> Dict[str, Any]:
+        # The open spill file is not pickled; it is reopened on the next eviction
+        state = dict(self.__dict__)
+        state["_spill_file"] = None
+        return state
@@ -0,0 +1,226 @@
+#!/usr/bin/env python3
+"""
+Batch estimation of many project briefs with the LangGraph pipeline
+
+Reads briefs from a JSONL file, one object per line:
+
+    {"id": "bookstore", "brief": "I want to build a web-based mobile app ..."}
+
+(ids must be unique within the file), runs them through the workflow with a bounded number of briefs in flight,
+and appends one result per line to the output JSONL file as soon as each
+brief finishes:
+
+    {"id": "bookstore", "status": "ok", "mode": "parallel",
+     "estimates": {"ui_ux_designer": "...", ...},
+     "parsed": {"ui_ux_designer": {"status": "ok", "duration_weeks": 3.0, ...}, ...},
+     "summary": "...",
+     "timing": {"started_at": "...", "elapsed_s": 41.2}}
+
+Briefs that already have an "ok" result in the output file are skipped, so an
+interrupted batch is resumed by running the same command again; failed
+briefs are retried. The graph is compiled once for the whole batch, and the
+LLM rate limits and in-flight call cap apply to every call in the process, so
+the batch as a whole stays under the provider's limits. Calls that hit a
+429, a 5xx or a dropped connection are retried with jittered backoff, so a
+rate-limit storm slows the batch down instead of failing it.
+
+Usage:
+    python batch.py briefs.jsonl results.jsonl
+    python batch.py briefs.jsonl results.jsonl --mode parallel --max-concurrency 8 --rpm 500 --tpm 200000
+    python batch.py briefs.jsonl results.jsonl --backend fake --fake-latency 0.2
+    python batch.py briefs.jsonl results.jsonl --max-retries 8 --call-deadline 600
+"""
+
+import argparse
+import contextlib
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterator, List, Set
+
+import LangGraph
+from estimates import estimate_to_dict, parse_estimates
+from cli_options import add_backend_arguments, add_metrics_arguments, add_retry_arguments
+from fake_llm import fake_llm_from_args
+from rate_limiter import TokenBucketRateLimiter
+from resilient_llm import caller_from_args
+from workflow_config import add_workflow_arguments, load_workflow
+
+
+class BriefFileError(ValueError):
+    """A line of the input file that is not a usable brief; the message starts with path:line."""
+
+
+def read_briefs(path: str) -> Iterator[Dict[str, str]]:
+    """Yield {"id", "brief"} for every non-empty line; ids default to the line number and must be unique."""
+    seen = set()
+    with open(path) as f:
+        for line_number, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                item = json.loads(line)
+            except json.JSONDecodeError as e:
+                raise BriefFileError(f"{path}:{line_number}: not valid JSON: {e}") from e
+            if not isinstance(item, dict):
+                raise BriefFileError(f"{path}:{line_number}: expected a JSON object")
+            brief = item.get("brief")
+            if not brief:
+                raise BriefFileError(f"{path}:{line_number}: missing 'brief'")
+            brief_id = str(item.get("id", line_number))
+            # Results are matched to briefs by id, so a repeated id would be skipped or counted twice
+            if brief_id in seen:
+                raise BriefFileError(f"{path}:{line_number}: duplicate id '{brief_id}'")
+            seen.add(brief_id)
+            yield {"id": brief_id, "brief": brief}
+
+
+def completed_ids(path: str) -> Set[str]:
+    """Ids that already have a successful result in the output file."""
+    done = set()
+    if not os.path.exists(path):
+        return done
+    with open(path) as f:
+        for line in f:
+            try:
+                result = json.loads(line)
+            except json.JSONDecodeError:
+                # A line cut short by an interrupted run; that brief is simply run again
+                continue
+            if result.get("status") == "ok":
+                done.add(result["id"])
+    return done
+
+
+def _terminate_last_line(path: str) -> None:
+    """Make sure appended results start on a fresh line after an interrupted write."""
+    if not os.path.exists(path) or os.path.getsize(path) == 0:
+        return
+    with open(path, "rb+") as f:
+        f.seek(-1, os.SEEK_END)
+        if f.read(1) != b"\n":
+            f.write(b"\n")
+
+
+def estimate_brief(app, item: Dict[str, str], mode: str) -> Dict[str, Any]:
+    """Run one brief through the compiled workflow and return its result record."""
+    started_at = datetime.now(timezone.utc).isoformat()
+    start = time.perf_counter()
+    try:
+        final_state = app.invoke(item["brief"])
+        # Parsed here so a response the parser trips over fails this brief, not the whole batch
+        parsed = {role: estimate_to_dict(role_estimate)
+                  for role, role_estimate in parse_estimates(final_state["estimates"]).items()}
+    except Exception as e:
+        return {"id": item["id"], "status": "error", "mode": mode, "error": f"{type(e).__name__}: {e}",
+                "timing": {"started_at": started_at, "elapsed_s": time.perf_counter() - start}}
+    return {
+        "id": item["id"],
+        "status": "ok",
+        "mode": mode,
+        "estimates": {getattr(role, "value", role): text for role, text in final_state["estimates"].items()},
+        "parsed": parsed,
+        "summary": final_state.get("summary"),
+        "timing": {"started_at": started_at, "elapsed_s": time.perf_counter() - start},
+    }
+
+
+def run_batch(input_path: str, output_path: str, mode: str = "serial", max_concurrency: int = 4) -> Dict[str, int]:
+    """Run every pending brief and append results to output_path; returns counts by status."""
+    done = completed_ids(output_path)
+    items = list(read_briefs(input_path))
+    pending = [item for item in items if item["id"] not in done]
+    # Results for ids no longer in the input do not count as skipped
+    counts = {"skipped": len(items) - len(pending), "ok": 0, "error": 0}
+    print(f"{len(pending)} briefs to run, {counts['skipped']} already done", file=sys.stderr)
+    if not pending:
+        return counts
+
+    app = LangGraph.workflow_app(mode)
+    _terminate_last_line(output_path)
+    batch_start = time.perf_counter()
+
+    # Node output is per-brief chatter; progress goes to stderr instead
+    with open(output_path, "a") as out, open(os.devnull, "w") as devnull, \
+            contextlib.redirect_stdout(devnull), ThreadPoolExecutor(max_workers=max_concurrency) as executor:
+        futures = [executor.submit(estimate_brief, app, item, mode) for item in pending]
+        for finished, future in enumerate(as_completed(futures), 1):
+            result = future.result()
+            out.write(json.dumps(result) + "\n")
+            out.flush()
+            counts[result["status"]] += 1
+            print(f"[{finished}/{len(pending)}] {result['id']}: {result['status']} "
+                  f"in {result['timing']['elapsed_s']:.1f}s", file=sys.stderr)
+
+    print(f"Batch finished in {time.perf_counter() - batch_start:.1f}s: "
+          f"{counts['ok']} ok, {counts['error']} failed, {counts['skipped']} skipped", file=sys.stderr)
+    return counts
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description='Estimate many project briefs with the LangGraph pipeline')
+    parser.add_argument('input', help='JSONL file of {"id": ..., "brief": ...} objects')
+    parser.add_argument('output', help='JSONL file results are appended to; existing ok results are skipped')
+    parser.add_argument('--mode', choices=['serial', 'parallel', 'dag'], default='serial',
+                        help='Estimation mode for every brief (default: serial)')
+    parser.add_argument('--max-concurrency', type=int, default=4, help='Briefs in flight at once (default: 4)')
+    parser.add_argument('--max-llm-calls', type=int, default=None,
+                        help='LLM calls in flight at once across all briefs (default: unlimited)')
+    parser.add_argument('--local-summary', action='store_true',
+                        help='Compute each timeline from the parsed estimates instead of a final LLM call')
+    parser.add_argument('--rpm', type=float, default=None, help='Requests per minute across all briefs')
+    parser.add_argument('--tpm', type=float, default=None, help='Tokens per minute across all briefs')
+    parser.add_argument('--api-key', type=str, help='OpenAI API key to use')
+    parser.add_argument('--model', type=str, default='gpt-4o-mini', help='OpenAI model to use (default: gpt-4o-mini)')
+    add_backend_arguments(parser)
+    add_retry_arguments(parser)
+    add_metrics_arguments(parser)
+    add_workflow_arguments(parser, LangGraph.DEFAULT_WORKFLOW)
+    args = parser.parse_args(argv)
+    
+    if args.workflow != LangGraph.DEFAULT_WORKFLOW:
+        try:
+            LangGraph.use_workflow(load_workflow(args.workflow))
+        except (OSError, ValueError) as e:
+            print(f"Could not load workflow: {e}", file=sys.stderr)
+            return 1
+
+    if args.backend == "fake":
+        LangGraph.llm = fake_llm_from_args(args)
+        LangGraph.llm_metrics.model = "fake"
+    else:
+        LangGraph.llm_metrics.model = args.model
+        LangGraph.llm = LangGraph.initialize_llm(args.api_key or LangGraph.api_key, args.model,
+                                                 args.base_url, args.call_deadline or None)
+    if LangGraph.llm is None:
+        return 1
+
+    LangGraph.local_summary = args.local_summary
+    LangGraph.llm_caller = caller_from_args(args)
+    if args.rpm or args.tpm:
+        LangGraph.rate_limiter = TokenBucketRateLimiter(args.rpm, args.tpm)
+    if args.max_llm_calls:
+        LangGraph.llm_call_slots = threading.BoundedSemaphore(args.max_llm_calls)
+
+    # Briefs run concurrently, so their calls are reported together under one run
+    LangGraph.llm_metrics.start_run("batch")
+    try:
+        counts = run_batch(args.input, args.output, args.mode, args.max_concurrency)
+    except (OSError, BriefFileError) as e:
+        print(f"Could not run the batch: {e}", file=sys.stderr)
+        return 1
+    if LangGraph.llm_caller.retries or LangGraph.llm_caller.failures:
+        print(LangGraph.llm_caller.format_stats(), file=sys.stderr)
+    if not args.no_metrics:
+        json_path, prom_path = LangGraph.llm_metrics.export(args.metrics)
+        print(f"Metrics for every brief written to '{json_path}' and '{prom_path}'", file=sys.stderr)
+    return 1 if counts["error"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
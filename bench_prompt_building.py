@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark for prompt building in LangChain.Agent.send_message
+
+Compares the old approach, which rebuilt the whole SystemMessage /
+HumanMessage / AIMessage list from the agent's memory on every call, with the
+live append-only prompt the Agent keeps now. The LLM is replaced by an
+in-process stub, so the numbers are pure prompt-building overhead.
+
+Usage:
+    python bench_prompt_building.py
+    python bench_prompt_building.py --turns 1000 --step 100 --repeat 20
+"""
+
+import argparse
+import time
+
+from langchain_core.messages import SystemMessage, HumanMessage, AIMessage
+
+import LangChain
+
+
+class _StubLLM:
+    """Returns a fixed reply without looking at the prompt."""
+
+    def __init__(self):
+        self.reply = AIMessage(content="4 screens / 2 screens per week = 2 weeks")
+
+    def invoke(self, messages):
+        return self.reply
+
+
+def rebuild_messages(agent, message, sender_name):
+    """The previous send_message prompt construction, kept here for comparison."""
+    messages = [SystemMessage(content=agent.system_message)]
+    for turn in agent.memory:
+        messages.append(HumanMessage(content=f"{turn.sender}: {turn.message}"))
+        messages.append(AIMessage(content=turn.response))
+    messages.append(HumanMessage(content=f"{sender_name}: {message}"))
+    return messages
+
+
+def time_call(agent, rebuild, repeat):
+    """Average seconds per send_message at the agent's current history length."""
+    start = time.perf_counter()
+    for _ in range(repeat):
+        if rebuild:
+            LangChain.llm.invoke(rebuild_messages(agent, "How long will it take?", "Scrum_Master"))
+        else:
+            LangChain.llm.invoke(agent.open_turn("How long will it take?", "Scrum_Master"))
+            agent.abort_turn()
+    return (time.perf_counter() - start) / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Prompt-building overhead of Agent.send_message')
+    parser.add_argument('--turns', type=int, default=1000, help='Largest history length to measure (default: 1000)')
+    parser.add_argument('--step', type=int, default=100, help='History length between measurements (default: 100)')
+    parser.add_argument('--repeat', type=int, default=20, help='Calls averaged per measurement (default: 20)')
+    args = parser.parse_args()
+
+    LangChain.llm = _StubLLM()
+    agent = LangChain.Agent("Benchmark_Agent", LangChain.agents["ui_ux_designer"].system_message)
+
+    print(f"{'turns':>6} {'rebuild (us)':>14} {'append (us)':>13} {'ratio':>7}")
+    for turns in range(0, args.turns + 1, args.step):
+        while len(agent.memory) < turns:
+            agent.send_message("Please estimate the next set of screens.", "Scrum_Master")
+        before = time_call(agent, True, args.repeat)
+        after = time_call(agent, False, args.repeat)
+        print(f"{turns:>6} {before * 1e6:>14.1f} {after * 1e6:>13.1f} {before / after:>6.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+"""
+End-to-end benchmark harness for the Book Store Project Simulation
+
+Runs either simulation against the offline FakeChatModel and reports, per run
+and aggregated over N runs:
+
+    wall time           time spent in run_simulation
+    LLM wait            summed duration of every LLM call
+    LLM busy            time during which at least one LLM call was in flight
+    framework overhead  wall time minus LLM busy time
+    LLM calls           number of model calls
+    messages            messages held in the final state / agent memories
+    state size          pickled size of that state in bytes
+
+Simulation output is discarded so only the harness report is printed. No
+network access or API key is needed, so the numbers can be tracked in CI.
+
+Usage:
+    python benchmark.py
+    python benchmark.py --script langgraph --mode parallel --runs 10 --latency 0.05
+    python benchmark.py --script langchain --runs 5 --json bench.json
+"""
+
+import argparse
+import contextlib
+import json
+import os
+import pickle
+import statistics
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+from uuid import UUID
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+from fake_llm import FakeChatModel
+
+
+class LLMTimer(BaseCallbackHandler):
+    """Callback handler recording the start and end of every LLM call."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._starts: Dict[UUID, float] = {}
+        self.intervals: List[Tuple[float, float]] = []
+
+    def on_chat_model_start(self, serialized, messages, *, run_id: UUID, **kwargs: Any) -> None:
+        with self._lock:
+            self._starts[run_id] = time.perf_counter()
+
+    def on_llm_start(self, serialized, prompts, *, run_id: UUID, **kwargs: Any) -> None:
+        with self._lock:
+            self._starts[run_id] = time.perf_counter()
+
+    def on_llm_end(self, response, *, run_id: UUID, **kwargs: Any) -> None:
+        with self._lock:
+            start = self._starts.pop(run_id, None)
+            if start is not None:
+                self.intervals.append((start, time.perf_counter()))
+
+    def on_llm_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:
+        self.on_llm_end(None, run_id=run_id)
+
+    def reset(self) -> None:
+        with self._lock:
+            self._starts.clear()
+            self.intervals = []
+
+    @property
+    def calls(self) -> int:
+        return len(self.intervals)
+
+    @property
+    def wait_time(self) -> float:
+        """Summed duration of all calls; exceeds wall time when calls overlap."""
+        return sum(end - start for start, end in self.intervals)
+
+    @property
+    def busy_time(self) -> float:
+        """Length of the union of all call intervals."""
+        busy = 0.0
+        current_start = current_end = None
+        for start, end in sorted(self.intervals):
+            if current_end is None or start > current_end:
+                if current_end is not None:
+                    busy += current_end - current_start
+                current_start, current_end = start, end
+            else:
+                current_end = max(current_end, end)
+        if current_end is not None:
+            busy += current_end - current_start
+        return busy
+
+
+def _run_langgraph(llm, mode: str) -> Tuple[int, int]:
+    import LangGraph
+    LangGraph.llm = llm
+    final_state = LangGraph.run_simulation(mode=mode, visualize=False)
+    return len(final_state["messages"]), len(pickle.dumps(dict(final_state)))
+
+
+def _run_langchain(llm, mode: str) -> Tuple[int, int]:
+    import LangChain
+    LangChain.llm = llm
+    # run_simulation resets the module-level agents, so every run starts with empty memories
+    LangChain.run_simulation()
+    memories = {agent.name: agent.memory for agent in LangChain.bookstore_agents}
+    # Each turn holds the incoming message and the response
+    return sum(2 * len(memory) for memory in memories.values()), len(pickle.dumps(memories))
+
+
+RUNNERS = {
+    "langgraph": _run_langgraph,
+    "langchain": _run_langchain,
+}
+
+
+def run_once(script: str, mode: str, llm: FakeChatModel, timer: LLMTimer) -> Dict[str, float]:
+    """Run one simulation with output discarded and return its measurements."""
+    timer.reset()
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        start = time.perf_counter()
+        message_count, state_bytes = RUNNERS[script](llm, mode)
+        wall = time.perf_counter() - start
+    return {
+        "wall_s": wall,
+        "llm_wait_s": timer.wait_time,
+        "llm_busy_s": timer.busy_time,
+        "overhead_s": wall - timer.busy_time,
+        "llm_calls": timer.calls,
+        "messages": message_count,
+        "state_bytes": state_bytes,
+    }
+
+
+def summarize(runs: List[Dict[str, float]]) -> Dict[str, Dict[str, float]]:
+    """Mean, median, min and max of every metric over the runs."""
+    summary = {}
+    for metric in runs[0]:
+        values = [run[metric] for run in runs]
+        summary[metric] = {
+            "mean": statistics.fmean(values),
+            "median": statistics.median(values),
+            "min": min(values),
+            "max": max(values),
+        }
+    return summary
+
+
+def _format_value(metric: str, value: float) -> str:
+    if metric.endswith("_s"):
+        return f"{value * 1000:.1f} ms"
+    return f"{value:.0f}"
+
+
+def print_report(runs: List[Dict[str, float]], summary: Dict[str, Dict[str, float]]) -> None:
+    for index, run in enumerate(runs, 1):
+        print(f"run {index}: " + ", ".join(f"{metric}={_format_value(metric, value)}"
+                                           for metric, value in run.items()))
+    print(f"\n{'metric':<12} {'mean':>12} {'median':>12} {'min':>12} {'max':>12}")
+    for metric, stats in summary.items():
+        print(f"{metric:<12} " + " ".join(f"{_format_value(metric, stats[key]):>12}"
+                                          for key in ("mean", "median", "min", "max")))
+
+
+def main(argv: Optional[List[str]] = None) -> Dict[str, Any]:
+    parser = argparse.ArgumentParser(description='Benchmark the simulation orchestration against the offline fake LLM')
+    parser.add_argument('--script', choices=sorted(RUNNERS), default='langgraph',
+                        help='Which simulation to run (default: langgraph)')
+    parser.add_argument('--mode', choices=['serial', 'parallel', 'dag'], default='serial',
+                        help='LangGraph estimation mode (default: serial)')
+    parser.add_argument('--runs', type=int, default=3, help='Number of runs (default: 3)')
+    parser.add_argument('--warmup', type=int, default=1, help='Untimed runs before measuring (default: 1)')
+    parser.add_argument('--latency', type=float, default=0.0, help='Seconds per fake LLM call (default: 0)')
+    parser.add_argument('--output-tokens', type=int, default=120, help='Words per fake response (default: 120)')
+    parser.add_argument('--json', type=str, default=None, metavar='PATH', help='Also write the results as JSON')
+    args = parser.parse_args(argv)
+
+    timer = LLMTimer()
+    llm = FakeChatModel(latency=args.latency, output_tokens=args.output_tokens, callbacks=[timer])
+
+    for _ in range(args.warmup):
+        run_once(args.script, args.mode, llm, timer)
+    runs = [run_once(args.script, args.mode, llm, timer) for _ in range(args.runs)]
+    summary = summarize(runs)
+
+    print(f"{args.script} ({args.mode}), {args.runs} runs, fake latency {args.latency}s, "
+          f"{args.output_tokens} words per response\n")
+    print_report(runs, summary)
+
+    results = {"config": vars(args), "runs": runs, "summary": summary}
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"\nResults written to '{args.json}'")
+    return results
+
+
+if __name__ == "__main__":
+    main()
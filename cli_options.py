@@ -0,0 +1,125 @@
+"""
+Command line options shared by the simulation scripts
+
+Only the standard library is imported here, so a script can build its parser
+and answer --help before the LangChain stack is loaded. Scripts import the
+add_*_arguments helpers from here; the modules that act on the options
+(fake_llm, context_window, llm_cache, ...) build their objects from the
+parsed arguments.
+"""
+
+import argparse
+from typing import Tuple
+
+# Response cache defaults, also used by llm_cache.SQLiteResponseCache
+DEFAULT_CACHE_PATH = ".llm_cache.sqlite"
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+DEFAULT_TTL_SECONDS = 7 * 24 * 3600
+
+# Retry and circuit breaker defaults for resilient_llm.ResilientCaller
+DEFAULT_MAX_RETRIES = 4
+DEFAULT_CALL_DEADLINE = 300.0
+
+# File prefix the per-role LLM metrics are exported under (.json and .prom)
+DEFAULT_METRICS_PREFIX = "llm_metrics"
+
+# Append-only JSONL log every simulation message is written to; its offset index sits next to it
+DEFAULT_TRANSCRIPT_PATH = "transcripts.jsonl"
+
+# Directory agent_memory.AgentMemory spills evicted turns to with a bare --memory-spill
+DEFAULT_MEMORY_SPILL_DIR = "agent_memory"
+
+# Names of the trimming strategies in context_window.STRATEGIES
+CONTEXT_STRATEGIES = ("last_n", "pinned", "summary")
+DEFAULT_CONTEXT_STRATEGY = "pinned"
+
+
+def add_backend_arguments(parser: argparse.ArgumentParser) -> None:
+    """Add the LLM backend command line options shared by both simulations."""
+    parser.add_argument('--backend', choices=['openai', 'fake'], default='openai',
+                        help='LLM backend: the OpenAI API or an offline deterministic stub (default: openai)')
+    parser.add_argument('--base-url', type=str, default=None,
+                        help='OpenAI-compatible API base URL, e.g. a local stub server (default: the OpenAI API)')
+    parser.add_argument('--fake-latency', type=float, default=0.0,
+                        help='Seconds each fake LLM call takes (default: 0)')
+    parser.add_argument('--fake-output-tokens', type=int, default=120,
+                        help='Approximate words in each fake LLM response (default: 120)')
+
+
+def role_budget(value: str) -> Tuple[str, int]:
+    """Parse one --role-budget ROLE=TOKENS value into (role, tokens)."""
+    role, _, tokens = value.partition("=")
+    if not role or not tokens.isdigit():
+        raise argparse.ArgumentTypeError(f"expected ROLE=TOKENS, got '{value}'")
+    return role, int(tokens)
+
+
+def add_context_arguments(parser: argparse.ArgumentParser) -> None:
+    """Add the context-window command line options shared by both simulations."""
+    parser.add_argument('--context-budget', type=int, default=None,
+                        help='Token budget for each prompt history (default: unlimited)')
+    parser.add_argument('--context-strategy', choices=sorted(CONTEXT_STRATEGIES), default=DEFAULT_CONTEXT_STRATEGY,
+                        help='How to fit a history into its budget (default: pinned)')
+    parser.add_argument('--role-budget', type=role_budget, action='append', default=[], metavar='ROLE=TOKENS',
+                        help='Token budget for one workflow role, e.g. ui_ux_designer=2000, overriding '
+                             '--context-budget (repeatable)')
+
+
+def add_cache_arguments(parser: argparse.ArgumentParser) -> None:
+    """Add the response cache command line options shared by both simulations."""
+    parser.add_argument('--cache', nargs='?', const=DEFAULT_CACHE_PATH, default=None, metavar='PATH',
+                        help=f'Cache LLM responses on disk (default path: {DEFAULT_CACHE_PATH})')
+    parser.add_argument('--cache-max-mb', type=float, default=DEFAULT_MAX_BYTES / (1024 * 1024),
+                        help='Evict least recently used responses beyond this size (default: 256)')
+    parser.add_argument('--cache-ttl-hours', type=float, default=DEFAULT_TTL_SECONDS / 3600,
+                        help='Expire cached responses after this many hours (default: 168)')
+
+
+def add_retry_arguments(parser: argparse.ArgumentParser) -> None:
+    """Add the retry and circuit breaker command line options shared by every script that calls the LLM."""
+    parser.add_argument('--max-retries', type=int, default=DEFAULT_MAX_RETRIES,
+                        help=f'Retries of a failed LLM call on 429, 5xx or connection errors (default: {DEFAULT_MAX_RETRIES})')
+    parser.add_argument('--retry-base-delay', type=float, default=0.5,
+                        help='Upper bound of the first jittered backoff in seconds; doubles per retry (default: 0.5)')
+    parser.add_argument('--retry-max-delay', type=float, default=30.0,
+                        help='Largest jittered backoff in seconds (default: 30)')
+    parser.add_argument('--call-deadline', type=float, default=DEFAULT_CALL_DEADLINE,
+                        help=f'Seconds one LLM call may take including retries; 0 for no limit (default: {DEFAULT_CALL_DEADLINE:g})')
+    parser.add_argument('--breaker-threshold', type=int, default=5,
+                        help='Consecutive failures that open the circuit breaker (default: 5)')
+    parser.add_argument('--breaker-reset', type=float, default=30.0,
+                        help='Seconds the breaker stays open before a probe call (default: 30)')
+
+
+def add_metrics_arguments(parser: argparse.ArgumentParser) -> None:
+    """Add the LLM metrics export options shared by both simulations."""
+    parser.add_argument('--metrics', type=str, default=DEFAULT_METRICS_PREFIX, metavar='PREFIX',
+                        help=f'Write per-role LLM metrics to PREFIX.json and PREFIX.prom (default: {DEFAULT_METRICS_PREFIX})')
+    parser.add_argument('--no-metrics', action='store_true', help='Do not write the metrics files')
+
+
+def add_replay_arguments(parser: argparse.ArgumentParser) -> None:
+    """Add the record and replay options shared by both simulations."""
+    group = parser.add_mutually_exclusive_group()
+    group.add_argument('--record', type=str, default=None, metavar='PATH',
+                       help='Record every LLM request and response of this run to PATH (JSONL); --cache is bypassed')
+    group.add_argument('--replay', type=str, default=None, metavar='PATH',
+                       help='Answer every LLM call from a --record file instead of the backend; a prompt '
+                            'that is not in the recording is an error')
+    parser.add_argument('--replay-latency', choices=['original', 'zero'], default='original',
+                        help='Wait as long as each recorded call took, or answer at once (default: original)')
+
+
+def add_transcript_arguments(parser: argparse.ArgumentParser) -> None:
+    """Add the transcript log options shared by both simulations."""
+    parser.add_argument('--transcript', nargs='?', const=DEFAULT_TRANSCRIPT_PATH, default=None, metavar='PATH',
+                        help=f'Append every message to a JSONL log indexed by run and role (default path: '
+                             f'{DEFAULT_TRANSCRIPT_PATH}); the log grows with every run and is never pruned')
+
+
+def add_memory_arguments(parser: argparse.ArgumentParser) -> None:
+    """Add the agent memory options of the LangChain simulation."""
+    parser.add_argument('--memory-turns', type=int, default=None, metavar='N',
+                        help='Keep only the last N turns in each agent\'s memory and prompt (default: unlimited)')
+    parser.add_argument('--memory-spill', nargs='?', const=DEFAULT_MEMORY_SPILL_DIR, default=None, metavar='DIR',
+                        help=f'Append turns evicted by --memory-turns to DIR/<agent>.jsonl (default dir: {DEFAULT_MEMORY_SPILL_DIR})')
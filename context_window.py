@@ -0,0 +1,287 @@
+"""
+Token-budgeted context windows for agent prompts
+
+Both simulations send an agent's whole conversation history with every call,
+so prompt tokens grow with every turn. A ContextWindowManager holds a token
+budget per role and a pluggable strategy for fitting the history into it:
+
+    last_n   keep the system message and the most recent N messages
+    pinned   keep the system message, pinned messages (by default the
+             customer brief) and as many recent messages as fit
+    summary  keep the most recent messages and roll everything older into
+             one summary message
+
+Every trim returns a TrimReport with the token count before and after, so
+callers can print or record what each call actually cost.
+
+Token counts use tiktoken when it is installed and a characters-per-token
+estimate otherwise.
+"""
+
+import argparse
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from langchain_core.messages import BaseMessage, SystemMessage, HumanMessage
+
+from rate_limiter import CHARS_PER_TOKEN
+
+# Approximate per-message framing overhead of the chat format
+TOKENS_PER_MESSAGE = 4
+
+_encoding = None
+_encoding_loaded = False
+
+
+def _get_encoding():
+    """Load the tiktoken encoding on first use; None if tiktoken is unavailable."""
+    global _encoding, _encoding_loaded
+    if not _encoding_loaded:
+        _encoding_loaded = True
+        try:
+            import tiktoken
+            _encoding = tiktoken.get_encoding("o200k_base")
+        except Exception:
+            _encoding = None
+    return _encoding
+
+
+@lru_cache(maxsize=8192)
+def count_text_tokens(text: str) -> int:
+    """Count the tokens in one string; results are cached because history is re-counted every call."""
+    encoding = _get_encoding()
+    if encoding is not None:
+        return len(encoding.encode(text))
+    return len(text) // CHARS_PER_TOKEN
+
+
+def _content(message: BaseMessage) -> str:
+    return message.content if isinstance(message.content, str) else str(message.content)
+
+
+def count_tokens(messages: Sequence[BaseMessage]) -> int:
+    """Count the tokens in a list of messages, including per-message framing."""
+    return sum(count_text_tokens(_content(m)) + TOKENS_PER_MESSAGE for m in messages)
+
+
+def pin(message: BaseMessage) -> BaseMessage:
+    """Mark a message so the pinned strategy never drops it."""
+    message.additional_kwargs["pinned"] = True
+    return message
+
+
+def _split_system(messages: Sequence[BaseMessage]) -> Tuple[List[BaseMessage], Sequence[BaseMessage]]:
+    """Split off the leading system messages, which every strategy keeps."""
+    index = 0
+    while index < len(messages) and isinstance(messages[index], SystemMessage):
+        index += 1
+    return list(messages[:index]), messages[index:]
+
+
+def _fit_tail(messages: Sequence[BaseMessage], budget: int) -> List[BaseMessage]:
+    """Keep the longest suffix of ``messages`` that fits ``budget`` tokens."""
+    kept = []
+    for message in reversed(messages):
+        cost = count_tokens([message])
+        if cost > budget:
+            break
+        kept.append(message)
+        budget -= cost
+    kept.reverse()
+    return kept
+
+
+class TrimStrategy(ABC):
+    """Base class for strategies that fit a message history into a token budget."""
+    name = "none"
+
+    @abstractmethod
+    def trim(self, messages: Sequence[BaseMessage], budget: int) -> List[BaseMessage]:
+        """The messages to send, fitting budget tokens where the strategy can."""
+
+
+class KeepLastN(TrimStrategy):
+    """Keep the system message and the most recent ``n`` messages that fit the budget."""
+    name = "last_n"
+
+    def __init__(self, n: int = 8):
+        self.n = n
+
+    def trim(self, messages, budget):
+        head, rest = _split_system(messages)
+        tail = rest[-self.n:] if self.n > 0 else []
+        return head + _fit_tail(tail, budget - count_tokens(head))
+
+
+def _default_pinned(index: int, message: BaseMessage) -> bool:
+    """The first non-system message is the brief; anything marked with pin() is kept too."""
+    return index == 0 or bool(message.additional_kwargs.get("pinned"))
+
+
+class KeepPinned(TrimStrategy):
+    """Keep the system message and pinned messages, then fill the budget with the most recent turns."""
+    name = "pinned"
+
+    def __init__(self, is_pinned: Optional[Callable[[int, BaseMessage], bool]] = None):
+        self.is_pinned = is_pinned or _default_pinned
+
+    def trim(self, messages, budget):
+        head, rest = _split_system(messages)
+        pinned = [i for i, m in enumerate(rest) if self.is_pinned(i, m)]
+        remaining = budget - count_tokens(head) - count_tokens([rest[i] for i in pinned])
+
+        kept = set(pinned)
+        for index in range(len(rest) - 1, -1, -1):
+            if index in kept:
+                continue
+            cost = count_tokens([rest[index]])
+            if cost > remaining:
+                break
+            kept.add(index)
+            remaining -= cost
+        return head + [rest[i] for i in sorted(kept)]
+
+
+def extractive_summary(messages: Sequence[BaseMessage]) -> str:
+    """
+    Summarize turns locally without an LLM call.
+
+    Estimate calculation lines ("X / Y = Z") are kept verbatim since they are
+    what later roles build on; other messages are cut to their first line.
+    """
+    lines = []
+    for message in messages:
+        speaker = message.name or message.type
+        text = _content(message)
+        calculations = [line.strip() for line in text.splitlines() if "/" in line and "=" in line]
+        if calculations:
+            lines.extend(f"{speaker}: {line}" for line in calculations)
+        else:
+            first_line = text.strip().split("\n", 1)[0]
+            lines.append(f"{speaker}: {first_line[:200]}")
+    return "\n".join(lines)
+
+
+def llm_summarizer(llm) -> Callable[[Sequence[BaseMessage]], str]:
+    """Build a summarizer that asks ``llm`` to condense the older turns."""
+    def summarize(messages):
+        transcript = "\n\n".join(f"{m.name or m.type}: {_content(m)}" for m in messages)
+        request = HumanMessage(content=(
+            "Summarize this conversation in a few lines. Keep every estimate and its calculation "
+            "(e.g. '6 tasks / 2 per week = 3 weeks') exactly as written.\n\n" + transcript
+        ))
+        return llm.invoke([request]).content
+    return summarize
+
+
+class SummarizeOlder(TrimStrategy):
+    """Keep the most recent messages and replace everything older with one summary message."""
+    name = "summary"
+
+    def __init__(self, keep_last: int = 4,
+                 summarizer: Optional[Callable[[Sequence[BaseMessage]], str]] = None):
+        self.keep_last = keep_last
+        self.summarizer = summarizer or extractive_summary
+        self._cache = {}
+
+    def _summary_for(self, older: Sequence[BaseMessage]) -> str:
+        # Successive calls usually summarize the same prefix, so reuse the last result
+        key = (len(older), hash(tuple(_content(m) for m in older)))
+        if key not in self._cache:
+            self._cache = {key: self.summarizer(older)}
+        return self._cache[key]
+
+    def trim(self, messages, budget):
+        head, rest = _split_system(messages)
+        budget -= count_tokens(head)
+        recent = _fit_tail(rest[-self.keep_last:] if self.keep_last > 0 else [], budget)
+        older = rest[:len(rest) - len(recent)]
+        if not older:
+            return head + recent
+
+        remaining = budget - count_tokens(recent) - TOKENS_PER_MESSAGE
+        if remaining <= 0:
+            return head + recent
+        summary = self._summary_for(older)
+        summary = "Summary of the earlier conversation:\n" + summary
+        if count_text_tokens(summary) > remaining:
+            summary = summary[:remaining * CHARS_PER_TOKEN]
+        return head + [SystemMessage(content=summary)] + recent
+
+
+STRATEGIES = {
+    KeepLastN.name: KeepLastN,
+    KeepPinned.name: KeepPinned,
+    SummarizeOlder.name: SummarizeOlder,
+}
+
+
+@dataclass
+class TrimReport:
+    """Token and message counts of one prompt before and after trimming."""
+    role: str
+    strategy: str
+    budget: Optional[int]
+    tokens_before: int
+    tokens_after: int
+    messages_before: int
+    messages_after: int
+
+    @property
+    def trimmed(self) -> bool:
+        return self.messages_after != self.messages_before or self.tokens_after != self.tokens_before
+
+    def format(self) -> str:
+        return (f"[context] {self.role}: {self.tokens_before} -> {self.tokens_after} tokens, "
+                f"{self.messages_before} -> {self.messages_after} messages "
+                f"(budget {self.budget}, {self.strategy})")
+
+
+def _role_key(role) -> str:
+    return getattr(role, "value", role)
+
+
+class ContextWindowManager:
+    """Per-role token budgets and trimming strategies for prompt histories."""
+
+    def __init__(self, default_budget: Optional[int] = None, budgets: Optional[Dict[str, int]] = None,
+                 strategy: Optional[TrimStrategy] = None, strategies: Optional[Dict[str, TrimStrategy]] = None):
+        self.default_budget = default_budget
+        self.budgets = {_role_key(role): budget for role, budget in (budgets or {}).items()}
+        self.strategy = strategy or KeepPinned()
+        self.strategies = {_role_key(role): s for role, s in (strategies or {}).items()}
+
+    def budget_for(self, role) -> Optional[int]:
+        return self.budgets.get(_role_key(role), self.default_budget)
+
+    def strategy_for(self, role) -> TrimStrategy:
+        return self.strategies.get(_role_key(role), self.strategy)
+
+    def trim(self, role, messages: Sequence[BaseMessage]) -> Tuple[Sequence[BaseMessage], TrimReport]:
+        """
+        Fit ``messages`` into the role's budget.
+
+        The input is returned unchanged (not copied) when it already fits or
+        the role has no budget.
+        """
+        budget = self.budget_for(role)
+        strategy = self.strategy_for(role)
+        before = count_tokens(messages)
+        if budget is None or before <= budget:
+            trimmed = messages
+        else:
+            trimmed = strategy.trim(messages, budget)
+        report = TrimReport(str(_role_key(role)), strategy.name, budget,
+                            before, count_tokens(trimmed) if trimmed is not messages else before,
+                            len(messages), len(trimmed))
+        return trimmed, report
+
+
+def context_manager_from_args(args: argparse.Namespace) -> Optional[ContextWindowManager]:
+    """Build a ContextWindowManager from parsed command line options, or None if no budget is set."""
+    budgets = dict(args.role_budget)
+    if args.context_budget is None and not budgets:
+        return None
+    return ContextWindowManager(args.context_budget, budgets, STRATEGIES[args.context_strategy]())
@@ -0,0 +1,180 @@
+"""
+Dependency-aware task scheduler for the Book Store Project Simulation
+
+Runs a set of tasks on a thread pool, starting each task as soon as every
+task it depends on has finished. After the run it reports the critical path
+(the longest chain of dependent tasks by measured duration) and the speedup
+over running the same tasks one after another.
+"""
+
+import contextvars
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Hashable, List, Mapping, Optional, Sequence, Tuple
+
+
+def topological_order(dependencies: Mapping[Hashable, Sequence[Hashable]]) -> List[Hashable]:
+    """
+    Order the tasks so that every task comes after all of its dependencies.
+
+    Ties are broken by the order in which tasks appear in ``dependencies``,
+    so a chain that is already valid keeps its declared order.
+    Raises ValueError on unknown dependencies or cycles.
+    """
+    for task, deps in dependencies.items():
+        for dep in deps:
+            if dep not in dependencies:
+                raise ValueError(f"{task} depends on unknown task {dep}")
+
+    order = []
+    placed = set()
+    remaining = list(dependencies)
+    while remaining:
+        ready = [task for task in remaining if all(dep in placed for dep in dependencies[task])]
+        if not ready:
+            raise ValueError(f"Dependency cycle between: {', '.join(str(task) for task in remaining)}")
+        for task in ready:
+            order.append(task)
+            placed.add(task)
+        remaining = [task for task in remaining if task not in placed]
+    return order
+
+
+def ancestors(dependencies: Mapping[Hashable, Sequence[Hashable]], task: Hashable) -> List[Hashable]:
+    """Return every task that ``task`` depends on directly or transitively, in dependency order."""
+    seen = set()
+    stack = list(dependencies[task])
+    while stack:
+        dep = stack.pop()
+        if dep not in seen:
+            seen.add(dep)
+            stack.extend(dependencies[dep])
+    return [t for t in topological_order(dependencies) if t in seen]
+
+
+def critical_path(dependencies: Mapping[Hashable, Sequence[Hashable]],
+                  durations: Mapping[Hashable, float]) -> Tuple[List[Hashable], float]:
+    """
+    Find the longest chain of dependent tasks.
+
+    Returns the tasks on the chain in execution order and the sum of their
+    durations, which is the lower bound on wall-clock time for the set.
+    """
+    finish = {}
+    previous = {}
+    for task in topological_order(dependencies):
+        start = 0.0
+        previous[task] = None
+        for dep in dependencies[task]:
+            if finish[dep] > start:
+                start = finish[dep]
+                previous[task] = dep
+        finish[task] = start + durations.get(task, 0.0)
+
+    if not finish:
+        return [], 0.0
+
+    last = max(finish, key=finish.get)
+    path = []
+    while last is not None:
+        path.append(last)
+        last = previous[last]
+    path.reverse()
+    return path, sum(durations.get(task, 0.0) for task in path)
+
+
+@dataclass
+class TaskTiming:
+    """Start and end of one task, in seconds relative to the start of the run."""
+    start: float
+    end: float
+
+    @property
+    def duration(self) -> float:
+        return self.end - self.start
+
+
+@dataclass
+class ScheduleReport:
+    """Results and timing of one scheduled run."""
+    results: Dict[Hashable, Any]
+    timings: Dict[Hashable, TaskTiming]
+    wall_time: float
+    critical_path: List[Hashable] = field(default_factory=list)
+    critical_path_time: float = 0.0
+
+    @property
+    def serial_time(self) -> float:
+        """Time the same tasks would take run one after another."""
+        return sum(timing.duration for timing in self.timings.values())
+
+    @property
+    def speedup(self) -> float:
+        """Speedup of the scheduled run over the serial order."""
+        if self.wall_time <= 0:
+            return 1.0
+        return self.serial_time / self.wall_time
+
+    def format(self) -> str:
+        """Render the report as a few lines of plain text."""
+        path = " -> ".join(str(getattr(task, "value", task)) for task in self.critical_path)
+        lines = [
+            f"Critical path: {path} ({self.critical_path_time:.2f}s)",
+            f"Wall time: {self.wall_time:.2f}s, serial order: {self.serial_time:.2f}s, "
+            f"speedup: {self.speedup:.2f}x",
+        ]
+        for task, timing in sorted(self.timings.items(), key=lambda item: item[1].start):
+            lines.append(f"  {getattr(task, 'value', task)}: "
+                         f"{timing.start:.2f}s -> {timing.end:.2f}s ({timing.duration:.2f}s)")
+        return "\n".join(lines)
+
+
+def run_dag(tasks: Mapping[Hashable, Callable[[Dict[Hashable, Any]], Any]],
+            dependencies: Mapping[Hashable, Sequence[Hashable]],
+            max_workers: Optional[int] = None) -> ScheduleReport:
+    """
+    Run ``tasks`` as soon as their dependencies are satisfied.
+
+    Each task is called with a dict holding the results of every task it
+    depends on directly or transitively, in dependency order. Tasks missing
+    from ``dependencies`` are treated as having none. If a task raises, no
+    further tasks are started and the exception propagates once the tasks
+    already running have finished.
+    """
+    dependencies = {task: list(dependencies.get(task, [])) for task in tasks}
+    order = topological_order(dependencies)
+    upstream = {task: ancestors(dependencies, task) for task in order}
+
+    results = {}
+    timings = {}
+    pending = list(order)
+    running = {}
+    run_start = time.perf_counter()
+
+    def timed(task, inputs):
+        start = time.perf_counter() - run_start
+        result = tasks[task](inputs)
+        return result, TaskTiming(start, time.perf_counter() - run_start)
+
+    with ThreadPoolExecutor(max_workers=max_workers or len(order) or 1) as executor:
+        while pending or running:
+            for task in [t for t in pending if all(dep in results for dep in dependencies[t])]:
+                pending.remove(task)
+                inputs = {dep: results[dep] for dep in upstream[task]}
+                # Run in a copy of the caller's context so callbacks and run config follow the task
+                context = contextvars.copy_context()
+                running[executor.submit(context.run, timed, task, inputs)] = task
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                task = running.pop(future)
+                error = future.exception()
+                if error is not None:
+                    pending.clear()
+                    raise error
+                results[task], timings[task] = future.result()
+
+    wall_time = time.perf_counter() - run_start
+    path, path_time = critical_path(dependencies, {task: timing.duration for task, timing in timings.items()})
+    return ScheduleReport(results, timings, wall_time, path, path_time)
@@ -0,0 +1,248 @@
+"""
+Structured estimate extraction for the Book Store Project Simulation
+
+Every SYSTEM_MESSAGES entry asks the expert to show their work as
+
+    - Total Screens / Productivity = Total Duration
+    - e.g., 9 screens / 3 screens per week = 3 weeks
+
+parse_estimate pulls those calculation lines out of a response into typed
+Estimate records (quantity, unit, rate, duration) with the duration
+normalized to both weeks and days, and checks that the arithmetic holds; a
+calculation with a zero rate cannot hold and is marked invalid.
+Once responses are parsed, combining them is local computation rather than
+another LLM call: project_timeline adds up the per-role durations and, given
+the dependencies between roles, finds the critical path through them.
+"""
+
+import math
+import re
+from dataclasses import dataclass, field
+from typing import Dict, Hashable, List, Mapping, Optional, Sequence
+
+from dag_scheduler import critical_path
+
+# Working days per week, used to convert between day and week estimates
+DAYS_PER_WEEK = 5
+
+_PERIOD_DAYS = {"day": 1, "week": DAYS_PER_WEEK, "sprint": 2 * DAYS_PER_WEEK, "month": 4 * DAYS_PER_WEEK}
+
+_NUMBER = r"\d[\d,]*(?:\.\d+)?"
+_PERIOD = r"day|week|sprint|month"
+
+# "<quantity> <unit> / <rate> [<unit>] per <period> = [~]<duration> <duration unit>"
+_CALCULATION = re.compile(
+    rf"(?P<quantity>{_NUMBER})\s*(?P<unit>[A-Za-z][A-Za-z ()\-]*?)?\s*/\s*"
+    rf"(?P<rate>{_NUMBER})\s*(?:[A-Za-z][A-Za-z ()\-]*?\s+)?per\s+(?P<period>{_PERIOD})s?\s*"
+    rf"=\s*(?:~|≈|approx(?:imately|\.)?\s*)?(?P<duration>{_NUMBER})\s*(?P<duration_unit>(?:{_PERIOD})s?)\b",
+    re.IGNORECASE,
+)
+_MARKUP = re.compile(r"[*`_]")
+
+STATUS_OK = "ok"
+STATUS_INCONSISTENT = "inconsistent"
+STATUS_MISSING = "missing"
+STATUS_INVALID = "invalid"
+
+
+def _number(text: str) -> float:
+    return float(text.replace(",", ""))
+
+
+def _name(role) -> str:
+    return str(getattr(role, "value", role))
+
+
+@dataclass(frozen=True)
+class Estimate:
+    """One "quantity / rate = duration" calculation from an expert's response."""
+    quantity: float
+    unit: str
+    rate: float
+    rate_period: str
+    duration: float
+    duration_unit: str
+    line: str
+
+    @property
+    def duration_days(self) -> float:
+        return self.duration * _PERIOD_DAYS[self.duration_unit]
+
+    @property
+    def duration_weeks(self) -> float:
+        return self.duration_days / DAYS_PER_WEEK
+
+    @property
+    def valid(self) -> bool:
+        """Whether quantity / rate can be computed at all: a zero rate has no duration."""
+        return self.rate > 0 and math.isfinite(self.computed_days)
+
+    @property
+    def computed_days(self) -> float:
+        """Duration implied by quantity / rate, in days."""
+        return self.quantity / self.rate * _PERIOD_DAYS[self.rate_period] if self.rate > 0 else math.inf
+
+    @property
+    def consistent(self) -> bool:
+        """Whether the stated duration matches quantity / rate, allowing for rounding up."""
+        if not self.valid:
+            return False
+        computed = self.computed_days / _PERIOD_DAYS[self.duration_unit]
+        return (math.isclose(computed, self.duration, rel_tol=0.1, abs_tol=0.5)
+                or self.duration == math.ceil(computed))
+
+
+@dataclass
+class RoleEstimate:
+    """All calculations found in one role's response, with a validation status."""
+    role: str
+    status: str
+    estimates: List[Estimate] = field(default_factory=list)
+
+    @property
+    def primary(self) -> Optional[Estimate]:
+        """The role's headline estimate: the last consistent calculation, which is usually the total."""
+        for candidates in ([e for e in self.estimates if e.consistent], [e for e in self.estimates if e.valid]):
+            if candidates:
+                return candidates[-1]
+        return self.estimates[-1] if self.estimates else None
+
+    @property
+    def duration_weeks(self) -> Optional[float]:
+        """The headline duration, or None when there is none or it rests on an invalid calculation."""
+        primary = self.primary
+        if primary is None or self.status == STATUS_INVALID:
+            return None
+        return primary.duration_weeks
+
+
+def parse_estimate(text: str, role: str = "") -> RoleEstimate:
+    """Extract every calculation line from a response and validate it."""
+    estimates = []
+    for line in text.splitlines():
+        # Cheap filter first; most lines are prose
+        if "/" not in line or "=" not in line:
+            continue
+        clean = _MARKUP.sub("", line)
+        for match in _CALCULATION.finditer(clean):
+            estimates.append(Estimate(
+                quantity=_number(match["quantity"]),
+                unit=(match["unit"] or "").strip().lower(),
+                rate=_number(match["rate"]),
+                rate_period=match["period"].lower(),
+                duration=_number(match["duration"]),
+                duration_unit=match["duration_unit"].lower().rstrip("s"),
+                line=line.strip(),
+            ))
+
+    if not estimates:
+        status = STATUS_MISSING
+    elif any(e.consistent for e in estimates):
+        status = STATUS_OK
+    elif not any(e.valid for e in estimates):
+        status = STATUS_INVALID
+    else:
+        status = STATUS_INCONSISTENT
+    return RoleEstimate(_name(role), status, estimates)
+
+
+def parse_estimates(responses: Mapping[str, str]) -> Dict[str, RoleEstimate]:
+    """Parse every role's response, keyed by role name."""
+    return {_name(role): parse_estimate(text, role) for role, text in responses.items()}
+
+
+def estimate_to_dict(role_estimate: RoleEstimate) -> Dict[str, object]:
+    """JSON-friendly view of a role's headline estimate and status."""
+    primary = role_estimate.primary
+    result = {"status": role_estimate.status, "calculations": len(role_estimate.estimates)}
+    if primary is not None:
+        result.update({
+            "quantity": primary.quantity,
+            "unit": primary.unit,
+            "rate": primary.rate,
+            "rate_period": primary.rate_period,
+            "duration": primary.duration,
+            "duration_unit": primary.duration_unit,
+            # None for an invalid estimate, which the timeline leaves out too
+            "duration_weeks": role_estimate.duration_weeks,
+            "duration_days": primary.duration_days if role_estimate.duration_weeks is not None else None,
+        })
+    return result
+
+
+def format_estimates(parsed: Mapping[str, RoleEstimate]) -> str:
+    """Table of each role's headline estimate and validation status."""
+    lines = [f"{'role':<26} {'status':<13} {'quantity':>18} {'rate':>14} {'weeks':>7} {'days':>6}"]
+    for role, role_estimate in parsed.items():
+        primary = role_estimate.primary
+        if primary is None:
+            lines.append(f"{role:<26} {role_estimate.status:<13}")
+            continue
+        quantity = f"{primary.quantity:g} {primary.unit}".strip()
+        rate = f"{primary.rate:g}/{primary.rate_period}"
+        lines.append(f"{role:<26} {role_estimate.status:<13} {quantity[:18]:>18} {rate:>14} "
+                     f"{primary.duration_weeks:>7.1f} {primary.duration_days:>6.1f}")
+    return "\n".join(lines)
+
+
+@dataclass
+class Timeline:
+    """Project timeline computed from the parsed estimates."""
+    durations: Dict[str, float]
+    missing: List[str] = field(default_factory=list)
+    critical_path: List[str] = field(default_factory=list)
+    critical_path_weeks: Optional[float] = None
+
+    @property
+    def total_effort_weeks(self) -> float:
+        """Duration if every role's work is done one after another."""
+        return sum(self.durations.values())
+
+    @property
+    def total_weeks(self) -> float:
+        """Project duration: the critical path when dependencies are known, otherwise the total effort."""
+        if self.critical_path_weeks is not None:
+            return self.critical_path_weeks
+        return self.total_effort_weeks
+
+    def format(self) -> str:
+        lines = [f"Project timeline computed from {len(self.durations)} expert estimates:"]
+        for role, weeks in self.durations.items():
+            lines.append(f"- {role}: {weeks:.1f} weeks ({weeks * DAYS_PER_WEEK:.0f} days)")
+        if self.missing:
+            lines.append(f"- No usable estimate from: {', '.join(self.missing)}")
+        lines.append(f"Total effort: {self.total_effort_weeks:.1f} weeks")
+        if self.critical_path:
+            lines.append(f"Critical path: {' -> '.join(self.critical_path)} ({self.critical_path_weeks:.1f} weeks)")
+        lines.append(f"Estimated project duration: {self.total_weeks:.1f} weeks")
+        return "\n".join(lines)
+
+
+def project_timeline(parsed: Mapping[str, RoleEstimate],
+                     dependencies: Optional[Mapping[Hashable, Sequence[Hashable]]] = None) -> Timeline:
+    """
+    Combine parsed estimates into a timeline.
+
+    Without dependencies the roles are assumed to work one after another.
+    With dependencies, roles that do not depend on each other overlap and the
+    project takes as long as its critical path. Roles that gave no estimate,
+    or only invalid ones, are reported as missing and dependencies on them
+    are ignored.
+    """
+    durations = {}
+    missing = []
+    for role, role_estimate in parsed.items():
+        weeks = role_estimate.duration_weeks
+        if weeks is None:
+            missing.append(role)
+        else:
+            durations[role] = weeks
+
+    timeline = Timeline(durations, missing)
+    if dependencies is not None and durations:
+        graph = {role: [] for role in durations}
+        for role, deps in dependencies.items():
+            if _name(role) in graph:
+                graph[_name(role)] = [_name(dep) for dep in deps if _name(dep) in graph]
+        timeline.critical_path, timeline.critical_path_weeks = critical_path(graph, durations)
+    return timeline
@@ -0,0 +1,150 @@
+"""
+Offline stand-in for ChatOpenAI
+
+FakeChatModel is a deterministic, in-process chat model for running either
+simulation without network access or an API key. It sleeps for a configurable
+latency, then answers with a configurable number of words ending in an
+estimate in the format every SYSTEM_MESSAGES entry asks for, for example:
+
+    Estimated Weeks Required:
+    - Total Screens / Productivity = Total Duration
+    - 9 screens / 3 screens per week = 3 weeks
+
+The same prompt always gets the same answer, so runs are reproducible and the
+orchestration overhead can be measured without the noise of a real provider.
+"""
+
+import argparse
+import asyncio
+import hashlib
+import random
+import re
+import time
+from typing import Any, Dict, Iterator, AsyncIterator, List, Optional
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+from rate_limiter import CHARS_PER_TOKEN
+
+_QUANTITY_PATTERN = re.compile(r"Total ([A-Za-z][A-Za-z ]*?) / Productivity")
+_UNIT_PATTERN = re.compile(r"Estimated (Weeks|Days) Required")
+
+_FILLER_WORDS = (
+    "the book store platform needs catalog search checkout payment shipment tracking review "
+    "recommendation profile cart preview genre sprint story acceptance criteria component service "
+    "integration test coverage release deployment pipeline security audit documentation guide "
+    "estimate effort scope risk dependency backlog priority increment delivery"
+).split()
+
+
+class FakeChatModel(BaseChatModel):
+    """Deterministic chat model with configurable latency and output length."""
+
+    latency: float = 0.0
+    """Seconds each call takes."""
+    output_tokens: int = 120
+    """Approximate number of words in each response, including the estimate lines."""
+    seed: int = 0
+    """Changes every response while keeping runs reproducible."""
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-chat"
+
+    @property
+    def _identifying_params(self) -> Dict[str, Any]:
+        return {"model_name": "fake", "latency": self.latency,
+                "output_tokens": self.output_tokens, "seed": self.seed}
+
+    def _respond(self, messages: List[BaseMessage]) -> AIMessage:
+        prompt = "\n".join(str(m.content) for m in messages)
+        rng = random.Random(hashlib.sha256(f"{self.seed}\0{prompt}".encode("utf-8")).digest())
+
+        quantity_match = _QUANTITY_PATTERN.search(prompt)
+        unit_match = _UNIT_PATTERN.search(prompt)
+        noun = quantity_match.group(1).lower() if quantity_match else "tasks"
+        unit = unit_match.group(1).lower() if unit_match else "weeks"
+        rate = rng.randint(1, 4)
+        duration = rng.randint(1, 6)
+        estimate = (
+            f"Estimated {unit.title()} Required:\n"
+            f"- Total {noun.title()} / Productivity = Total Duration\n"
+            f"- {rate * duration} {noun} / {rate} {noun} per {unit[:-1]} = {duration} {unit}"
+        )
+
+        filler_count = max(0, self.output_tokens - len(estimate.split()))
+        filler = " ".join(rng.choice(_FILLER_WORDS) for _ in range(filler_count))
+        content = f"{filler}\n\n{estimate}" if filler else estimate
+
+        prompt_tokens = max(1, len(prompt) // CHARS_PER_TOKEN)
+        completion_tokens = len(content.split())
+        return AIMessage(
+            content=content,
+            response_metadata={"model_name": "fake"},
+            usage_metadata={"input_tokens": prompt_tokens, "output_tokens": completion_tokens,
+                             "total_tokens": prompt_tokens + completion_tokens},
+        )
+
+    def _result(self, message: AIMessage) -> ChatResult:
+        usage = message.usage_metadata
+        return ChatResult(
+            generations=[ChatGeneration(message=message)],
+            llm_output={"model_name": "fake", "token_usage": {
+                "prompt_tokens": usage["input_tokens"],
+                "completion_tokens": usage["output_tokens"],
+                "total_tokens": usage["total_tokens"],
+            }},
+        )
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                  run_manager=None, **kwargs: Any) -> ChatResult:
+        if self.latency:
+            time.sleep(self.latency)
+        return self._result(self._respond(messages))
+
+    async def _agenerate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                         run_manager=None, **kwargs: Any) -> ChatResult:
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return self._result(self._respond(messages))
+
+    def _chunks(self, message: AIMessage) -> List[str]:
+        return re.findall(r"\S+\s*", message.content)
+
+    def _stream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                run_manager=None, **kwargs: Any) -> Iterator[ChatGenerationChunk]:
+        # A quarter of the latency passes before the first token, the rest is spread over the output
+        message = self._respond(messages)
+        pieces = self._chunks(message)
+        if self.latency:
+            time.sleep(self.latency / 4)
+        for piece in pieces:
+            if self.latency:
+                time.sleep(self.latency * 3 / 4 / len(pieces))
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content=piece))
+            if run_manager:
+                run_manager.on_llm_new_token(piece, chunk=chunk)
+            yield chunk
+        yield ChatGenerationChunk(message=AIMessageChunk(content="", usage_metadata=message.usage_metadata))
+
+    async def _astream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                       run_manager=None, **kwargs: Any) -> AsyncIterator[ChatGenerationChunk]:
+        message = self._respond(messages)
+        pieces = self._chunks(message)
+        if self.latency:
+            await asyncio.sleep(self.latency / 4)
+        for piece in pieces:
+            if self.latency:
+                await asyncio.sleep(self.latency * 3 / 4 / len(pieces))
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content=piece))
+            if run_manager:
+                await run_manager.on_llm_new_token(piece, chunk=chunk)
+            yield chunk
+        yield ChatGenerationChunk(message=AIMessageChunk(content="", usage_metadata=message.usage_metadata))
+
+
+def fake_llm_from_args(args: argparse.Namespace) -> FakeChatModel:
+    """Build the fake backend from parsed command line options."""
+    return FakeChatModel(latency=args.fake_latency, output_tokens=args.fake_output_tokens)
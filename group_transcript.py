@@ -0,0 +1,125 @@
+"""
+Shared group chat transcript read through per-agent cursors
+
+A broadcast used to be stored once in the group's message list and again in
+every recipient, each building its own "sender: content" prompt message, so
+N agents and M broadcasts kept N*M copies of the conversation. A
+GroupTranscript stores each broadcast once, as a TranscriptEntry holding the
+prompt message every recipient appends to its prompt by reference.
+
+Each agent reads the transcript through a TranscriptCursor, which remembers
+how far it has read and skips the agent's own messages. cursor.view() is the
+group conversation as that agent has seen it, filtered on the fly rather than
+copied. Replies and direct chats are not part of the transcript and stay in
+the agent's own memory.
+
+    transcript = GroupTranscript()
+    cursor = transcript.cursor("UI_UX_Designer")
+    transcript.append("Scrum_Master", "How long will the UI take?", prompt_message)
+    for entry in cursor.read():
+        ...
+"""
+
+import sys
+from typing import Any, Dict, Iterator, List, Sequence
+
+
+class TranscriptEntry:
+    """One broadcast: who sent it, its text, and the prompt message shared by every recipient."""
+    __slots__ = ("index", "sender", "content", "prompt_message")
+
+    def __init__(self, index: int, sender: str, content: str, prompt_message: Any = None):
+        self.index = index
+        self.sender = sys.intern(sender)
+        self.content = content
+        self.prompt_message = prompt_message
+
+    def __repr__(self) -> str:
+        return f"TranscriptEntry({self.index}, sender={self.sender!r}, content={self.content!r})"
+
+
+class GroupTranscript(Sequence):
+    """Append-only list of a group's broadcasts, shared by all of its members."""
+
+    def __init__(self):
+        self._entries: List[TranscriptEntry] = []
+        self._cursors: Dict[str, "TranscriptCursor"] = {}
+
+    def append(self, sender: str, content: str, prompt_message: Any = None) -> TranscriptEntry:
+        """Store one broadcast and return its entry."""
+        entry = TranscriptEntry(len(self._entries), sender, content, prompt_message)
+        self._entries.append(entry)
+        return entry
+
+    def cursor(self, reader: str) -> "TranscriptCursor":
+        """The cursor reader reads this transcript through, created at the start on first use."""
+        cursor = self._cursors.get(reader)
+        if cursor is None:
+            cursor = self._cursors[reader] = TranscriptCursor(self, reader)
+        return cursor
+
+    def clear(self) -> None:
+        """Drop every entry and rewind every cursor, ready for a new run."""
+        self._entries.clear()
+        for cursor in self._cursors.values():
+            cursor.position = 0
+
+    def to_dicts(self) -> List[Dict[str, str]]:
+        """The transcript as sender/content dicts, for export."""
+        return [{"sender": entry.sender, "content": entry.content} for entry in self._entries]
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __getitem__(self, index):
+        return self._entries[index]
+
+    def __iter__(self) -> Iterator[TranscriptEntry]:
+        return iter(self._entries)
+
+
+class TranscriptCursor:
+    """One agent's read position in a GroupTranscript; the agent's own broadcasts are skipped."""
+    __slots__ = ("transcript", "reader", "position")
+
+    def __init__(self, transcript: GroupTranscript, reader: str):
+        self.transcript = transcript
+        self.reader = sys.intern(reader)
+        self.position = 0
+
+    def unread(self) -> List[TranscriptEntry]:
+        """Entries from others since the last read, without moving the cursor."""
+        return [entry for entry in self.transcript[self.position:] if entry.sender != self.reader]
+
+    def read(self) -> List[TranscriptEntry]:
+        """Entries from others since the last read; the cursor moves to the end."""
+        entries = self.unread()
+        self.position = len(self.transcript)
+        return entries
+
+    def view(self) -> "TranscriptView":
+        """The entries from others this reader has read so far."""
+        return TranscriptView(self.transcript, self.reader, self.position)
+
+
+class TranscriptView(Sequence):
+    """Read-only view of a transcript prefix without one reader's own entries; nothing is copied."""
+    __slots__ = ("_transcript", "_reader", "_end")
+
+    def __init__(self, transcript: GroupTranscript, reader: str, end: int):
+        self._transcript = transcript
+        self._reader = reader
+        self._end = end
+
+    def __iter__(self) -> Iterator[TranscriptEntry]:
+        for index in range(self._end):
+            entry = self._transcript[index]
+            if entry.sender != self._reader:
+                yield entry
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
+
+    def __getitem__(self, index):
+        entries = list(self)
+        return entries[index]
@@ -0,0 +1,202 @@
+"""
+Persistent LLM response cache for the Book Store Project Simulation
+
+Both simulations call the model at temperature 0 on fixed prompts, so a rerun
+of the same brief asks exactly the same questions again. SQLiteResponseCache
+plugs into LangChain's cache layer (``set_llm_cache``) and stores every
+response on disk under a content hash of the model configuration (model name
+and parameters, as LangChain serializes them) and the serialized message
+list.
+
+Entries expire after a TTL, the least recently used entries are evicted once
+the stored responses exceed a size limit, and hit/miss/eviction counters are
+kept for reporting.
+
+Only use the cache for deterministic (temperature 0) runs: a cached response
+is returned as-is for an identical request.
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Optional
+
+from langchain_core.caches import BaseCache, RETURN_VAL_TYPE
+from langchain_core.messages import message_to_dict, messages_from_dict
+from langchain_core.outputs import ChatGeneration, Generation
+
+from llm_metrics import CACHE_HIT_KEY
+
+# Defaults live with the option definitions
+from cli_options import DEFAULT_CACHE_PATH, DEFAULT_MAX_BYTES, DEFAULT_TTL_SECONDS
+
+
+def cache_key(prompt: str, llm_string: str) -> str:
+    """Content address of one request: a hash of the model configuration and the prompt."""
+    digest = hashlib.sha256()
+    digest.update(llm_string.encode("utf-8"))
+    digest.update(b"\0")
+    digest.update(prompt.encode("utf-8"))
+    return digest.hexdigest()
+
+
+def _dump_generations(generations: RETURN_VAL_TYPE) -> str:
+    items = []
+    for generation in generations:
+        if isinstance(generation, ChatGeneration):
+            items.append({"message": message_to_dict(generation.message),
+                          "info": generation.generation_info})
+        else:
+            items.append({"text": generation.text, "info": generation.generation_info})
+    return json.dumps(items)
+
+
+def _load_generations(payload: str) -> RETURN_VAL_TYPE:
+    generations = []
+    for item in json.loads(payload):
+        if "message" in item:
+            message = messages_from_dict([item["message"]])[0]
+            # Lets llm_metrics tell a cache hit from a paid call
+            message.response_metadata[CACHE_HIT_KEY] = True
+            generations.append(ChatGeneration(message=message, generation_info=item.get("info")))
+        else:
+            generations.append(Generation(text=item["text"], generation_info=item.get("info")))
+    return generations
+
+
+class SQLiteResponseCache(BaseCache):
+    """
+    Content-addressed LLM response cache stored in a SQLite file.
+
+    max_bytes caps the total size of the stored responses (least recently
+    used entries are evicted first); ttl_seconds expires entries by age.
+    Either may be None to disable that limit. Safe to share between the
+    threads used by parallel graph branches.
+    """
+
+    def __init__(self, path: str = DEFAULT_CACHE_PATH, max_bytes: Optional[int] = DEFAULT_MAX_BYTES,
+                 ttl_seconds: Optional[float] = DEFAULT_TTL_SECONDS):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            " key TEXT PRIMARY KEY,"
+            " llm_string TEXT NOT NULL,"
+            " payload TEXT NOT NULL,"
+            " size INTEGER NOT NULL,"
+            " created REAL NOT NULL,"
+            " accessed REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed)")
+        self._total_bytes = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+
+    def lookup(self, prompt: str, llm_string: str) -> Optional[RETURN_VAL_TYPE]:
+        key = cache_key(prompt, llm_string)
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT payload, size, created FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            payload, size, created = row
+            if self.ttl_seconds is not None and now - created > self.ttl_seconds:
+                self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self._total_bytes -= size
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._conn.execute("UPDATE responses SET accessed = ? WHERE key = ?", (now, key))
+            self.hits += 1
+        return _load_generations(payload)
+
+    def update(self, prompt: str, llm_string: str, return_val: RETURN_VAL_TYPE) -> None:
+        key = cache_key(prompt, llm_string)
+        payload = _dump_generations(return_val)
+        size = len(payload.encode("utf-8"))
+        now = time.time()
+        with self._lock:
+            old = self._conn.execute("SELECT size FROM responses WHERE key = ?", (key,)).fetchone()
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, llm_string, payload, size, created, accessed)"
+                " VALUES (?, ?, ?, ?, ?, ?)",
+                (key, llm_string, payload, size, now, now),
+            )
+            self._total_bytes += size - (old[0] if old else 0)
+            self._evict()
+
+    def _evict(self) -> None:
+        """Drop least recently used entries until the cache fits max_bytes. Caller holds the lock."""
+        if self.max_bytes is None:
+            return
+        while self._total_bytes > self.max_bytes:
+            rows = self._conn.execute(
+                "SELECT key, size FROM responses ORDER BY accessed LIMIT 64"
+            ).fetchall()
+            if not rows:
+                self._total_bytes = 0
+                return
+            for key, size in rows:
+                if self._total_bytes <= self.max_bytes:
+                    return
+                self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self._total_bytes -= size
+                self.evictions += 1
+
+    def clear(self, **kwargs: Any) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM responses")
+            self._total_bytes = 0
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    def stats(self) -> Dict[str, Any]:
+        """Counters and size of the cache."""
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+        lookups = self.hits + self.misses
+        return {
+            "path": self.path,
+            "entries": entries,
+            "bytes": self._total_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
+
+    def format_stats(self) -> str:
+        stats = self.stats()
+        return (f"LLM cache {stats['path']}: {stats['hits']} hits, {stats['misses']} misses "
+                f"({stats['hit_rate']:.0%} hit rate), {stats['entries']} entries, "
+                f"{stats['bytes'] / 1024:.1f} KiB, {stats['evictions']} evicted, "
+                f"{stats['expirations']} expired")
+
+
+def cache_from_args(args: argparse.Namespace) -> Optional[SQLiteResponseCache]:
+    """Build the response cache from parsed command line options, or None if caching is off."""
+    if not args.cache:
+        return None
+    directory = os.path.dirname(os.path.abspath(args.cache))
+    os.makedirs(directory, exist_ok=True)
+    return SQLiteResponseCache(
+        args.cache,
+        max_bytes=int(args.cache_max_mb * 1024 * 1024),
+        ttl_seconds=args.cache_ttl_hours * 3600,
+    )
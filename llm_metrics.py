@@ -0,0 +1,259 @@
+"""
+Per-role token, latency and cost metrics for LLM calls
+
+A MetricsCollector records every LLM call made by the simulations under the
+current run ID and the calling role: call and error counts, prompt and
+completion tokens, estimated cost, and a latency histogram. Token counts come
+from the response's usage metadata when the provider reports it and are
+estimated from the text otherwise. Responses served by the llm_cache response
+cache are counted as cache hits, with no tokens and no cost.
+
+    with llm_metrics.track(role, prompt_text) as call:
+        call.response = llm.invoke(prompt_text)
+
+At the end of a run the collector is exported as JSON and in the Prometheus
+text exposition format, so the .prom file can be picked up by a node_exporter
+textfile collector or pushed to a Pushgateway as is.
+"""
+
+import json
+import os
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterator, List, Mapping, Optional, Tuple
+
+from rate_limiter import CHARS_PER_TOKEN
+
+# response_metadata flag llm_cache sets on the responses it serves
+CACHE_HIT_KEY = "llm_cache_hit"
+
+# Upper bounds of the latency histogram buckets, in seconds
+LATENCY_BUCKETS = (0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+# USD per million (prompt, completion) tokens; unknown models are costed at zero
+MODEL_PRICES: Dict[str, Tuple[float, float]] = {
+    "gpt-4o-mini": (0.15, 0.60),
+    "gpt-4o": (2.50, 10.00),
+    "gpt-4.1": (2.00, 8.00),
+    "gpt-4.1-mini": (0.40, 1.60),
+    "gpt-4.1-nano": (0.10, 0.40),
+    "fake": (0.0, 0.0),
+}
+
+
+def _text_tokens(text: Any) -> int:
+    if isinstance(text, (list, tuple)):
+        text = "\n".join(str(getattr(m, "content", m)) for m in text)
+    return max(1, len(str(text)) // CHARS_PER_TOKEN)
+
+
+def is_cache_hit(response: Any) -> bool:
+    """Whether response came from the response cache rather than the provider."""
+    return bool((getattr(response, "response_metadata", None) or {}).get(CACHE_HIT_KEY))
+
+
+def token_usage(response: Any, prompt: Any = "") -> Tuple[int, int, bool]:
+    """(prompt tokens, completion tokens, estimated) for one response message."""
+    usage = getattr(response, "usage_metadata", None)
+    if usage:
+        return usage.get("input_tokens", 0), usage.get("output_tokens", 0), False
+    reported = (getattr(response, "response_metadata", None) or {}).get("token_usage")
+    if reported:
+        return reported.get("prompt_tokens", 0), reported.get("completion_tokens", 0), False
+    return _text_tokens(prompt), _text_tokens(getattr(response, "content", "")), True
+
+
+@dataclass
+class RoleMetrics:
+    """Counters and latency histogram for one role in one run."""
+    calls: int = 0
+    errors: int = 0
+    cache_hits: int = 0
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    estimated_calls: int = 0
+    cost_usd: float = 0.0
+    latency_sum: float = 0.0
+    latency_max: float = 0.0
+    # Non-cumulative count per LATENCY_BUCKETS entry, plus one for +Inf
+    buckets: List[int] = field(default_factory=lambda: [0] * (len(LATENCY_BUCKETS) + 1))
+
+    def observe(self, latency: float) -> None:
+        self.latency_sum += latency
+        self.latency_max = max(self.latency_max, latency)
+        for index, bound in enumerate(LATENCY_BUCKETS):
+            if latency <= bound:
+                self.buckets[index] += 1
+                return
+        self.buckets[-1] += 1
+
+    @property
+    def observations(self) -> int:
+        return sum(self.buckets)
+
+    @property
+    def latency_mean(self) -> float:
+        return self.latency_sum / self.observations if self.observations else 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        cumulative, counts = 0, {}
+        for bound, count in zip(list(LATENCY_BUCKETS) + ["+Inf"], self.buckets):
+            cumulative += count
+            counts[str(bound)] = cumulative
+        return {
+            "calls": self.calls,
+            "errors": self.errors,
+            "cache_hits": self.cache_hits,
+            "prompt_tokens": self.prompt_tokens,
+            "completion_tokens": self.completion_tokens,
+            "estimated_token_calls": self.estimated_calls,
+            "cost_usd": round(self.cost_usd, 6),
+            "latency_seconds": {"sum": round(self.latency_sum, 6), "mean": round(self.latency_mean, 6),
+                                "max": round(self.latency_max, 6), "buckets": counts},
+        }
+
+
+class CallRecord:
+    """Handle yielded by MetricsCollector.track; set .response once the call returns."""
+    __slots__ = ("response",)
+
+    def __init__(self):
+        self.response = None
+
+
+def _write_atomic(path: str, text: str) -> None:
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path) or ".", suffix=".tmp")
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        f.write(text)
+    os.replace(tmp_path, path)
+
+
+def _label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+class MetricsCollector:
+    """Thread-safe per-run, per-role LLM call metrics."""
+
+    def __init__(self, model: str = "gpt-4o-mini", prices: Optional[Mapping[str, Tuple[float, float]]] = None):
+        self.model = model
+        self.prices = dict(MODEL_PRICES if prices is None else prices)
+        self.run_id = "default"
+        self._series: Dict[Tuple[str, str], RoleMetrics] = {}
+        self._lock = threading.Lock()
+
+    def start_run(self, run_id: str) -> None:
+        """Attribute the calls that follow to run_id."""
+        self.run_id = run_id
+
+    def cost(self, prompt_tokens: int, completion_tokens: int) -> float:
+        prompt_price, completion_price = self.prices.get(self.model, (0.0, 0.0))
+        return (prompt_tokens * prompt_price + completion_tokens * completion_price) / 1_000_000
+
+    def record(self, role: str, latency: float, response: Any = None, prompt: Any = "",
+               error: bool = False) -> None:
+        """Record one finished (or failed) call for role in the current run."""
+        role = str(getattr(role, "value", role))
+        cache_hit = not error and is_cache_hit(response)
+        if not error and not cache_hit:
+            prompt_tokens, completion_tokens, estimated = token_usage(response, prompt)
+        with self._lock:
+            metrics = self._series.get((self.run_id, role))
+            if metrics is None:
+                metrics = self._series[(self.run_id, role)] = RoleMetrics()
+            metrics.calls += 1
+            metrics.observe(latency)
+            if error:
+                metrics.errors += 1
+                return
+            if cache_hit:
+                # Answered locally: nothing was sent to the provider or paid for
+                metrics.cache_hits += 1
+                return
+            metrics.prompt_tokens += prompt_tokens
+            metrics.completion_tokens += completion_tokens
+            metrics.estimated_calls += estimated
+            metrics.cost_usd += self.cost(prompt_tokens, completion_tokens)
+
+    @contextmanager
+    def track(self, role: str, prompt: Any = "") -> Iterator[CallRecord]:
+        """Time the enclosed call and record it; an exception is recorded as an error and re-raised."""
+        call = CallRecord()
+        start = time.perf_counter()
+        try:
+            yield call
+        except Exception:
+            self.record(role, time.perf_counter() - start, prompt=prompt, error=True)
+            raise
+        self.record(role, time.perf_counter() - start, call.response, prompt)
+
+    def series(self, run_id: Optional[str] = None) -> Dict[str, RoleMetrics]:
+        """Metrics by role for one run (the current one by default)."""
+        run_id = self.run_id if run_id is None else run_id
+        with self._lock:
+            return {role: metrics for (run, role), metrics in self._series.items() if run == run_id}
+
+    def to_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            items = sorted(self._series.items())
+        runs: Dict[str, Dict[str, Any]] = {}
+        for (run, role), metrics in items:
+            runs.setdefault(run, {})[role] = metrics.to_dict()
+        return {"model": self.model, "latency_buckets": list(LATENCY_BUCKETS), "runs": runs}
+
+    def to_prometheus(self) -> str:
+        """The metrics in the Prometheus text exposition format."""
+        with self._lock:
+            items = sorted(self._series.items())
+        counters = [
+            ("llm_calls_total", "LLM calls made", lambda m: m.calls),
+            ("llm_errors_total", "LLM calls that raised", lambda m: m.errors),
+            ("llm_cache_hits_total", "LLM calls answered from the response cache", lambda m: m.cache_hits),
+            ("llm_prompt_tokens_total", "Prompt tokens sent", lambda m: m.prompt_tokens),
+            ("llm_completion_tokens_total", "Completion tokens received", lambda m: m.completion_tokens),
+            ("llm_cost_usd_total", f"Estimated cost in USD at {self.model} prices", lambda m: round(m.cost_usd, 6)),
+        ]
+        lines = []
+        for name, help_text, value in counters:
+            lines += [f"# HELP {name} {help_text}", f"# TYPE {name} counter"]
+            for (run, role), metrics in items:
+                lines.append(f'{name}{{run="{_label(run)}",role="{_label(role)}"}} {value(metrics)}')
+
+        name = "llm_call_latency_seconds"
+        lines += [f"# HELP {name} LLM call latency, retries included", f"# TYPE {name} histogram"]
+        for (run, role), metrics in items:
+            labels = f'run="{_label(run)}",role="{_label(role)}"'
+            cumulative = 0
+            for bound, count in zip(list(LATENCY_BUCKETS) + ["+Inf"], metrics.buckets):
+                cumulative += count
+                lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {cumulative}')
+            lines.append(f"{name}_sum{{{labels}}} {metrics.latency_sum:.6f}")
+            lines.append(f"{name}_count{{{labels}}} {metrics.observations}")
+        return "\n".join(lines) + "\n"
+
+    def export(self, prefix: str) -> Tuple[str, str]:
+        """Write <prefix>.json and <prefix>.prom and return their paths."""
+        json_path, prom_path = f"{prefix}.json", f"{prefix}.prom"
+        _write_atomic(json_path, json.dumps(self.to_dict(), indent=2) + "\n")
+        _write_atomic(prom_path, self.to_prometheus())
+        return json_path, prom_path
+
+    def format_table(self, run_id: Optional[str] = None) -> str:
+        """Per-role calls, tokens, cost and latency for one run, most expensive role first."""
+        series = self.series(run_id)
+        lines = [f"{'role':<26} {'calls':>5} {'cached':>6} {'prompt':>8} {'output':>8} {'cost $':>9} "
+                 f"{'mean s':>7} {'max s':>7}"]
+        for role, m in sorted(series.items(), key=lambda item: item[1].latency_sum, reverse=True):
+            lines.append(f"{role:<26} {m.calls:>5} {m.cache_hits:>6} {m.prompt_tokens:>8} {m.completion_tokens:>8} "
+                         f"{m.cost_usd:>9.5f} {m.latency_mean:>7.2f} {m.latency_max:>7.2f}")
+        total_cost = sum(m.cost_usd for m in series.values())
+        total_latency = sum(m.latency_sum for m in series.values())
+        lines.append(f"{'total':<26} {sum(m.calls for m in series.values()):>5} "
+                     f"{sum(m.cache_hits for m in series.values()):>6} "
+                     f"{sum(m.prompt_tokens for m in series.values()):>8} "
+                     f"{sum(m.completion_tokens for m in series.values()):>8} "
+                     f"{total_cost:>9.5f} {'':>7} {'':>7}  ({total_latency:.2f}s in LLM calls)")
+        return "\n".join(lines)
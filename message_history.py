@@ -0,0 +1,150 @@
+"""
+Append-only, structure-sharing message history for the LangGraph state
+
+Every LangGraph step used to copy the whole conversation: a node rebuilt the
+list to add its response, and the add_messages reducer rebuilt it again to
+merge the update, so a run of n turns did O(n^2) work and held a fresh copy
+of the history in every checkpointed snapshot.
+
+A MessageHistory is an immutable view of the first ``length`` entries of a
+shared log. Appending to the newest view appends to the log in place and
+returns a longer view, O(1) and without copying, while every earlier view
+still sees exactly the messages it saw before. Appending to an older view
+(a branch) copies its prefix into a new log first, so snapshots never see
+each other's messages.
+
+    history = MessageHistory([brief])
+    longer = history.append(response)   # history is unchanged
+    state = {"messages": longer}
+
+append_history is the matching LangGraph reducer: an update that extends the
+current history is taken as is, and a list of new messages (from a parallel
+branch) is appended.
+"""
+
+import threading
+from typing import Any, Iterable, Iterator, List, Optional, Sequence, Union, overload
+
+
+class _Log:
+    """The shared backing list, with a lock so two views cannot both extend the tip."""
+    __slots__ = ("items", "lock")
+
+    def __init__(self, items: List[Any]):
+        self.items = items
+        self.lock = threading.Lock()
+
+
+class MessageHistory(Sequence):
+    """Immutable, structure-sharing sequence of messages with O(1) append."""
+    __slots__ = ("_log", "_length")
+
+    def __init__(self, messages: Iterable[Any] = ()):
+        items = list(messages)
+        self._log = _Log(items)
+        self._length = len(items)
+
+    @classmethod
+    def _view(cls, log: _Log, length: int) -> "MessageHistory":
+        view = cls.__new__(cls)
+        view._log = log
+        view._length = length
+        return view
+
+    def extend(self, messages: Iterable[Any]) -> "MessageHistory":
+        """Return a new history with messages appended; this one is unchanged."""
+        messages = list(messages)
+        if not messages:
+            return self
+        log = self._log
+        with log.lock:
+            if len(log.items) == self._length:
+                # This view is the tip: grow the shared log in place
+                log.items.extend(messages)
+                return self._view(log, len(log.items))
+            prefix = log.items[:self._length]
+        # Another view already grew past this one; branch off with a copy of the prefix
+        return self._view(_Log(prefix + messages), self._length + len(messages))
+
+    def append(self, message: Any) -> "MessageHistory":
+        """Return a new history with message appended; this one is unchanged."""
+        return self.extend((message,))
+
+    def shares_prefix_with(self, other: "MessageHistory") -> bool:
+        """True if this history is other followed by zero or more further messages."""
+        return self._log is other._log and self._length >= other._length
+
+    def __len__(self) -> int:
+        return self._length
+
+    @overload
+    def __getitem__(self, index: int) -> Any: ...
+
+    @overload
+    def __getitem__(self, index: slice) -> List[Any]: ...
+
+    def __getitem__(self, index: Union[int, slice]):
+        if isinstance(index, slice):
+            return self._log.items[:self._length][index]
+        if index < 0:
+            index += self._length
+        if not 0 <= index < self._length:
+            raise IndexError("message history index out of range")
+        return self._log.items[index]
+
+    def __iter__(self) -> Iterator[Any]:
+        items = self._log.items
+        for index in range(self._length):
+            yield items[index]
+
+    def __add__(self, other: Iterable[Any]) -> "MessageHistory":
+        return self.extend(other)
+
+    def __eq__(self, other: Any) -> bool:
+        if isinstance(other, (MessageHistory, list, tuple)):
+            return len(self) == len(other) and all(a == b for a, b in zip(self, other))
+        return NotImplemented
+
+    __hash__ = None
+
+    def __repr__(self) -> str:
+        return f"MessageHistory({list(self)!r})"
+
+    def _asdict(self) -> dict:
+        # LangGraph's checkpoint serializer stores objects with _asdict as
+        # constructor keyword arguments, so a checkpoint holds only this view
+        return {"messages": list(self)}
+
+    def __reduce__(self):
+        # Pickled as a plain list of this view's messages
+        return (MessageHistory, (list(self),))
+
+
+def as_history(messages: Optional[Iterable[Any]]) -> MessageHistory:
+    """Return messages as a MessageHistory, wrapping a plain list or None."""
+    if isinstance(messages, MessageHistory):
+        return messages
+    return MessageHistory(messages or ())
+
+
+def append_history(left: Optional[Sequence[Any]], right: Union[Sequence[Any], Any, None]) -> MessageHistory:
+    """
+    LangGraph reducer for MessageHistory channels.
+
+    An update that already extends the current history (a node appended to
+    the history it was given) is used as is. Anything else - a list of new
+    messages from a parallel branch, or a single message - is appended.
+    """
+    left = as_history(left)
+    if right is None:
+        return left
+    if isinstance(right, MessageHistory):
+        if right.shares_prefix_with(left):
+            return right
+        if left.shares_prefix_with(right):
+            # A stale full history from a node that saw an older state adds nothing new
+            return left
+        return left.extend(right)
+    if not isinstance(right, (list, tuple)):
+        right = [right]
+    return left.extend(right)
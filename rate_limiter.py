@@ -0,0 +1,106 @@
+"""
+Token-bucket rate limiting for LLM calls
+
+A TokenBucketRateLimiter enforces a requests-per-minute and a
+tokens-per-minute budget at the same time. Unused capacity accumulates up to
+one minute's worth, so short bursts go through immediately and callers only
+wait once a budget is actually exhausted.
+"""
+
+import asyncio
+import threading
+import time
+from typing import Optional
+
+
+# Rough size of one token in English text, used for budgeting before a call
+CHARS_PER_TOKEN = 4
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count for budgeting a request before it is sent."""
+    return max(1, len(text) // CHARS_PER_TOKEN)
+
+
+class _Bucket:
+    """A single bucket refilled continuously at ``per_minute / 60`` units per second."""
+
+    def __init__(self, per_minute: float):
+        self.capacity = float(per_minute)
+        self.rate = per_minute / 60.0
+        self.level = self.capacity
+        self.updated = time.monotonic()
+
+    def refill(self, now: float) -> None:
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount: float) -> float:
+        """Seconds until ``amount`` units are available (0 if they already are)."""
+        deficit = min(amount, self.capacity) - self.level
+        return max(0.0, deficit / self.rate)
+
+    def take(self, amount: float) -> None:
+        self.level -= min(amount, self.capacity)
+
+
+class TokenBucketRateLimiter:
+    """
+    Rate limiter with independent request and token budgets.
+
+    Either limit may be None to leave that dimension unlimited. A single
+    request larger than the whole token budget is clamped to the budget so it
+    can still go through once the bucket is full.
+    """
+
+    def __init__(self, requests_per_minute: Optional[float] = None,
+                 tokens_per_minute: Optional[float] = None):
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self._requests = _Bucket(requests_per_minute) if requests_per_minute else None
+        self._tokens = _Bucket(tokens_per_minute) if tokens_per_minute else None
+        self._lock = threading.Lock()
+        self._async_lock = None
+        self._async_lock_loop = None
+
+    def _reserve(self, tokens: int) -> float:
+        """Take capacity if it is available now, otherwise return how long to wait."""
+        with self._lock:
+            now = time.monotonic()
+            wait = 0.0
+            for bucket, amount in ((self._requests, 1), (self._tokens, tokens)):
+                if bucket is not None:
+                    bucket.refill(now)
+                    wait = max(wait, bucket.wait_time(amount))
+            if wait == 0.0:
+                for bucket, amount in ((self._requests, 1), (self._tokens, tokens)):
+                    if bucket is not None:
+                        bucket.take(amount)
+            return wait
+
+    def acquire_sync(self, tokens: int = 1) -> float:
+        """Block until one request of ``tokens`` tokens fits the budget; return the time waited."""
+        waited = 0.0
+        while True:
+            wait = self._reserve(tokens)
+            if wait == 0.0:
+                return waited
+            time.sleep(wait)
+            waited += wait
+
+    async def acquire(self, tokens: int = 1) -> float:
+        """Wait until one request of ``tokens`` tokens fits the budget; return the time waited."""
+        # asyncio locks belong to one event loop, and each broadcast may run its own
+        loop = asyncio.get_running_loop()
+        if self._async_lock_loop is not loop:
+            self._async_lock = asyncio.Lock()
+            self._async_lock_loop = loop
+        waited = 0.0
+        # Callers are served in arrival order so a large request is not starved by small ones
+        async with self._async_lock:
+            while True:
+                wait = self._reserve(tokens)
+                if wait == 0.0:
+                    return waited
+                await asyncio.sleep(wait)
+                waited += wait
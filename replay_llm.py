@@ -0,0 +1,342 @@
+"""
+Record and replay LLM calls for zero-cost regression runs
+
+RecordingChatModel wraps the real chat model and appends every successful
+call to a JSONL recording: the prompt messages, the response (with its usage
+metadata, so token and cost metrics replay too), the call's latency and, for
+streamed calls, the time to first token. ReplayChatModel serves a recording
+back without touching the network, with the original latencies or none.
+
+Replayed calls are matched on a hash of the prompt rather than on call
+order, so the parallel and dependency-scheduled modes replay correctly even
+though their calls finish in a different order every run. The same prompt
+asked twice is answered in recorded order. A prompt that is not in the
+recording raises ReplayMismatchError with a diff against the closest
+recorded prompt: a regression run never quietly goes off script.
+
+    python LangGraph.py --record runs/baseline.jsonl
+    python LangGraph.py --replay runs/baseline.jsonl --replay-latency zero
+
+Failed attempts are not recorded, so a recording made through retries
+replays as if every call succeeded first time. Both models bypass the
+--cache response cache: a recording holds every call of the run, hits
+included, and a replay checks every call against its recording.
+"""
+
+import argparse
+import asyncio
+import difflib
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from collections import deque
+from typing import Any, AsyncIterator, Deque, Dict, Iterator, List, Optional, Union
+
+from langchain_core.caches import BaseCache
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage, message_to_dict, messages_from_dict
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from pydantic import Field
+
+
+
+class ReplayMismatchError(RuntimeError):
+    """Raised when a replayed run sends a prompt the recording does not contain."""
+
+
+def prompt_payload(messages: List[BaseMessage]) -> List[List[Any]]:
+    """The parts of a prompt a recording is matched on: each message's type and content."""
+    return [[message.type, message.content] for message in messages]
+
+
+def prompt_key(payload: List[List[Any]]) -> str:
+    return hashlib.sha256(json.dumps(payload, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+
+def _prompt_text(payload: List[List[Any]]) -> str:
+    return "\n".join(f"[{kind}] {content}" for kind, content in payload)
+
+
+def _role(run_manager) -> Optional[str]:
+    return (getattr(run_manager, "metadata", None) or {}).get("agent_role")
+
+
+def _result(message: AIMessage) -> ChatResult:
+    return ChatResult(generations=[ChatGeneration(message=message)])
+
+
+class _Recording:
+    """Appends call records to a JSONL file, one flushed line per call, from any thread."""
+
+    def __init__(self, path: str):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.path = path
+        self.calls = 0
+        self._file = open(path, "w", encoding="utf-8")
+        self._lock = threading.Lock()
+
+    def write(self, record: Dict[str, Any]) -> None:
+        with self._lock:
+            record = {"call": self.calls, **record}
+            self._file.write(json.dumps(record, ensure_ascii=False) + "\n")
+            # Flushed per call, so a run that fails part-way still leaves a usable recording
+            self._file.flush()
+            self.calls += 1
+
+    def close(self) -> None:
+        with self._lock:
+            self._file.close()
+
+
+class RecordingChatModel(BaseChatModel):
+    """Passes every call through to inner and records the prompt, response and latency."""
+
+    inner: BaseChatModel
+    """The model that answers the calls."""
+    recording: Any
+    """The _Recording the calls are written to."""
+    cache: Union[BaseCache, bool, None] = Field(default=False, exclude=True)
+    """Never answered from the response cache, so cache hits are recorded too."""
+
+    @classmethod
+    def to_file(cls, inner: BaseChatModel, path: str) -> "RecordingChatModel":
+        """Record inner's calls to path, replacing any earlier recording there."""
+        return cls(inner=inner, recording=_Recording(path))
+
+    @property
+    def _llm_type(self) -> str:
+        return f"recording-{self.inner._llm_type}"
+
+    @property
+    def _identifying_params(self) -> Dict[str, Any]:
+        return self.inner._identifying_params
+
+    @property
+    def model_name(self) -> str:
+        return getattr(self.inner, "model_name", None) or self.inner._identifying_params.get("model_name", "")
+
+    def _record(self, messages: List[BaseMessage], response: BaseMessage, latency: float,
+                first_token: Optional[float], run_manager) -> AIMessage:
+        # Streamed responses arrive as chunks; store them as the plain message a replay returns
+        message = AIMessage(content=response.content,
+                            response_metadata=getattr(response, "response_metadata", None) or {},
+                            usage_metadata=getattr(response, "usage_metadata", None))
+        self.recording.write({
+            "role": _role(run_manager),
+            "model": self.model_name,
+            "prompt": prompt_payload(messages),
+            "response": message_to_dict(message),
+            "latency": round(latency, 6),
+            "first_token": None if first_token is None else round(first_token, 6),
+        })
+        return message
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                  run_manager=None, **kwargs: Any) -> ChatResult:
+        start = time.perf_counter()
+        result = self.inner._generate(messages, stop=stop, run_manager=run_manager, **kwargs)
+        self._record(messages, result.generations[0].message, time.perf_counter() - start, None, run_manager)
+        return result
+
+    async def _agenerate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                         run_manager=None, **kwargs: Any) -> ChatResult:
+        start = time.perf_counter()
+        result = await self.inner._agenerate(messages, stop=stop, run_manager=run_manager, **kwargs)
+        self._record(messages, result.generations[0].message, time.perf_counter() - start, None, run_manager)
+        return result
+
+    def _stream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                run_manager=None, **kwargs: Any) -> Iterator[ChatGenerationChunk]:
+        start = time.perf_counter()
+        first_token, combined = None, None
+        for chunk in self.inner._stream(messages, stop=stop, run_manager=run_manager, **kwargs):
+            if first_token is None and chunk.message.content:
+                first_token = time.perf_counter() - start
+            combined = chunk if combined is None else combined + chunk
+            yield chunk
+        if combined is not None:
+            self._record(messages, combined.message, time.perf_counter() - start, first_token, run_manager)
+
+    async def _astream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                       run_manager=None, **kwargs: Any) -> AsyncIterator[ChatGenerationChunk]:
+        start = time.perf_counter()
+        first_token, combined = None, None
+        async for chunk in self.inner._astream(messages, stop=stop, run_manager=run_manager, **kwargs):
+            if first_token is None and chunk.message.content:
+                first_token = time.perf_counter() - start
+            combined = chunk if combined is None else combined + chunk
+            yield chunk
+        if combined is not None:
+            self._record(messages, combined.message, time.perf_counter() - start, first_token, run_manager)
+
+    def close(self) -> None:
+        self.recording.close()
+
+    def format_stats(self) -> str:
+        return f"Recorded {self.recording.calls} LLM calls to '{self.recording.path}'"
+
+
+class _Recorded:
+    """The recorded calls still to be replayed, by prompt key, and what has been served so far."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.model = ""
+        self.total = 0
+        self.served = 0
+        self._pending: Dict[str, Deque[Dict[str, Any]]] = {}
+        self._lock = threading.Lock()
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                record = json.loads(line)
+                self.model = self.model or record.get("model", "")
+                self._pending.setdefault(prompt_key(record["prompt"]), deque()).append(record)
+                self.total += 1
+
+    def take(self, messages: List[BaseMessage], role: Optional[str]) -> Dict[str, Any]:
+        """The next recorded call for this prompt; raises ReplayMismatchError if there is none."""
+        payload = prompt_payload(messages)
+        key = prompt_key(payload)
+        with self._lock:
+            pending = self._pending.get(key)
+            if pending:
+                self.served += 1
+                return pending.popleft()
+            remaining = [record for queue in self._pending.values() for record in queue]
+            served = self.served
+        raise ReplayMismatchError(self._mismatch(payload, role, remaining, served))
+
+    def _mismatch(self, payload: List[List[Any]], role: Optional[str],
+                  remaining: List[Dict[str, Any]], served: int) -> str:
+        who = f" from {role}" if role else ""
+        header = (f"Replay mismatch: call {served + 1}{who} sent a prompt that is not in '{self.path}' "
+                  f"({len(remaining)} of {self.total} recorded calls unused)")
+        if not remaining:
+            return header + "; the recording has no calls left"
+        # Show the difference from the unused recorded prompt it most resembles, by the same role if possible
+        candidates = [record for record in remaining if role and record.get("role") == role] or remaining
+        text = _prompt_text(payload)
+        closest = max(candidates, key=lambda record: difflib.SequenceMatcher(
+            None, _prompt_text(record["prompt"]), text).quick_ratio())
+        diff = difflib.unified_diff(_prompt_text(closest["prompt"]).splitlines(), text.splitlines(),
+                                    f"recorded call {closest['call']} ({closest.get('role') or 'unknown role'})",
+                                    "this run", lineterm="", n=1)
+        return header + "\n" + "\n".join(list(diff)[:60])
+
+    def unused(self) -> int:
+        with self._lock:
+            return sum(len(queue) for queue in self._pending.values())
+
+
+class ReplayChatModel(BaseChatModel):
+    """Answers every call from a recording made by RecordingChatModel, without any network access."""
+
+    recorded: Any
+    """The _Recorded calls being served."""
+    original_latency: bool = True
+    """Wait as long as each recorded call took; off, responses return at once."""
+    cache: Union[BaseCache, bool, None] = Field(default=False, exclude=True)
+    """Never answered from the response cache, so every call is checked against the recording."""
+
+    @classmethod
+    def from_file(cls, path: str, original_latency: bool = True) -> "ReplayChatModel":
+        return cls(recorded=_Recorded(path), original_latency=original_latency)
+
+    @property
+    def _llm_type(self) -> str:
+        return "replay"
+
+    @property
+    def _identifying_params(self) -> Dict[str, Any]:
+        return {"model_name": self.model_name, "recording": self.recorded.path}
+
+    @property
+    def model_name(self) -> str:
+        return self.recorded.model
+
+    def _message(self, record: Dict[str, Any]) -> AIMessage:
+        return messages_from_dict([record["response"]])[0]
+
+    def _delays(self, record: Dict[str, Any], pieces: int):
+        """Seconds before the first chunk and between the later ones, as the recorded call took."""
+        if not self.original_latency:
+            return 0.0, 0.0
+        first = record.get("first_token")
+        if first is None:
+            return record["latency"], 0.0
+        return first, max(0.0, record["latency"] - first) / max(1, pieces - 1)
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                  run_manager=None, **kwargs: Any) -> ChatResult:
+        record = self.recorded.take(messages, _role(run_manager))
+        if self.original_latency:
+            time.sleep(record["latency"])
+        return _result(self._message(record))
+
+    async def _agenerate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                         run_manager=None, **kwargs: Any) -> ChatResult:
+        record = self.recorded.take(messages, _role(run_manager))
+        if self.original_latency:
+            await asyncio.sleep(record["latency"])
+        return _result(self._message(record))
+
+    def _stream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                run_manager=None, **kwargs: Any) -> Iterator[ChatGenerationChunk]:
+        record = self.recorded.take(messages, _role(run_manager))
+        message = self._message(record)
+        pieces = re.findall(r"\S+\s*", message.content) or [message.content]
+        first, between = self._delays(record, len(pieces))
+        for index, piece in enumerate(pieces):
+            delay = first if index == 0 else between
+            if delay:
+                time.sleep(delay)
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content=piece))
+            if run_manager:
+                run_manager.on_llm_new_token(piece, chunk=chunk)
+            yield chunk
+        yield ChatGenerationChunk(message=AIMessageChunk(content="", usage_metadata=message.usage_metadata))
+
+    async def _astream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                       run_manager=None, **kwargs: Any) -> AsyncIterator[ChatGenerationChunk]:
+        record = self.recorded.take(messages, _role(run_manager))
+        message = self._message(record)
+        pieces = re.findall(r"\S+\s*", message.content) or [message.content]
+        first, between = self._delays(record, len(pieces))
+        for index, piece in enumerate(pieces):
+            delay = first if index == 0 else between
+            if delay:
+                await asyncio.sleep(delay)
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content=piece))
+            if run_manager:
+                await run_manager.on_llm_new_token(piece, chunk=chunk)
+            yield chunk
+        yield ChatGenerationChunk(message=AIMessageChunk(content="", usage_metadata=message.usage_metadata))
+
+    def close(self) -> None:
+        pass
+
+    def format_stats(self) -> str:
+        unused = self.recorded.unused()
+        stats = f"Replayed {self.recorded.served} of {self.recorded.total} recorded LLM calls from '{self.recorded.path}'"
+        if unused:
+            stats += f"; {unused} recorded calls were never asked for"
+        return stats
+
+
+def replay_llm_from_args(args: argparse.Namespace) -> Optional[ReplayChatModel]:
+    """The replay model for --replay, or None when the run is not a replay."""
+    if not args.replay:
+        return None
+    return ReplayChatModel.from_file(args.replay, original_latency=args.replay_latency == "original")
+
+
+def recording_llm_from_args(args: argparse.Namespace, llm: BaseChatModel) -> BaseChatModel:
+    """llm wrapped in a RecordingChatModel for --record, or llm itself without it."""
+    if not args.record:
+        return llm
+    return RecordingChatModel.to_file(llm, args.record)
@@ -0,0 +1,321 @@
+"""
+Retries, backoff and circuit breaking for LLM calls
+
+A ResilientCaller wraps each LLM call so a transient provider failure (a 429,
+a 5xx or a dropped connection) is retried instead of ending the run:
+
+- Retries back off exponentially with full jitter, so callers that failed
+  together do not retry together.
+- A Retry-After (or retry-after-ms) header on the error is honoured instead
+  of the computed backoff.
+- Each endpoint has a CircuitBreaker. After a run of consecutive failures the
+  breaker opens and callers wait out the cool-down instead of hammering the
+  provider; one probe call then decides whether it closes again.
+- A per-call deadline bounds the total time spent on one logical call,
+  including every retry and wait. The breaker only decides how long a
+  caller waits between attempts; max_attempts bounds how many it makes in
+  every breaker state, so a call ends even without a deadline.
+
+Errors that retrying cannot fix (a 400, an authentication error) are raised
+at once and do not count against the breaker.
+
+    caller = ResilientCaller(RetryPolicy(max_attempts=5, deadline=300))
+    response = caller.call(lambda: llm.invoke(prompt), endpoint=endpoint_of(llm))
+"""
+
+import argparse
+import asyncio
+import random
+import threading
+import time
+from dataclasses import dataclass
+from email.utils import parsedate_to_datetime
+from typing import Awaitable, Callable, Dict, Optional, TypeVar
+
+
+T = TypeVar("T")
+
+# HTTP statuses worth retrying: timeouts, conflicts, rate limits and server errors
+RETRYABLE_STATUSES = frozenset({408, 409, 429, 500, 502, 503, 504, 529})
+
+# Exception classes (matched by name, so no client library is imported here)
+# raised by openai and httpx when a request never got a response
+_TRANSIENT_ERROR_NAMES = frozenset({
+    "APIConnectionError", "APITimeoutError", "TransportError", "TimeoutException",
+    "ConnectError", "ReadError", "RemoteProtocolError",
+})
+
+
+class CircuitOpenError(RuntimeError):
+    """Raised when an endpoint's breaker is open and the call's deadline does not allow waiting."""
+
+
+class DeadlineExceeded(TimeoutError):
+    """Raised when a call and its retries do not finish within the call's deadline."""
+
+
+@dataclass(frozen=True)
+class RetryPolicy:
+    """How often and how long to retry one logical LLM call."""
+    max_attempts: int = 5
+    base_delay: float = 0.5
+    max_delay: float = 30.0
+    # Seconds one logical call may take in total, retries included; None for no limit
+    deadline: Optional[float] = None
+
+    def __post_init__(self):
+        if self.max_attempts < 1:
+            raise ValueError("max_attempts must be at least 1")
+        if self.deadline is not None and self.deadline <= 0:
+            raise ValueError("deadline must be positive, or None for no limit")
+
+    def backoff(self, attempt: int) -> float:
+        """Full-jitter delay before retry number attempt (1 for the first retry)."""
+        return random.uniform(0.0, min(self.max_delay, self.base_delay * 2 ** (attempt - 1)))
+
+
+def status_code(error: BaseException) -> Optional[int]:
+    """HTTP status of a provider error, if it carries one."""
+    status = getattr(error, "status_code", None)
+    if status is None:
+        status = getattr(getattr(error, "response", None), "status_code", None)
+    return status if isinstance(status, int) else None
+
+
+def retry_after(error: BaseException) -> Optional[float]:
+    """Seconds the provider asked us to wait, from Retry-After or retry-after-ms headers."""
+    headers = getattr(getattr(error, "response", None), "headers", None)
+    if not headers:
+        return None
+    try:
+        milliseconds = headers.get("retry-after-ms")
+        if milliseconds is not None:
+            return max(0.0, float(milliseconds) / 1000)
+        value = headers.get("retry-after")
+        if value is None:
+            return None
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            # An HTTP date rather than a number of seconds
+            return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def is_retryable(error: BaseException) -> bool:
+    """Whether the error is transient: a retryable status, a timeout or a dropped connection."""
+    status = status_code(error)
+    if status is not None:
+        return status in RETRYABLE_STATUSES
+    if isinstance(error, (ConnectionError, TimeoutError)) and not isinstance(error, DeadlineExceeded):
+        return True
+    return any(cls.__name__ in _TRANSIENT_ERROR_NAMES for cls in type(error).__mro__)
+
+
+def endpoint_of(llm) -> str:
+    """Breaker key for a chat model: its class, model name and base URL."""
+    model = getattr(llm, "model_name", None) or getattr(llm, "model", None) or ""
+    base_url = getattr(llm, "openai_api_base", None) or ""
+    return f"{type(llm).__name__}:{model}@{base_url}"
+
+
+class CircuitBreaker:
+    """
+    Closed, open and half-open breaker for one endpoint.
+
+    failure_threshold consecutive failures open the breaker for reset_timeout
+    seconds. After that a single probe call is let through: success closes
+    the breaker, failure opens it for another reset_timeout.
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self.times_opened = 0
+        self._probing = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self.opened_at is None:
+                return "closed"
+            if time.monotonic() - self.opened_at < self.reset_timeout:
+                return "open"
+            return "half_open"
+
+    def acquire(self) -> float:
+        """Return 0 if a call may go ahead now, otherwise the seconds until it may."""
+        with self._lock:
+            if self.opened_at is None:
+                return 0.0
+            remaining = self.opened_at + self.reset_timeout - time.monotonic()
+            if remaining > 0:
+                return remaining
+            if self._probing:
+                # Another caller is probing; check back shortly
+                return min(1.0, self.reset_timeout)
+            self._probing = True
+            return 0.0
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._probing = False
+
+    def record_ignored(self) -> None:
+        """Record a call that failed for a reason unrelated to the endpoint's health; a probe may run again."""
+        with self._lock:
+            self._probing = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+            if self._probing or (self.opened_at is None and self.failures >= self.failure_threshold):
+                if self.opened_at is None:
+                    self.times_opened += 1
+                self.opened_at = time.monotonic()
+            self._probing = False
+
+
+class ResilientCaller:
+    """Runs LLM calls under a RetryPolicy with one CircuitBreaker per endpoint."""
+
+    def __init__(self, policy: Optional[RetryPolicy] = None,
+                 failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.policy = policy or RetryPolicy()
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.retries = 0
+        self.failures = 0
+
+    def breaker(self, endpoint: str) -> CircuitBreaker:
+        with self._lock:
+            breaker = self._breakers.get(endpoint)
+            if breaker is None:
+                breaker = self._breakers[endpoint] = CircuitBreaker(self.failure_threshold, self.reset_timeout)
+            return breaker
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    def _next_wait(self, error: BaseException, attempt: int, breaker: CircuitBreaker,
+                   stop_at: Optional[float]) -> float:
+        """Seconds to wait before the next attempt; re-raises error when no attempt is left."""
+        if not is_retryable(error) or attempt >= self.policy.max_attempts:
+            raise error
+        if breaker.state != "closed":
+            # The breaker paces the retries from here: the next attempt waits in _breaker_wait
+            return 0.0
+        delay = retry_after(error)
+        if delay is None:
+            delay = self.policy.backoff(attempt)
+        if stop_at is not None and time.monotonic() + delay >= stop_at:
+            raise DeadlineExceeded(f"LLM call gave up after {attempt} attempts: {error}") from error
+        return delay
+
+    def _breaker_wait(self, breaker: CircuitBreaker, endpoint: str, stop_at: Optional[float]) -> float:
+        wait = breaker.acquire()
+        if wait and stop_at is not None and time.monotonic() + wait >= stop_at:
+            self._count("failures")
+            raise CircuitOpenError(f"circuit for {endpoint} is open; retrying in {wait:.1f}s would pass the deadline")
+        return wait
+
+    def _stop_at(self, deadline: Optional[float]) -> Optional[float]:
+        deadline = self.policy.deadline if deadline is None else deadline
+        if deadline is not None and deadline <= 0:
+            raise ValueError("deadline must be positive, or None for the policy's")
+        return time.monotonic() + deadline if deadline is not None else None
+
+    def call(self, fn: Callable[[], T], endpoint: str = "default", deadline: Optional[float] = None) -> T:
+        """Call fn, retrying transient failures; deadline overrides the policy's for this call."""
+        stop_at = self._stop_at(deadline)
+        breaker = self.breaker(endpoint)
+        self._count("calls")
+        attempt = 0
+        while True:
+            wait = self._breaker_wait(breaker, endpoint, stop_at)
+            if wait:
+                time.sleep(wait)
+                continue
+            attempt += 1
+            try:
+                result = fn()
+            except Exception as e:
+                if is_retryable(e):
+                    breaker.record_failure()
+                else:
+                    breaker.record_ignored()
+                try:
+                    delay = self._next_wait(e, attempt, breaker, stop_at)
+                except BaseException:
+                    self._count("failures")
+                    raise
+                self._count("retries")
+                time.sleep(delay)
+                continue
+            breaker.record_success()
+            return result
+
+    async def acall(self, fn: Callable[[], Awaitable[T]], endpoint: str = "default",
+                    deadline: Optional[float] = None) -> T:
+        """Async version of call; each attempt is also cut off when the deadline passes."""
+        deadline = self.policy.deadline if deadline is None else deadline
+        stop_at = self._stop_at(deadline)
+        breaker = self.breaker(endpoint)
+        self._count("calls")
+        attempt = 0
+        while True:
+            wait = self._breaker_wait(breaker, endpoint, stop_at)
+            if wait:
+                await asyncio.sleep(wait)
+                continue
+            attempt += 1
+            try:
+                if stop_at is None:
+                    result = await fn()
+                else:
+                    result = await asyncio.wait_for(fn(), max(0.0, stop_at - time.monotonic()))
+            except Exception as e:
+                if isinstance(e, asyncio.TimeoutError) and stop_at is not None and time.monotonic() >= stop_at:
+                    breaker.record_failure()
+                    self._count("failures")
+                    raise DeadlineExceeded(f"LLM call did not finish within its {deadline:g}s deadline") from e
+                if is_retryable(e):
+                    breaker.record_failure()
+                else:
+                    breaker.record_ignored()
+                try:
+                    delay = self._next_wait(e, attempt, breaker, stop_at)
+                except BaseException:
+                    self._count("failures")
+                    raise
+                self._count("retries")
+                await asyncio.sleep(delay)
+                continue
+            breaker.record_success()
+            return result
+
+    def format_stats(self) -> str:
+        opened = sum(breaker.times_opened for breaker in self._breakers.values())
+        return (f"LLM calls: {self.calls}, retried {self.retries} times, "
+                f"{self.failures} failed, circuit opened {opened} times")
+
+
+def caller_from_args(args: argparse.Namespace) -> ResilientCaller:
+    """Build the shared ResilientCaller from parsed command line options."""
+    policy = RetryPolicy(
+        max_attempts=args.max_retries + 1,
+        base_delay=args.retry_base_delay,
+        max_delay=args.retry_max_delay,
+        deadline=args.call_deadline or None,
+    )
+    return ResilientCaller(policy, args.breaker_threshold, args.breaker_reset)
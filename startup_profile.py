@@ -0,0 +1,70 @@
+"""
+Import-time profiling for the simulation scripts
+
+ImportProfiler wraps builtins.__import__ between start() and stop() and
+records how long each import made by the profiled code takes, including
+everything that import pulls in. Imports made by the imported modules
+themselves are counted against the top-level import that triggered them, so
+the report answers "what does this script pay for each of its imports".
+
+    profile = ImportProfiler().start()
+    import heavy_module
+    profile.stop()
+    print(profile.format())
+"""
+
+import builtins
+import threading
+import time
+from typing import Dict, List, Tuple
+
+# Imports of modules already loaded take microseconds; leave them out of the report
+MIN_REPORTED_SECONDS = 0.001
+
+
+class ImportProfiler:
+    """Time every top-level import made while profiling is active."""
+
+    def __init__(self):
+        self.timings: Dict[str, float] = {}
+        self.elapsed = 0.0
+        self._original = None
+        self._started = 0.0
+        self._local = threading.local()
+
+    def start(self) -> "ImportProfiler":
+        self._original = builtins.__import__
+        self._started = time.perf_counter()
+        builtins.__import__ = self._import
+        return self
+
+    def stop(self) -> "ImportProfiler":
+        if self._original is not None:
+            builtins.__import__ = self._original
+            self._original = None
+            self.elapsed = time.perf_counter() - self._started
+        return self
+
+    def _import(self, name, globals=None, locals=None, fromlist=(), level=0):
+        depth = getattr(self._local, "depth", 0)
+        self._local.depth = depth + 1
+        start = time.perf_counter()
+        try:
+            return self._original(name, globals, locals, fromlist, level)
+        finally:
+            self._local.depth = depth
+            if depth == 0:
+                self.timings[name] = self.timings.get(name, 0.0) + time.perf_counter() - start
+
+    def slowest(self) -> List[Tuple[str, float]]:
+        """Imports that cost anything noticeable, slowest first."""
+        return sorted(((name, seconds) for name, seconds in self.timings.items() if seconds >= MIN_REPORTED_SECONDS),
+                      key=lambda item: item[1], reverse=True)
+
+    def format(self) -> str:
+        total = sum(self.timings.values())
+        lines = [f"Startup imports: {total:.2f}s of {self.elapsed:.2f}s profiled",
+                 f"{'module':<40} {'seconds':>8} {'share':>6}"]
+        for name, seconds in self.slowest():
+            lines.append(f"{name:<40} {seconds:>8.3f} {seconds / total:>6.0%}")
+        return "\n".join(lines)
@@ -0,0 +1,120 @@
+"""
+Token streaming helpers for the Book Store Project Simulation
+
+stream_llm prints a response token by token as it arrives, and
+LatencyTracker records time-to-first-token and total latency for every call,
+either directly or as a LangChain callback handler when the calls are made
+inside a LangGraph run. Calls are attributed to the role found in the
+``agent_role`` metadata key.
+"""
+
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from uuid import UUID
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.messages import AIMessage
+
+
+@dataclass
+class CallLatency:
+    """Latency of one LLM call."""
+    role: str
+    time_to_first_token: Optional[float]
+    total: float
+
+    def format(self) -> str:
+        first = f"{self.time_to_first_token:.2f}s" if self.time_to_first_token is not None else "n/a"
+        return f"first token {first}, total {self.total:.2f}s"
+
+
+class LatencyTracker(BaseCallbackHandler):
+    """Collects CallLatency records, as a callback handler or through record()."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._running: Dict[UUID, Tuple[str, float, Optional[float]]] = {}
+        self.calls: List[CallLatency] = []
+
+    def record(self, role: str, time_to_first_token: Optional[float], total: float) -> CallLatency:
+        call = CallLatency(role, time_to_first_token, total)
+        with self._lock:
+            self.calls.append(call)
+        return call
+
+    def _start(self, run_id: UUID, metadata: Optional[Dict[str, Any]]) -> None:
+        role = (metadata or {}).get("agent_role") or (metadata or {}).get("langgraph_node", "unknown")
+        with self._lock:
+            self._running[run_id] = (role, time.perf_counter(), None)
+
+    def on_chat_model_start(self, serialized, messages, *, run_id: UUID,
+                            metadata: Optional[Dict[str, Any]] = None, **kwargs: Any) -> None:
+        self._start(run_id, metadata)
+
+    def on_llm_start(self, serialized, prompts, *, run_id: UUID,
+                     metadata: Optional[Dict[str, Any]] = None, **kwargs: Any) -> None:
+        self._start(run_id, metadata)
+
+    def on_llm_new_token(self, token: str, *, run_id: UUID, **kwargs: Any) -> None:
+        with self._lock:
+            running = self._running.get(run_id)
+            if running is not None and running[2] is None and token:
+                role, start, _ = running
+                self._running[run_id] = (role, start, time.perf_counter() - start)
+
+    def on_llm_end(self, response, *, run_id: UUID, **kwargs: Any) -> None:
+        with self._lock:
+            running = self._running.pop(run_id, None)
+        if running is not None:
+            role, start, first = running
+            self.record(role, first, time.perf_counter() - start)
+
+    def format_table(self) -> str:
+        """Per-role call count, mean time to first token and mean total latency."""
+        by_role: Dict[str, List[CallLatency]] = {}
+        for call in self.calls:
+            by_role.setdefault(call.role, []).append(call)
+
+        lines = [f"{'role':<26} {'calls':>5} {'first token':>12} {'total':>9}"]
+        for role, calls in by_role.items():
+            firsts = [c.time_to_first_token for c in calls if c.time_to_first_token is not None]
+            first = f"{sum(firsts) / len(firsts):.2f}s" if firsts else "n/a"
+            total = sum(c.total for c in calls) / len(calls)
+            lines.append(f"{role:<26} {len(calls):>5} {first:>12} {total:>8.2f}s")
+        return "\n".join(lines)
+
+
+def stream_llm(llm, prompt, on_token: Callable[[str], None], role: str,
+               tracker: Optional[LatencyTracker] = None) -> Tuple[AIMessage, CallLatency]:
+    """
+    Stream a response, passing each token to ``on_token`` as it arrives.
+
+    Returns the complete message and the call's latency, which is also
+    recorded in ``tracker`` when one is given.
+    """
+    start = time.perf_counter()
+    first = None
+    full = None
+    for chunk in llm.stream(prompt, config={"metadata": {"agent_role": role}}):
+        if first is None and chunk.content:
+            first = time.perf_counter() - start
+        if chunk.content:
+            on_token(chunk.content)
+        full = chunk if full is None else full + chunk
+    total = time.perf_counter() - start
+
+    message = AIMessage(content=full.content if full is not None else "",
+                        response_metadata=full.response_metadata if full is not None else {},
+                        usage_metadata=getattr(full, "usage_metadata", None))
+    if tracker is not None:
+        latency = tracker.record(role, first, total)
+    else:
+        latency = CallLatency(role, first, total)
+    return message, latency
+
+
+def print_token(token: str) -> None:
+    """Write a token to the terminal immediately."""
+    print(token, end="", flush=True)
@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+"""
+Local OpenAI-compatible stub server that injects provider failures
+
+Serves POST /v1/chat/completions (plain and streamed) with the FakeChatModel's
+deterministic answers, and fails a configurable share of requests the way a
+provider under load does: 429s with a Retry-After header, 5xx errors, or
+connections dropped without a response. Point either simulation at it to
+watch the retry layer ride out a rate-limit storm:
+
+    python stub_llm_server.py --failure-rate 0.3 --statuses 429,503 --burst 6
+    python LangGraph.py --base-url http://127.0.0.1:8765/v1 --api-key stub --no-visualize
+    OPENAI_API_KEY=stub python LangChain.py --base-url http://127.0.0.1:8765/v1
+
+--burst fails the first N requests outright, which is enough to open the
+circuit breaker with the default --breaker-threshold.
+"""
+
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
+
+from fake_llm import FakeChatModel
+
+_MESSAGE_TYPES = {"system": SystemMessage, "assistant": AIMessage}
+
+
+class FailureInjector:
+    """Decides, request by request, whether and how the stub fails."""
+
+    def __init__(self, failure_rate: float = 0.0, statuses=(429,), burst: int = 0,
+                 retry_after: float = 1.0, seed: int = None):
+        self.failure_rate = failure_rate
+        self.statuses = tuple(statuses)
+        self.burst = burst
+        self.retry_after = retry_after
+        self.random = random.Random(seed)
+        self.requests = 0
+        self.failures = 0
+        self._lock = threading.Lock()
+
+    def next_failure(self):
+        """Return None to answer normally, a status code to fail with, or 0 to drop the connection."""
+        with self._lock:
+            self.requests += 1
+            if self.requests > self.burst and self.random.random() >= self.failure_rate:
+                return None
+            self.failures += 1
+            return self.random.choice(self.statuses)
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    model: FakeChatModel = None
+    injector: FailureInjector = None
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status: int, body: dict, headers: dict = None) -> None:
+        payload = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        if not self.path.rstrip("/").endswith("/chat/completions"):
+            self._send_json(404, {"error": {"message": f"no route {self.path}", "type": "invalid_request_error"}})
+            return
+
+        failure = self.injector.next_failure()
+        if failure == 0:
+            # A dropped connection: no status line at all
+            self.close_connection = True
+            return
+        if failure is not None:
+            headers = {"Retry-After": f"{self.injector.retry_after:g}"} if failure == 429 else {}
+            self._send_json(failure, {"error": {"message": f"injected {failure}", "type": "stub_error"}}, headers)
+            return
+
+        messages = [_MESSAGE_TYPES.get(m.get("role"), HumanMessage)(content=m.get("content") or "")
+                    for m in body.get("messages", [])]
+        content = self.model.invoke(messages).content
+        model = body.get("model", "stub")
+        created = int(time.time())
+        usage = {"prompt_tokens": sum(len(m.content) for m in messages) // 4,
+                 "completion_tokens": len(content) // 4}
+        usage["total_tokens"] = usage["prompt_tokens"] + usage["completion_tokens"]
+
+        if not body.get("stream"):
+            self._send_json(200, {
+                "id": f"chatcmpl-stub-{self.injector.requests}", "object": "chat.completion",
+                "created": created, "model": model, "usage": usage,
+                "choices": [{"index": 0, "finish_reason": "stop",
+                             "message": {"role": "assistant", "content": content}}],
+            })
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.close_connection = True
+        words = content.split(" ")
+        for index, word in enumerate(words):
+            delta = {"content": word if index == 0 else " " + word}
+            chunk = {"id": "chatcmpl-stub", "object": "chat.completion.chunk", "created": created,
+                     "model": model, "choices": [{"index": 0, "delta": delta, "finish_reason": None}]}
+            self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode("utf-8"))
+        final = {"id": "chatcmpl-stub", "object": "chat.completion.chunk", "created": created, "model": model,
+                 "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}]}
+        self.wfile.write(f"data: {json.dumps(final)}\n\ndata: [DONE]\n\n".encode("utf-8"))
+
+
+def serve(host: str = "127.0.0.1", port: int = 8765, injector: FailureInjector = None,
+          model: FakeChatModel = None) -> ThreadingHTTPServer:
+    """Start the stub server on a background thread and return it; call shutdown() to stop it."""
+    handler = type("Handler", (StubHandler,), {
+        "injector": injector or FailureInjector(),
+        "model": model or FakeChatModel(),
+    })
+    server = ThreadingHTTPServer((host, port), handler)
+    threading.Thread(target=server.serve_forever, name="stub-llm-server", daemon=True).start()
+    return server
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='OpenAI-compatible stub server that injects failures')
+    parser.add_argument('--host', default='127.0.0.1', help='Address to listen on (default: 127.0.0.1)')
+    parser.add_argument('--port', type=int, default=8765, help='Port to listen on (default: 8765)')
+    parser.add_argument('--failure-rate', type=float, default=0.2,
+                        help='Share of requests that fail after the burst (default: 0.2)')
+    parser.add_argument('--statuses', default='429,503',
+                        help='Comma-separated statuses to fail with; 0 drops the connection (default: 429,503)')
+    parser.add_argument('--burst', type=int, default=0, help='Fail the first N requests (default: 0)')
+    parser.add_argument('--retry-after', type=float, default=1.0,
+                        help='Retry-After seconds sent with every 429 (default: 1)')
+    parser.add_argument('--latency', type=float, default=0.0, help='Seconds each answer takes (default: 0)')
+    parser.add_argument('--seed', type=int, default=None, help='Seed for reproducible failures')
+    args = parser.parse_args()
+
+    injector = FailureInjector(args.failure_rate, [int(s) for s in args.statuses.split(",")],
+                               args.burst, args.retry_after, args.seed)
+    server = serve(args.host, args.port, injector, FakeChatModel(latency=args.latency))
+    print(f"Stub LLM server on http://{args.host}:{args.port}/v1 "
+          f"(failure rate {args.failure_rate:.0%}, statuses {args.statuses}, burst {args.burst})")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        print(f"\n{injector.requests} requests, {injector.failures} failed")
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+"""Unit tests for the estimate parser in estimates.py"""
+
+from estimates import (STATUS_INCONSISTENT, STATUS_INVALID, STATUS_MISSING, STATUS_OK, format_estimates,
+                       parse_estimate, parse_estimates, project_timeline)
+
+
+def test_parses_calculation_line():
+    parsed = parse_estimate("- 9 screens / 3 screens per week = 3 weeks", "ui_ux_designer")
+    assert parsed.status == STATUS_OK
+    estimate = parsed.primary
+    assert (estimate.quantity, estimate.unit, estimate.rate, estimate.rate_period) == (9, "screens", 3, "week")
+    assert estimate.duration_weeks == 3
+    assert estimate.duration_days == 15
+
+
+def test_rounded_up_duration_is_consistent():
+    assert parse_estimate("10 screens / 3 screens per week = 4 weeks").status == STATUS_OK
+
+
+def test_wrong_arithmetic_is_inconsistent():
+    assert parse_estimate("9 screens / 3 screens per week = 12 weeks").status == STATUS_INCONSISTENT
+
+
+def test_zero_rate_is_invalid():
+    parsed = parse_estimate("9 screens / 0 screens per week = 3 weeks")
+    assert parsed.status == STATUS_INVALID
+    assert not parsed.primary.consistent
+    assert parsed.duration_weeks is None
+
+
+def test_zero_rate_does_not_hide_valid_calculation():
+    parsed = parse_estimate("9 screens / 0 screens per week = 3 weeks\n"
+                            "9 screens / 3 screens per week = 3 weeks")
+    assert parsed.status == STATUS_OK
+    assert parsed.primary.rate == 3
+
+
+def test_missing_rate_is_missing():
+    assert parse_estimate("9 screens / per week = 3 weeks").status == STATUS_MISSING
+    assert parse_estimate("Total Screens / Productivity = Total Duration").status == STATUS_MISSING
+
+
+def test_malformed_rate_is_missing():
+    assert parse_estimate("9 screens / three screens per week = 3 weeks").status == STATUS_MISSING
+    assert parse_estimate("9 screens / 3 screens per fortnight = 3 weeks").status == STATUS_MISSING
+
+
+def test_table_and_timeline_survive_zero_rate():
+    parsed = parse_estimates({
+        "ui_ux_designer": "9 screens / 0 screens per week = 3 weeks",
+        "backend_developer": "12 endpoints / 4 endpoints per week = 3 weeks",
+        "qa_engineer": "No estimate yet.",
+    })
+    assert "invalid" in format_estimates(parsed)
+    timeline = project_timeline(parsed, {"backend_developer": ["ui_ux_designer"]})
+    assert timeline.missing == ["ui_ux_designer", "qa_engineer"]
+    assert timeline.durations == {"backend_developer": 3}
+    assert timeline.total_weeks == 3
@@ -0,0 +1,259 @@
+#!/usr/bin/env python3
+"""
+Append-only JSONL transcript of every simulation message, with an offset index
+
+A TranscriptLog appends one JSON line per message (run ID, role, sender,
+recipient, type, timestamp and content) to a log file that is only ever
+appended to, through a write buffer so a message costs no system call. Next
+to it, <log>.idx.sqlite records where each line starts: one (run, role,
+offset, length) row per message, indexed by run.
+
+A TranscriptReader memory-maps the log and queries the index, so pulling one
+run's transcript out of a multi-gigabyte log is an index lookup and a few
+slices of the map: neither the log nor the index is read in full. Lines
+written after the index was last flushed (a run that crashed, say) are found
+by scanning only the log's unindexed tail, and the next TranscriptLog to
+open the log adds them to the index.
+
+    log = TranscriptLog("transcripts.jsonl")
+    log.start_run(run_id)
+    log.write("scrum_master", "Please estimate the UI", recipient="ui_ux_designer")
+    log.close()
+
+    with TranscriptReader("transcripts.jsonl") as reader:
+        for record in reader.records(run_id, role="ui_ux_designer"):
+            print(record["content"])
+
+Run it as a script to list the runs in a log or print one of them:
+
+    python transcript_log.py transcripts.jsonl
+    python transcript_log.py transcripts.jsonl --run 9bc7578b3c74 --role scrum_master
+"""
+
+import argparse
+import json
+import mmap
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from cli_options import DEFAULT_TRANSCRIPT_PATH
+
+# Bytes buffered before the log is written to disk
+DEFAULT_BUFFER_SIZE = 64 * 1024
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (run TEXT NOT NULL, role TEXT NOT NULL, offset INTEGER NOT NULL,
+                                    length INTEGER NOT NULL);
+CREATE INDEX IF NOT EXISTS entries_by_run ON entries (run, offset);
+CREATE TABLE IF NOT EXISTS runs (run TEXT PRIMARY KEY, first_offset INTEGER NOT NULL);
+"""
+
+
+def index_path(path: str) -> str:
+    """Path of the SQLite offset index kept next to the log at path."""
+    return path + ".idx.sqlite"
+
+
+def _indexed_end(index: sqlite3.Connection) -> int:
+    """End of the last indexed line; rows are inserted in log order, so that is the last row."""
+    row = index.execute("SELECT offset + length FROM entries ORDER BY rowid DESC LIMIT 1").fetchone()
+    return row[0] if row else 0
+
+
+def _scan(buf, start: int) -> Iterator[Tuple[str, str, int, int]]:
+    """(run, role, offset, length) of every complete line in buf from start on."""
+    size = len(buf)
+    while start < size:
+        end = buf.find(b"\n", start)
+        if end == -1:
+            # A line still being written
+            return
+        try:
+            record = json.loads(buf[start:end])
+            yield record["run"], record["role"], start, end + 1 - start
+        except (ValueError, KeyError):
+            pass
+        start = end + 1
+
+
+class TranscriptLog:
+    """Thread-safe, buffered, append-only writer of the transcript log and its index."""
+
+    def __init__(self, path: str = DEFAULT_TRANSCRIPT_PATH, buffer_size: int = DEFAULT_BUFFER_SIZE):
+        self.path = path
+        self.buffer_size = buffer_size
+        self.run_id = "default"
+        self.written = 0
+        self._log = None
+        self._index = None
+        self._offset = 0
+        # Index rows are held back until the log lines they point to are on disk
+        self._pending: List[Tuple[str, str, int, int]] = []
+        self._pending_bytes = 0
+        self._lock = threading.Lock()
+
+    def start_run(self, run_id: str) -> None:
+        """Write the messages that follow under run_id."""
+        self.run_id = run_id
+
+    def _open(self) -> None:
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        self._log = open(self.path, "ab", buffering=self.buffer_size)
+        self._offset = self._log.seek(0, os.SEEK_END)
+        # A writer that crashed mid-line left a partial line; end it so the next record starts on its own
+        if self._offset:
+            with open(self.path, "rb") as f:
+                f.seek(-1, os.SEEK_END)
+                if f.read(1) != b"\n":
+                    self._log.write(b"\n")
+                    self._log.flush()
+                    self._offset += 1
+        self._index = sqlite3.connect(index_path(self.path), check_same_thread=False)
+        # The index can always be rebuilt from the log, so it is not worth an fsync per flush
+        self._index.execute("PRAGMA synchronous = OFF")
+        self._index.executescript(_SCHEMA)
+        # Index lines an earlier writer appended but never indexed, such as a crashed run's
+        start = _indexed_end(self._index)
+        if start < self._offset:
+            with open(self.path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buf:
+                self._insert(list(_scan(buf, start)))
+
+    def _insert(self, rows: List[Tuple[str, str, int, int]]) -> None:
+        self._index.executemany("INSERT INTO entries VALUES (?, ?, ?, ?)", rows)
+        first_offsets = {}
+        for run, _, offset, _ in rows:
+            first_offsets.setdefault(run, offset)
+        self._index.executemany("INSERT OR IGNORE INTO runs VALUES (?, ?)", first_offsets.items())
+        self._index.commit()
+
+    def write(self, role: Any, content: str, **fields: Any) -> None:
+        """Append one message by role to the current run; fields (sender, recipient, ...) are stored with it."""
+        role = str(getattr(role, "value", role))
+        record = {"run": self.run_id, "role": role, "ts": round(time.time(), 6), **fields, "content": content}
+        line = (json.dumps(record, ensure_ascii=False) + "\n").encode("utf-8")
+        with self._lock:
+            if self._log is None:
+                self._open()
+            self._log.write(line)
+            self._pending.append((self.run_id, role, self._offset, len(line)))
+            self._pending_bytes += len(line)
+            self._offset += len(line)
+            self.written += 1
+            if self._pending_bytes >= self.buffer_size:
+                self._flush()
+
+    def _flush(self) -> None:
+        # The log goes first, so no index row ever points past the end of the log
+        self._log.flush()
+        if self._pending:
+            self._insert(self._pending)
+        self._pending, self._pending_bytes = [], 0
+
+    def flush(self) -> None:
+        """Write buffered messages and their index rows to disk."""
+        with self._lock:
+            if self._log is not None:
+                self._flush()
+
+    def close(self) -> None:
+        with self._lock:
+            if self._log is not None:
+                self._flush()
+                self._log.close()
+                self._index.close()
+                self._log = self._index = None
+
+
+class TranscriptReader:
+    """Memory-mapped reader of a transcript log, querying its index for each run's messages."""
+
+    def __init__(self, path: str = DEFAULT_TRANSCRIPT_PATH):
+        self.path = path
+        self._file = open(path, "rb")
+        size = os.fstat(self._file.fileno()).st_size
+        # An empty file cannot be mapped; it has nothing to read either
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if size else b""
+        self._index = None
+        indexed_end = 0
+        if os.path.exists(index_path(path)):
+            self._index = sqlite3.connect(f"file:{index_path(path)}?mode=ro", uri=True, check_same_thread=False)
+            indexed_end = min(_indexed_end(self._index), size)
+        # Rows past the end of the map were written after it was taken and are left out
+        self._indexed_end = indexed_end
+        # run ID -> [(role, offset, length)] for the lines after the index, in log order
+        self._tail: Dict[str, List[Tuple[str, int, int]]] = {}
+        for run, role, offset, length in _scan(self._map, indexed_end):
+            self._tail.setdefault(run, []).append((role, offset, length))
+
+    def runs(self) -> List[str]:
+        """Run IDs in the order they first appear in the log."""
+        runs = []
+        if self._index is not None:
+            runs = [run for run, in self._index.execute(
+                "SELECT run FROM runs WHERE first_offset < ? ORDER BY first_offset", (self._indexed_end,))]
+        return list(dict.fromkeys(runs + list(self._tail)))
+
+    def roles(self, run_id: str) -> List[str]:
+        """Roles with messages in run_id, in order of their first message."""
+        return list(dict.fromkeys(role for role, _, _ in self._entries(run_id, None)))
+
+    def count(self, run_id: str, role: Optional[str] = None) -> int:
+        return sum(1 for _ in self._entries(run_id, role))
+
+    def _entries(self, run_id: str, role: Optional[str]) -> Iterator[Tuple[str, int, int]]:
+        if self._index is not None:
+            yield from self._index.execute(
+                "SELECT role, offset, length FROM entries WHERE run = ? AND offset + length <= ? "
+                "AND (? IS NULL OR role = ?) ORDER BY offset", (run_id, self._indexed_end, role, role))
+        for entry in self._tail.get(run_id, ()):
+            if role is None or entry[0] == role:
+                yield entry
+
+    def raw(self, run_id: str, role: Optional[str] = None) -> Iterator[bytes]:
+        """The JSON lines of one run, optionally only one role's, sliced straight from the map."""
+        for _, offset, length in self._entries(run_id, role):
+            yield self._map[offset:offset + length]
+
+    def records(self, run_id: str, role: Optional[str] = None) -> List[Dict[str, Any]]:
+        """The messages of one run, optionally only one role's, in the order they were written."""
+        return [json.loads(line) for line in self.raw(run_id, role)]
+
+    def close(self) -> None:
+        if self._index is not None:
+            self._index.close()
+        if isinstance(self._map, mmap.mmap):
+            self._map.close()
+        self._file.close()
+
+    def __enter__(self) -> "TranscriptReader":
+        return self
+
+    def __exit__(self, *exc_info) -> bool:
+        self.close()
+        return False
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='List the runs in a transcript log or print one of them')
+    parser.add_argument('log', nargs='?', default=DEFAULT_TRANSCRIPT_PATH,
+                        help=f'Transcript log to read (default: {DEFAULT_TRANSCRIPT_PATH})')
+    parser.add_argument('--run', type=str, default=None, help='Print the messages of this run')
+    parser.add_argument('--role', type=str, default=None, help='Only print messages by this role')
+    args = parser.parse_args()
+
+    with TranscriptReader(args.log) as reader:
+        if args.run is None:
+            for run_id in reader.runs():
+                print(f"{run_id}  {reader.count(run_id):>5} messages  {', '.join(reader.roles(run_id))}")
+            return
+        for record in reader.records(args.run, args.role):
+            recipient = f" to {record['recipient']}" if record.get("recipient") else ""
+            print(f"[{record['role']}{recipient}] {record['content']}\n")
+
+
+if __name__ == "__main__":
+    main()
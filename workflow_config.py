@@ -0,0 +1,241 @@
+"""
+Data-driven workflow definitions for the Book Store Project Simulation
+
+A workflow file (JSON, or YAML when PyYAML is installed) declares the agents,
+the experts the coordinator consults in order, the prompt each expert is sent
+and the dependencies between experts:
+
+    {
+      "name": "bookstore",
+      "brief": "I want to build a web-based mobile app for our bookstore ...",
+      "customer": "customer",                # optional
+      "intake": "product_owner",
+      "coordinator": "scrum_master",
+      "final_prompt": "Please provide a final summary ...",
+      "max_estimates": 7,                    # optional, defaults to every expert
+      "agents": {
+        "scrum_master": {"name": "Scrum_Master", "title": "Scrum Master",
+                         "color": "#90EE90", "system_message": "..."},
+        ...
+      },
+      "experts": [
+        {"role": "ui_ux_designer", "prompt": "...", "reply": "...",
+         "depends_on": [], "labels": ["Define User Stories", "User Stories & Estimates"]},
+        ...
+      ]
+    }
+
+load_workflow validates a file once and compiles it into a WorkflowDefinition
+whose routing, prompt and dependency tables are read-only mappings, so every
+routing step is a single lookup. LangChain.py and LangGraph.py both load
+their pipelines from the files in workflows/, so a custom pipeline is a new
+file passed with --workflow rather than a code change.
+"""
+
+import json
+import os
+import re
+from dataclasses import dataclass
+from types import MappingProxyType
+from typing import Any, Dict, Mapping, Optional, Tuple
+
+from dag_scheduler import topological_order
+
+WORKFLOWS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "workflows")
+
+_ROLE_NAME = re.compile(r"^[a-z][a-z0-9_]*$")
+# Node names the LangGraph builders use for themselves
+_RESERVED_ROLES = {"end", "experts"}
+_TOP_LEVEL_KEYS = {"name", "description", "brief", "customer", "intake", "coordinator",
+                   "final_prompt", "max_estimates", "agents", "experts"}
+_AGENT_KEYS = {"name", "title", "color", "system_message"}
+_EXPERT_KEYS = {"role", "prompt", "reply", "depends_on", "labels"}
+
+
+@dataclass(frozen=True)
+class AgentSpec:
+    """One agent: its role name, display names and system message."""
+    role: str
+    name: str
+    title: str
+    system_message: str
+    color: Optional[str] = None
+
+
+# eq=False keeps identity hashing, so a definition can key compiled-graph caches
+@dataclass(frozen=True, eq=False)
+class WorkflowDefinition:
+    """A validated workflow with its routing and prompt tables precomputed."""
+    name: str
+    path: str
+    brief: str
+    customer: Optional[str]
+    intake: str
+    coordinator: str
+    final_prompt: str
+    max_estimates: int
+    agents: Mapping[str, AgentSpec]
+    experts: Tuple[str, ...]
+    prompts: Mapping[str, str]
+    replies: Mapping[str, str]
+    labels: Mapping[str, Tuple[str, str]]
+    dependencies: Mapping[str, Tuple[str, ...]]
+    # role -> (node that runs next, role after that or None at the end of the relay)
+    routes: Mapping[str, Tuple[str, Optional[str]]]
+    # role that just reported -> expert the coordinator consults next
+    next_expert: Mapping[str, Optional[str]]
+    # (sender, recipient, message) for every turn of the relay, starting with the brief
+    conversation: Tuple[Tuple[str, str, str], ...]
+
+    @property
+    def system_messages(self) -> Mapping[str, str]:
+        return MappingProxyType({role: spec.system_message for role, spec in self.agents.items()})
+
+
+def _fail(path: str, message: str) -> None:
+    raise ValueError(f"{path}: {message}")
+
+
+def _read(path: str) -> Any:
+    with open(path, encoding="utf-8") as f:
+        if path.endswith((".yaml", ".yml")):
+            try:
+                import yaml
+            except ImportError:
+                _fail(path, "PyYAML is needed for YAML workflows: pip install pyyaml")
+            return yaml.safe_load(f)
+        return json.load(f)
+
+
+def _text(path: str, where: str, value: Any, required: bool = True) -> str:
+    if value is None and not required:
+        return ""
+    if not isinstance(value, str) or (required and not value.strip()):
+        _fail(path, f"{where} must be a non-empty string")
+    return value
+
+
+def _check_keys(path: str, where: str, data: Dict[str, Any], allowed: set) -> None:
+    unknown = set(data) - allowed
+    if unknown:
+        _fail(path, f"unknown {where} keys: {', '.join(sorted(unknown))}")
+
+
+def compile_workflow(data: Any, path: str = "<workflow>") -> WorkflowDefinition:
+    """Validate a parsed workflow document and build its lookup tables."""
+    if not isinstance(data, dict):
+        _fail(path, "a workflow must be a mapping")
+    _check_keys(path, "top-level", data, _TOP_LEVEL_KEYS)
+
+    raw_agents = data.get("agents")
+    if not isinstance(raw_agents, dict) or not raw_agents:
+        _fail(path, "'agents' must be a non-empty mapping of role name to agent")
+    agents = {}
+    for role, spec in raw_agents.items():
+        if not _ROLE_NAME.match(role) or role in _RESERVED_ROLES:
+            _fail(path, f"invalid role name '{role}' (lowercase letters, digits and underscores; "
+                        f"not {' or '.join(sorted(_RESERVED_ROLES))})")
+        if not isinstance(spec, dict):
+            _fail(path, f"agent '{role}' must be a mapping")
+        _check_keys(path, f"agent '{role}'", spec, _AGENT_KEYS)
+        agents[role] = AgentSpec(
+            role=role,
+            name=spec.get("name") or role,
+            title=spec.get("title") or role.replace("_", " ").title(),
+            system_message=_text(path, f"agents.{role}.system_message", spec.get("system_message")),
+            color=spec.get("color"),
+        )
+
+    def agent_role(key: str, required: bool = True) -> Optional[str]:
+        role = data.get(key)
+        if role is None and not required:
+            return None
+        if role not in agents:
+            _fail(path, f"'{key}' must name one of the agents, got {role!r}")
+        return role
+
+    intake = agent_role("intake")
+    coordinator = agent_role("coordinator")
+    customer = agent_role("customer", required=False)
+
+    raw_experts = data.get("experts")
+    if not isinstance(raw_experts, list) or not raw_experts:
+        _fail(path, "'experts' must be a non-empty list")
+    experts, prompts, replies, labels, dependencies = [], {}, {}, {}, {}
+    for index, expert in enumerate(raw_experts):
+        if not isinstance(expert, dict):
+            _fail(path, f"experts[{index}] must be a mapping")
+        _check_keys(path, f"experts[{index}]", expert, _EXPERT_KEYS)
+        role = expert.get("role")
+        if role not in agents:
+            _fail(path, f"experts[{index}].role must name one of the agents, got {role!r}")
+        if role in (intake, coordinator, customer) or role in prompts:
+            _fail(path, f"'{role}' cannot be listed as an expert here")
+        experts.append(role)
+        prompts[role] = _text(path, f"experts[{index}].prompt", expert.get("prompt"))
+        replies[role] = _text(path, f"experts[{index}].reply", expert.get("reply"), required=False)
+        label = expert.get("labels", ["", ""])
+        if not (isinstance(label, list) and len(label) == 2 and all(isinstance(x, str) for x in label)):
+            _fail(path, f"experts[{index}].labels must be a list of two strings")
+        labels[role] = tuple(label)
+        depends_on = expert.get("depends_on", [])
+        if not isinstance(depends_on, list):
+            _fail(path, f"experts[{index}].depends_on must be a list")
+        dependencies[role] = tuple(depends_on)
+
+    for role, deps in dependencies.items():
+        for dep in deps:
+            if dep not in dependencies:
+                _fail(path, f"'{role}' depends on '{dep}', which is not an expert in this workflow")
+    try:
+        topological_order(dependencies)
+    except ValueError as e:
+        _fail(path, str(e))
+
+    max_estimates = data.get("max_estimates", len(experts))
+    if not isinstance(max_estimates, int) or not 1 <= max_estimates <= len(experts):
+        _fail(path, f"'max_estimates' must be an integer between 1 and {len(experts)}")
+
+    brief = _text(path, "brief", data.get("brief"))
+    routes = {intake: (coordinator, experts[0])}
+    if customer is not None:
+        routes[customer] = (intake, coordinator)
+    next_expert = {intake: experts[0]}
+    conversation = [(intake, coordinator, brief)]
+    for position, role in enumerate(experts):
+        following = experts[position + 1] if position + 1 < len(experts) else None
+        routes[role] = (coordinator, following)
+        next_expert[role] = following
+        conversation.append((coordinator, role, prompts[role]))
+        conversation.append((role, coordinator, replies[role]))
+
+    return WorkflowDefinition(
+        name=_text(path, "name", data.get("name", os.path.splitext(os.path.basename(path))[0])),
+        path=path,
+        brief=brief,
+        customer=customer,
+        intake=intake,
+        coordinator=coordinator,
+        final_prompt=_text(path, "final_prompt", data.get("final_prompt")),
+        max_estimates=max_estimates,
+        agents=MappingProxyType(agents),
+        experts=tuple(experts),
+        prompts=MappingProxyType(prompts),
+        replies=MappingProxyType(replies),
+        labels=MappingProxyType(labels),
+        dependencies=MappingProxyType(dependencies),
+        routes=MappingProxyType(routes),
+        next_expert=MappingProxyType(next_expert),
+        conversation=tuple(conversation),
+    )
+
+
+def load_workflow(path: str) -> WorkflowDefinition:
+    """Read, validate and compile a JSON or YAML workflow file; raises ValueError on invalid files."""
+    return compile_workflow(_read(path), path)
+
+
+def add_workflow_arguments(parser, default: str) -> None:
+    """Add --workflow to an argparse parser."""
+    parser.add_argument('--workflow', type=str, default=default, metavar='PATH',
+                        help=f'JSON or YAML workflow definition (default: {os.path.relpath(default)})')
@@ -0,0 +1,184 @@
+"""
+Cached workflow diagrams drawn from the compiled LangGraph graph
+
+graph_topology reads the nodes and edges of a compiled graph through
+get_graph(), so a diagram always shows what actually runs. The topology is
+hashed together with the titles, colours and labels it is drawn with, and
+the rendered files are stored under that hash:
+
+    .workflow_diagrams/<hash>.dot   always written
+    .workflow_diagrams/<hash>.png   when Graphviz's dot binary is installed
+
+A workflow that has been drawn before is not rendered again, and
+render_async draws new ones on a background thread, so a run never waits on
+Graphviz.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import subprocess
+import tempfile
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Dict, Mapping, NamedTuple, Optional, Tuple
+
+DIAGRAM_DIR = ".workflow_diagrams"
+
+# Part of every hash; bump it when the drawing style changes so old files are redrawn
+DIAGRAM_VERSION = 1
+
+_DOT_HEADER = [
+    '  graph [rankdir=TB, fontsize=16, fontname=Arial];',
+    '  node [shape=box, style=filled, fillcolor=lightblue, fontname=Arial, fontsize=12];',
+    '  edge [fontname=Arial, fontsize=10, fontcolor="#333333"];',
+]
+
+
+@dataclass(frozen=True)
+class Topology:
+    """The nodes and edges of a compiled graph, with everything the diagram shows about them."""
+    title: str
+    nodes: Tuple[Tuple[str, str, Optional[str]], ...]  # (id, label, colour)
+    edges: Tuple[Tuple[str, str, str, bool], ...]      # (source, target, label, conditional)
+
+    @property
+    def digest(self) -> str:
+        payload = json.dumps([DIAGRAM_VERSION, self.title, self.nodes, self.edges], separators=(",", ":"))
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16]
+
+
+class Diagram(NamedTuple):
+    path: str
+    cached: bool
+
+
+def _default_label(node_id: str) -> str:
+    # "__start__" -> "Start", "experts" -> "Experts"
+    return node_id.strip("_").replace("_", " ").title()
+
+
+def graph_topology(compiled, title: str,
+                   node_labels: Optional[Mapping[str, str]] = None,
+                   node_colors: Optional[Mapping[str, str]] = None,
+                   edge_labels: Optional[Mapping[Tuple[str, str], str]] = None) -> Topology:
+    """Read a compiled graph's nodes and edges into a hashable, order-independent Topology."""
+    graph = compiled.get_graph()
+    node_labels = node_labels or {}
+    node_colors = node_colors or {}
+    edge_labels = edge_labels or {}
+    nodes = tuple(sorted(
+        (node_id, node_labels.get(node_id) or _default_label(node_id), node_colors.get(node_id))
+        for node_id in graph.nodes
+    ))
+    edges = tuple(sorted(
+        (edge.source, edge.target, edge_labels.get((edge.source, edge.target), ""), bool(edge.conditional))
+        for edge in graph.edges
+    ))
+    return Topology(title, nodes, edges)
+
+
+def _quote(text: str) -> str:
+    return '"' + text.replace("\\", "\\\\").replace('"', '\\"') + '"'
+
+
+def to_dot(topology: Topology) -> str:
+    """Graphviz source for a topology; conditional edges are dashed."""
+    lines = [f"digraph {_quote(topology.title)} {{", *_DOT_HEADER,
+             f"  label={_quote(topology.title)};"]
+    for node_id, label, color in topology.nodes:
+        attrs = [f"label={_quote(label)}"]
+        if color:
+            attrs.append(f"fillcolor={_quote(color)}")
+        if node_id.startswith("__"):
+            attrs.append("shape=oval")
+        lines.append(f"  {_quote(node_id)} [{', '.join(attrs)}];")
+    for source, target, label, conditional in topology.edges:
+        attrs = []
+        if label:
+            attrs.append(f"label={_quote(label.replace(' ', chr(10), 1))}")
+        if conditional:
+            attrs.append("style=dashed")
+        suffix = f" [{', '.join(attrs)}]" if attrs else ""
+        lines.append(f"  {_quote(source)} -> {_quote(target)}{suffix};")
+    lines.append("}")
+    return "\n".join(lines) + "\n"
+
+
+def _write_atomic(path: str, data: bytes) -> None:
+    # A concurrent reader sees either no file or the whole file, never half of one
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path) or ".", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+class DiagramCache:
+    """Rendered diagrams on disk, one set of files per topology hash."""
+
+    def __init__(self, directory: str = DIAGRAM_DIR):
+        self.directory = directory
+
+    def path(self, topology: Topology, extension: str) -> str:
+        return os.path.join(self.directory, f"{topology.digest}.{extension}")
+
+    def lookup(self, topology: Topology) -> Optional[str]:
+        """The best diagram already drawn for this topology, or None if it must be drawn."""
+        png_path = self.path(topology, "png")
+        if os.path.exists(png_path):
+            return png_path
+        dot_path = self.path(topology, "dot")
+        # A DOT-only entry is redrawn once the dot binary is available
+        if os.path.exists(dot_path) and shutil.which("dot") is None:
+            return dot_path
+        return None
+
+    def render(self, topology: Topology) -> Diagram:
+        """Return the cached diagram for topology, drawing it first if needed."""
+        cached = self.lookup(topology)
+        if cached is not None:
+            return Diagram(cached, True)
+
+        os.makedirs(self.directory, exist_ok=True)
+        source = to_dot(topology).encode("utf-8")
+        dot_path = self.path(topology, "dot")
+        _write_atomic(dot_path, source)
+
+        dot_binary = shutil.which("dot")
+        if dot_binary is None:
+            return Diagram(dot_path, False)
+        result = subprocess.run([dot_binary, "-Tpng"], input=source, capture_output=True, check=True)
+        png_path = self.path(topology, "png")
+        _write_atomic(png_path, result.stdout)
+        return Diagram(png_path, False)
+
+
+_executor = None
+_renders: Dict[str, Future] = {}
+_renders_lock = threading.Lock()
+
+
+def render_async(topology: Topology, cache: Optional[DiagramCache] = None) -> "Future[Diagram]":
+    """
+    Render topology on the background diagram thread and return its Future.
+
+    Each topology is rendered at most once per process; later calls share the
+    first call's Future. Renders still running at exit are finished before
+    the interpreter shuts down.
+    """
+    global _executor
+    cache = cache or DiagramCache()
+    key = cache.path(topology, "")
+    with _renders_lock:
+        future = _renders.get(key)
+        if future is None or (future.done() and future.exception() is not None):
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="diagram")
+            future = _renders[key] = _executor.submit(cache.render, topology)
+    return future